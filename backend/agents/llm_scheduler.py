@@ -0,0 +1,286 @@
+import heapq
+import itertools
+import json
+import random
+import threading
+import time
+from collections import deque
+from typing import Any, Callable, Dict, Optional
+
+from utils.turn_budget import BudgetExceeded
+from config.settings import (
+    LLM_BACKOFF_BASE,
+    LLM_BACKOFF_MAX,
+    LLM_MAX_CONCURRENCY,
+    LLM_MAX_RETRIES,
+    LLM_OUTPUT_TOKENS_ESTIMATE,
+    LLM_REQUESTS_PER_MINUTE,
+    LLM_TOKENS_PER_MINUTE,
+)
+
+# Priority classes (lower runs first)
+PRIORITY_INTERACTIVE = 0  # A developer is waiting on this turn
+PRIORITY_BACKGROUND = 1   # Summarization, benchmarks, batch jobs
+
+PRIORITY_NAMES = {PRIORITY_INTERACTIVE: "interactive", PRIORITY_BACKGROUND: "background"}
+
+# 408 timeout, 409 conflict, 429 rate limited, 5xx server errors, 529 overloaded
+RETRYABLE_STATUS = {408, 409, 429, 500, 502, 503, 504, 529}
+
+
+class TokenBucket:
+    """Continuously refilling bucket; capacity equals one minute's allowance."""
+
+    def __init__(self, per_minute: float):
+        self.capacity = float(per_minute)
+        self.rate = per_minute / 60.0
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+
+    def _refill(self, now: float):
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def wait_time(self, amount: float, now: float) -> float:
+        """Seconds until amount is available (0 if it is now). Caller holds the scheduler lock."""
+        self._refill(now)
+        amount = min(amount, self.capacity)
+        if self.tokens >= amount:
+            return 0.0
+        return (amount - self.tokens) / self.rate
+
+    def consume(self, amount: float, now: float):
+        self._refill(now)
+        self.tokens -= min(amount, self.capacity)
+
+    def adjust(self, delta: float):
+        """Settle an estimate against actual usage (may go negative, i.e. into debt)."""
+        self.tokens = min(self.capacity, self.tokens - delta)
+
+    def drain(self):
+        self.tokens = min(self.tokens, 0.0)
+
+
+class QueueStats:
+    """Wait-time metrics for one priority class (updated and read under the scheduler lock)."""
+
+    def __init__(self, window: int = 1000):
+        self.requests = 0
+        self.retries = 0
+        self.failures = 0
+        self.total_wait = 0.0
+        self.max_wait = 0.0
+        self.recent_waits = deque(maxlen=window)
+
+    def record_wait(self, wait: float):
+        self.requests += 1
+        self.total_wait += wait
+        self.max_wait = max(self.max_wait, wait)
+        self.recent_waits.append(wait)
+
+    def summary(self) -> Dict:
+        waits = sorted(self.recent_waits)
+        p95 = waits[int(0.95 * (len(waits) - 1))] if waits else None
+        return {
+            "requests": self.requests,
+            "retries": self.retries,
+            "failures": self.failures,
+            "avg_wait_ms": (self.total_wait / self.requests * 1000) if self.requests else None,
+            "p95_wait_ms": p95 * 1000 if p95 is not None else None,
+            "max_wait_ms": self.max_wait * 1000,
+        }
+
+
+def estimate_request_tokens(request: Dict) -> int:
+    """Rough token estimate (~4 chars per token) for a messages.create request, plus expected output."""
+    payload = json.dumps(
+        [request.get("system", ""), request.get("tools", []), request.get("messages", [])],
+        default=lambda block: block.model_dump() if hasattr(block, "model_dump") else str(block)
+    )
+    return len(payload) // 4 + min(request.get("max_tokens", LLM_OUTPUT_TOKENS_ESTIMATE), LLM_OUTPUT_TOKENS_ESTIMATE)
+
+
+def is_retryable(error: Exception) -> bool:
+    status = getattr(error, "status_code", None)
+    if status is not None:
+        return status in RETRYABLE_STATUS
+    # anthropic.APIConnectionError / APITimeoutError have no status code
+    return type(error).__name__ in ("APIConnectionError", "APITimeoutError")
+
+
+def retry_after_seconds(error: Exception) -> Optional[float]:
+    response = getattr(error, "response", None)
+    headers = getattr(response, "headers", None) or {}
+    value = headers.get("retry-after")
+    try:
+        return float(value) if value is not None else None
+    except ValueError:
+        return None
+
+
+class LLMScheduler:
+    """
+    Admission control in front of the Anthropic client.
+
+    Requests wait in a priority queue (interactive before background, FIFO within
+    a class) and are released only when a concurrency slot is free and both the
+    request and token buckets can cover them. Retryable failures are retried with
+    jittered exponential backoff; a 429 also pauses every queue for its
+    retry-after so one burst doesn't turn into many.
+    """
+
+    def __init__(
+        self,
+        requests_per_minute: float = LLM_REQUESTS_PER_MINUTE,
+        tokens_per_minute: float = LLM_TOKENS_PER_MINUTE,
+        max_concurrency: int = LLM_MAX_CONCURRENCY,
+        max_retries: int = LLM_MAX_RETRIES,
+        backoff_base: float = LLM_BACKOFF_BASE,
+        backoff_max: float = LLM_BACKOFF_MAX,
+    ):
+        self.request_bucket = TokenBucket(requests_per_minute)
+        self.token_bucket = TokenBucket(tokens_per_minute)
+        self.max_concurrency = max_concurrency
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+
+        self._cond = threading.Condition()
+        self._heap = []
+        self._seq = itertools.count()
+        self._in_flight = 0
+        self._paused_until = 0.0
+        self._rng = random.Random()
+
+        self.rate_limited = 0
+        self.queue_stats = {p: QueueStats() for p in PRIORITY_NAMES}
+
+    def _acquire(self, estimated_tokens: int, priority: int, deadline: Optional[float] = None):
+        entry = (priority, next(self._seq))
+        queued_at = time.monotonic()
+        with self._cond:
+            heapq.heappush(self._heap, entry)
+            try:
+                while True:
+                    now = time.monotonic()
+                    if deadline is not None and now >= deadline:
+                        raise BudgetExceeded("deadline")
+                    max_wait = (deadline - now) if deadline is not None else None
+
+                    if self._heap[0] == entry and self._in_flight < self.max_concurrency:
+                        wait = max(
+                            self._paused_until - now,
+                            self.request_bucket.wait_time(1, now),
+                            self.token_bucket.wait_time(estimated_tokens, now),
+                        )
+                        if wait <= 0:
+                            heapq.heappop(self._heap)
+                            self.request_bucket.consume(1, now)
+                            self.token_bucket.consume(estimated_tokens, now)
+                            self._in_flight += 1
+                            self.queue_stats[priority].record_wait(now - queued_at)
+                            self._cond.notify_all()
+                            return
+                        self._cond.wait(timeout=min(wait, max_wait) if max_wait is not None else wait)
+                    else:
+                        self._cond.wait(timeout=max_wait)
+            except BaseException:
+                # Leave the queue cleanly if the waiting thread is interrupted
+                if entry in self._heap:
+                    self._heap.remove(entry)
+                    heapq.heapify(self._heap)
+                    self._cond.notify_all()
+                raise
+
+    def _count_failure(self, stats: QueueStats):
+        with self._cond:
+            stats.failures += 1
+
+    def _release(self, token_delta: float = 0.0):
+        with self._cond:
+            self._in_flight -= 1
+            self.token_bucket.adjust(token_delta)
+            self._cond.notify_all()
+
+    def _backoff(self, attempt: int, error: Exception) -> float:
+        delay = min(self.backoff_max, self.backoff_base * (2 ** attempt))
+        delay = self._rng.uniform(delay / 2, delay)  # Jitter so retries don't arrive in lockstep
+        retry_after = retry_after_seconds(error)
+        return max(delay, retry_after) if retry_after is not None else delay
+
+    def run(self, call: Callable[[], Any], estimated_tokens: int, priority: int = PRIORITY_INTERACTIVE,
+            deadline: Optional[float] = None) -> Any:
+        """
+        Run call() once admitted, retrying retryable errors.
+
+        Args:
+            call: Makes the API request (e.g. lambda: client.messages.create(...))
+            estimated_tokens: Tokens to reserve up front; settled against response.usage
+            priority: PRIORITY_INTERACTIVE or PRIORITY_BACKGROUND
+            deadline: Optional time.monotonic() deadline; BudgetExceeded is raised instead of
+                queueing or backing off past it
+
+        Returns:
+            Whatever call() returns
+        """
+        stats = self.queue_stats[priority]
+        attempt = 0
+        while True:
+            self._acquire(estimated_tokens, priority, deadline)
+
+            try:
+                response = call()
+            except Exception as e:
+                self._release()
+                if not is_retryable(e) or attempt >= self.max_retries:
+                    self._count_failure(stats)
+                    raise
+
+                delay = self._backoff(attempt, e)
+                if deadline is not None and time.monotonic() + delay >= deadline:
+                    self._count_failure(stats)
+                    raise BudgetExceeded("deadline") from e
+                with self._cond:
+                    stats.retries += 1
+                    if getattr(e, "status_code", None) == 429:
+                        self.rate_limited += 1
+                        self.token_bucket.drain()
+                        self._paused_until = max(self._paused_until, time.monotonic() + delay)
+                print(f"⚠️  LLM request failed ({type(e).__name__}), retrying in {delay:.1f}s")
+                attempt += 1
+                time.sleep(delay)
+                continue
+
+            usage = getattr(response, "usage", None)
+            actual = (usage.input_tokens + usage.output_tokens) if usage else estimated_tokens
+            self._release(actual - estimated_tokens)
+            return response
+
+    def stats(self) -> Dict:
+        with self._cond:
+            queued = {name: 0 for name in PRIORITY_NAMES.values()}
+            for priority, _ in self._heap:
+                queued[PRIORITY_NAMES[priority]] += 1
+            return {
+                "in_flight": self._in_flight,
+                "queued": queued,
+                "rate_limited": self.rate_limited,
+                "request_bucket": round(self.request_bucket.tokens, 1),
+                "token_bucket": round(self.token_bucket.tokens, 1),
+                "queues": {PRIORITY_NAMES[p]: s.summary() for p, s in self.queue_stats.items()},
+            }
+
+
+# Global scheduler instance (lazy created), shared by every session in the process
+_scheduler = None
+_scheduler_lock = threading.Lock()
+
+
+def get_scheduler() -> LLMScheduler:
+    """Get or create the process-wide LLM scheduler."""
+    global _scheduler
+    if _scheduler is None:
+        with _scheduler_lock:
+            if _scheduler is None:
+                _scheduler = LLMScheduler()
+    return _scheduler
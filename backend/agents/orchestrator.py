@@ -1,17 +1,33 @@
+import re
 import anthropic
-from typing import List, Dict, Tuple
+from typing import List, Dict, Optional, Tuple
 from config.settings import ANTHROPIC_API_KEY, ORCHESTRATOR_MODEL, TEMPERATURE
-from config.settings import CONFIDENCE_THRESHOLD_HIGH, CONFIDENCE_THRESHOLD_LOW
+from config.settings import CONFIDENCE_THRESHOLD_HIGH, CONFIDENCE_THRESHOLD_LOW, PREFETCH_SCORE_THRESHOLD
+from config.settings import SPECULATIVE_RETRIEVAL_ENABLED, SPECULATIVE_CONTEXT_WAIT_MS, SPECULATIVE_CONTEXT_MIN_SCORE
+from config.settings import HISTORY_COMPACTION_ENABLED, HISTORY_KEEP_MESSAGES
 from utils.conversation_state import ConversationState
+from utils.turn_budget import TurnBudget, BudgetExceeded, remaining_seconds
 from agents.tools import TOOLS
-from database.search import search_projects, format_search_results
+from agents.llm_scheduler import get_scheduler, estimate_request_tokens, PRIORITY_INTERACTIVE
+from agents.speculative import SpeculativeSearch
+from database.search import search_projects_formatted
+from database.project_context import prefetch_project_context, get_project_context, format_project_context
+from database.session_store import get_session_store, save_turn
 
-client = anthropic.Anthropic(api_key=ANTHROPIC_API_KEY)
+# Retries are the scheduler's job (it drains the buckets and pauses on 429s), not the SDK's
+client = anthropic.Anthropic(api_key=ANTHROPIC_API_KEY, max_retries=0)
+
+
+def set_client(new_client):
+    """Swap the Anthropic client (e.g. for an offline stand-in during load tests)."""
+    global client
+    client = new_client
 
 SYSTEM_PROMPT = """You are a helpful PM automation assistant. Your primary job is to identify which project a developer is referring to when they mention their work or blockers.
 
 Your capabilities:
 - You have access to a search_projects tool that searches a database of projects
+- You have access to a get_project_context tool that returns a project's milestones, tickets, blockers and owners
 - You can ask clarifying questions to narrow down which project the user means
 - You understand technical jargon and can extract key terms from casual conversation
 
@@ -23,6 +39,7 @@ Your workflow:
    - If multiple projects match closely (scores within 0.1 of each other): Ask user to choose
    - If no strong matches (all scores <0.50): Ask for more details
 4. Return the project ID once confirmed
+5. For follow-up questions about an identified project (tickets, milestones, blockers, owners), use get_project_context
 
 Important guidelines:
 - Be conversational and friendly, not robotic
@@ -34,32 +51,143 @@ Important guidelines:
 Remember: Your goal is to accurately identify which project ID the user is discussing."""
 
 
-def execute_tool(tool_name: str, tool_input: Dict, state: ConversationState) -> str:
+def create_message(messages: List[Dict], priority: int = PRIORITY_INTERACTIVE, deadline: Optional[float] = None):
+    """Send a messages.create request through the shared rate-limit-aware scheduler."""
+    request = dict(
+        model=ORCHESTRATOR_MODEL,
+        max_tokens=2000,
+        temperature=TEMPERATURE,
+        system=SYSTEM_PROMPT,
+        tools=TOOLS,
+        messages=messages
+    )
+    estimated_tokens = estimate_request_tokens(request)
+    
+    def call():
+        # Don't let a single HTTP request outlive the turn
+        timeout = remaining_seconds(deadline)
+        if timeout is not None:
+            return client.messages.create(**request, timeout=max(timeout, 1.0))
+        return client.messages.create(**request)
+    
+    return get_scheduler().run(call, estimated_tokens, priority, deadline)
+
+
+def execute_tool(tool_name: str, tool_input: Dict, state: ConversationState, deadline: Optional[float] = None,
+                 speculative: Optional[SpeculativeSearch] = None) -> str:
     if tool_name == "search_projects":
         query = tool_input["query"]
         print(f"\n🔍 [SEARCH] Searching for: '{query}'")
         
-        # Call the search function
-        results = search_projects(query)
+        # Reuse the search started alongside the first LLM call if the query is close enough
+        hit, query_embedding = speculative.match(query) if speculative else (None, None)
+        if hit is not None:
+            results, formatted = hit
+        else:
+            # Call the search function (results and their LLM formatting are cached together)
+            results, formatted = search_projects_formatted(query, deadline=deadline, query_embedding=query_embedding)
         
         if not results:
             return "No matching projects found. The search returned no results."
         
-        # Format results for the LLM
-        formatted = format_search_results(results)
-        
         print(f"   Found {len(results)} matches (top score: {results[0]['score']:.3f})")
+        state.record_candidates(results)
+        
+        # Warm the context cache for strong candidates - follow-ups usually ask about them next
+        for result in results:
+            if result["score"] >= PREFETCH_SCORE_THRESHOLD:
+                prefetch_project_context(result["id"])
         
         return formatted
     
+    if tool_name == "get_project_context":
+        project_id = tool_input["project_id"]
+        print(f"\n📂 [CONTEXT] Loading context for '{project_id}'")
+        
+        context = get_project_context(project_id, timeout=remaining_seconds(deadline))
+        return format_project_context(context)
+    
     return f"Error: Unknown tool {tool_name}"
 
 
-def run_orchestrator_turn(state: ConversationState, user_message: str) -> Tuple[str, bool]:
+def add_speculative_context(messages: List[Dict], state: ConversationState, speculative: SpeculativeSearch):
+    """
+    Wait briefly for the speculative search and, if it found a strong match, attach
+    the results to this turn's user message so the model can answer without a tool call.
+    Only the per-turn copy of messages is changed; the stored history stays clean.
+    """
+    best = speculative.best(timeout=SPECULATIVE_CONTEXT_WAIT_MS / 1000)
+    if best is None:
+        return
+    
+    query, results, formatted = best
+    if results[0]["score"] < SPECULATIVE_CONTEXT_MIN_SCORE:
+        return
+    
+    print(f"\n⚡ [SPECULATIVE] Handing search results for '{query}' to the model up front")
+    state.record_candidates(results)
+    content = messages[-1]["content"]
+    blocks = [{"type": "text", "text": content}] if isinstance(content, str) else list(content)
+    messages[-1] = {
+        "role": "user",
+        "content": blocks + [
+            {"type": "text", "text": f"(Automatic search_projects results for '{query}')\n{formatted}"}
+        ]
+    }
+
+
+def identify_project(state: ConversationState, final_response: str) -> bool:
+    """
+    Record the project the reply settles on: exactly one of the candidates found
+    so far is mentioned by id. A reply listing several asks the user to choose.
+    """
+    mentioned = [
+        project for project_id, project in state.candidate_projects.items()
+        if re.search(rf"(?<![\w-]){re.escape(project_id)}(?![\w-])", final_response)
+    ]
+    if len(mentioned) != 1:
+        return False
+    
+    project = mentioned[0]
+    state.set_identified_project(project["id"], project["name"], project["score"])
+    return True
+
+
+def degraded_response(state: ConversationState, reason: str) -> str:
+    """Answer from the best candidates found so far when a turn runs out of budget."""
+    print(f"\n⏱️  [BUDGET] Turn stopped early ({reason}), answering with best candidates so far")
+    
+    candidates = state.top_candidates()
+    if not candidates:
+        return ("Sorry, that took longer than expected and I couldn't finish looking it up. "
+                "Could you tell me a bit more about what you're working on?")
+    
+    lines = ["I didn't get to finish checking everything, but here's what I found so far:"]
+    for i, project in enumerate(candidates, 1):
+        lines.append(f"{i}. {project['name']} (ID: {project['id']}) - similarity {project['score']:.2f}")
+    lines.append("Is it one of these?")
+    return "\n".join(lines)
+
+
+def finish_turn(state: ConversationState, final_response: str):
+    """Record the assistant's reply and persist the turn (if a session store is configured)."""
+    state.add_message("assistant", final_response)
+    
+    store = get_session_store()
+    if store is not None:
+        try:
+            save_turn(store, state)
+        except Exception as e:
+            print(f"⚠️  Could not save session {state.session_id}: {e}")
+
+
+def run_orchestrator_turn(state: ConversationState, user_message: str,
+                          priority: int = PRIORITY_INTERACTIVE) -> Tuple[str, bool]:
     """
     Args:
         state: Current conversation state
         user_message: User's message
+        priority: Scheduler class for the turn's LLM calls (PRIORITY_BACKGROUND for batch runs)
         
     Returns:
         Tuple of (assistant's response, project_identified_flag)
@@ -67,19 +195,34 @@ def run_orchestrator_turn(state: ConversationState, user_message: str) -> Tuple[
     state.add_message("user", user_message)
     state.turn_count += 1
     
-    # Conversation loop (handles tool use)
-    messages = state.messages.copy()
+    # Conversation loop (handles tool use), bounded by time, LLM calls and tokens
+    if HISTORY_COMPACTION_ENABLED:
+        messages = state.compacted_messages(HISTORY_KEEP_MESSAGES)
+    else:
+        messages = state.messages.copy()
     project_identified = False
+    budget = TurnBudget.from_settings()
+    
+    # Start retrieval for the raw message now, so it runs while the model thinks
+    speculative = SpeculativeSearch(user_message, budget.deadline) if SPECULATIVE_RETRIEVAL_ENABLED else None
+    if speculative and SPECULATIVE_CONTEXT_WAIT_MS > 0:
+        add_speculative_context(messages, state, speculative)
     
     while True:
-        response = client.messages.create(
-            model=ORCHESTRATOR_MODEL,
-            max_tokens=2000,
-            temperature=TEMPERATURE,
-            system=SYSTEM_PROMPT,
-            tools=TOOLS,
-            messages=messages
-        )
+        reason = budget.exhausted_reason()
+        if reason is None:
+            try:
+                response = create_message(messages, priority, deadline=budget.deadline)
+            except BudgetExceeded as e:
+                reason = e.reason
+        
+        if reason is not None:
+            final_response = degraded_response(state, reason)
+            finish_turn(state, final_response)
+            return final_response, project_identified
+        
+        budget.record_response(response)
+        state.record_usage(response)
         
         # Check if Claude wants to use tools
         if response.stop_reason == "tool_use":
@@ -94,7 +237,11 @@ def run_orchestrator_turn(state: ConversationState, user_message: str) -> Tuple[
             
             tool_results = []
             for tool_call in tool_calls:
-                result = execute_tool(tool_call.name, tool_call.input, state)
+                try:
+                    result = execute_tool(tool_call.name, tool_call.input, state,
+                                          deadline=budget.deadline, speculative=speculative)
+                except BudgetExceeded:
+                    result = "Error: ran out of time for this lookup. Answer with the candidates found so far."
                 
                 tool_results.append({
                     "type": "tool_result",
@@ -123,11 +270,9 @@ def run_orchestrator_turn(state: ConversationState, user_message: str) -> Tuple[
                 if block.type == "text":
                     final_response += block.text
             
-            # Check if response contains a project ID (simple heuristic)
-            if "proj-" in final_response.lower() or "project id" in final_response.lower():
-                project_identified = True
+            project_identified = identify_project(state, final_response)
             
             # Save assistant's response
-            state.add_message("assistant", final_response)
+            finish_turn(state, final_response)
             
             return final_response, project_identified
\ No newline at end of file
@@ -0,0 +1,169 @@
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor, wait
+from concurrent.futures import TimeoutError as FutureTimeoutError
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Tuple
+
+from database.embeddings_CosineSimilarity import cosine_similarity
+from database.search import embed_query, search_projects_formatted
+from database.result_cache import normalize_query
+from database.keyword_spotter import spot_keywords
+from utils.text import extract_keyphrases
+from utils.turn_budget import remaining_seconds
+from config.settings import KEYWORD_SPOTTING_ENABLED, SPECULATIVE_REUSE_SIMILARITY, SPECULATIVE_WORKERS
+
+_executor = ThreadPoolExecutor(max_workers=SPECULATIVE_WORKERS, thread_name_prefix="speculative")
+
+# Counters for diagnostics
+_stats = {"turns": 0, "searches": 0, "reused": 0, "missed": 0, "failed": 0}
+_stats_lock = threading.Lock()
+
+
+def _count(key: str, n: int = 1):
+    with _stats_lock:
+        _stats[key] += n
+
+
+@dataclass
+class _Speculation:
+    label: str  # The query, or 'keywords' until spotting has run
+    normalized: Optional[str]  # Normalized query if known up front
+    future: Future  # -> (query, query_embedding, results, formatted), or None if there was nothing to search
+
+
+def build_search_phrases(user_message: str) -> List[str]:
+    """Speculative queries for a user message: its key terms and the raw message."""
+    return extract_keyphrases(user_message)
+
+
+def _embed_and_search(query: str, deadline: Optional[float]):
+    query_embedding = embed_query(query, timeout=remaining_seconds(deadline))
+    results, formatted = search_projects_formatted(query, deadline=deadline, query_embedding=query_embedding)
+    return query, query_embedding, results, formatted
+
+
+def _spot_and_search(user_message: str, phrases: List[str], deadline: Optional[float]):
+    """
+    Known component names spotted in the message, searched together (the most
+    precise query). Spotting runs here, off the turn's critical path.
+    """
+    keywords = spot_keywords(user_message)
+    if not keywords:
+        return None
+    phrase = " ".join(keywords)
+    if normalize_query(phrase) in {normalize_query(p) for p in phrases}:
+        return None
+    return _embed_and_search(phrase, deadline)
+
+
+class SpeculativeSearch:
+    """
+    Project searches for a turn's user message, started alongside the first LLM
+    call so that retrieval is (usually) finished by the time the model asks for it.
+    """
+
+    def __init__(self, user_message: str, deadline: Optional[float] = None):
+        self.deadline = deadline
+        self._speculations: List[_Speculation] = []
+
+        phrases = build_search_phrases(user_message)
+        if KEYWORD_SPOTTING_ENABLED:
+            self._speculations.append(_Speculation(
+                label="keywords",
+                normalized=None,
+                future=_executor.submit(_spot_and_search, user_message, phrases, deadline),
+            ))
+        for phrase in phrases:
+            self._speculations.append(_Speculation(
+                label=phrase,
+                normalized=normalize_query(phrase),
+                future=_executor.submit(_embed_and_search, phrase, deadline),
+            ))
+
+        _count("turns")
+        _count("searches", len(self._speculations))
+
+    def _result(self, speculation: _Speculation, timeout: Optional[float] = 0):
+        """The speculation's outcome, waiting up to timeout (None = until the deadline); None if unavailable."""
+        if timeout is None:
+            timeout = remaining_seconds(self.deadline)
+        try:
+            return speculation.future.result(timeout=timeout)
+        except FutureTimeoutError:
+            return None
+        except Exception as e:
+            print(f"⚠️  Speculative search for '{speculation.label}' failed: {e}")
+            _count("failed")
+            return None
+
+    def best(self, timeout: Optional[float] = None) -> Optional[Tuple[str, List[Dict], str]]:
+        """Highest-scoring finished speculation as (query, results, formatted), waiting up to timeout in total."""
+        done, _ = wait([s.future for s in self._speculations], timeout=timeout)
+        best = None
+        for speculation in self._speculations:
+            if speculation.future not in done:
+                continue
+            try:
+                outcome = speculation.future.result()
+            except Exception:
+                continue
+            if outcome is None:
+                continue
+            query, _, results, formatted = outcome
+            if results and (best is None or results[0]["score"] > best[1][0]["score"]):
+                best = (query, results, formatted)
+        return best
+
+    def match(self, query: str) -> Tuple[Optional[Tuple[List[Dict], str]], Optional[List[float]]]:
+        """
+        Reuse a speculative result for the model's search query if it is close enough.
+
+        Only a speculation for the very same query is waited for (it is the search
+        this call would run anyway); similar ones count only if already finished.
+
+        Returns:
+            Tuple of ((results, formatted) or None, embedding of query if one was computed)
+        """
+        if not self._speculations:
+            return None, None
+
+        normalized = normalize_query(query)
+        for speculation in self._speculations:
+            if speculation.normalized == normalized:
+                outcome = self._result(speculation, timeout=None)
+                if outcome is not None:
+                    _count("reused")
+                    return (outcome[2], outcome[3]), outcome[1]
+
+        finished = [o for o in (self._result(s) for s in self._speculations if s.future.done()) if o is not None]
+        for outcome in finished:
+            if normalize_query(outcome[0]) == normalized:
+                _count("reused")
+                return (outcome[2], outcome[3]), outcome[1]
+
+        query_embedding = embed_query(query, timeout=remaining_seconds(self.deadline))
+        best, best_similarity = None, SPECULATIVE_REUSE_SIMILARITY
+        for outcome in finished:
+            if outcome[1].model != query_embedding.model:
+                # Embedded before an index generation switch - not comparable
+                continue
+            similarity = cosine_similarity(query_embedding, outcome[1])
+            if similarity >= best_similarity:
+                best, best_similarity = outcome, similarity
+
+        if best is None:
+            _count("missed")
+            return None, query_embedding
+
+        _count("reused")
+        print(f"   ⚡ Reusing speculative search (similarity {best_similarity:.2f})")
+        return (best[2], best[3]), query_embedding
+
+
+def get_speculative_stats() -> Dict:
+    """How often speculative results were reused by the model's searches."""
+    with _stats_lock:
+        stats = dict(_stats)
+    decided = stats["reused"] + stats["missed"]
+    stats["reuse_rate"] = (stats["reused"] / decided) if decided else None
+    return stats
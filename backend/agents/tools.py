@@ -15,6 +15,21 @@ TOOLS = [
         }
     },
 
+    {
+        "name": "get_project_context",
+        "description": "Get an identified project's context: milestones, tickets, known blockers and owners. Use this for follow-up questions about a project once you know its ID.",
+        "input_schema": {
+            "type": "object",
+            "properties": {
+                "project_id": {
+                    "type": "string",
+                    "description": "Project ID returned by search_projects (e.g., 'proj-122')"
+                }
+            },
+            "required": ["project_id"]
+        }
+    },
+
     {
         "name": "search_teammate",
         "description": "Search for teammates relevant to current issue based on git push history, code summary, and list of teammates with relevant metadata about each teammate",
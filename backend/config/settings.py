@@ -8,7 +8,9 @@ if not ANTHROPIC_API_KEY:
     raise ValueError("ANTHROPIC_API_KEY not found in environment variables")
 
 # Agent Configuration
-MAX_NEGOTIATION_ROUNDS = 20  # Prevent infinite loops
+MAX_NEGOTIATION_ROUNDS = 20  # Prevent infinite loops (max LLM calls per turn)
+TURN_DEADLINE_SECONDS = 60  # Wall-clock budget per turn
+TURN_TOKEN_BUDGET = 60000  # Input + output tokens per turn
 TEMPERATURE = 0.7
 
 MONGO_URI = os.getenv("MONGO_URI")
@@ -21,15 +23,103 @@ IS_ATLAS = "mongodb.net" in MONGO_URI or "mongodb+srv" in MONGO_URI
 ORCHESTRATOR_MODEL = "claude-sonnet-4-20250514"
 TEMPERATURE = 0.7
 
+# LLM Request Scheduler (shared by all sessions in a process)
+LLM_REQUESTS_PER_MINUTE = int(os.getenv("LLM_REQUESTS_PER_MINUTE", "50"))
+LLM_TOKENS_PER_MINUTE = int(os.getenv("LLM_TOKENS_PER_MINUTE", "40000"))  # input + output
+LLM_MAX_CONCURRENCY = int(os.getenv("LLM_MAX_CONCURRENCY", "8"))  # Requests in flight at once
+LLM_MAX_RETRIES = 5
+LLM_BACKOFF_BASE = 0.5  # Seconds, doubled per retry (with jitter)
+LLM_BACKOFF_MAX = 30
+LLM_OUTPUT_TOKENS_ESTIMATE = 300  # Output tokens reserved per request before usage is known
+
 # Embedding Configuration
-EMBEDDING_MODEL = "all-MiniLM-L6-v2"
+# "<model>[:<backend>]" - backend is one of torch (default), int8, onnx, onnx-int8
+EMBEDDING_MODEL = os.getenv("EMBEDDING_MODEL", "all-MiniLM-L6-v2")
 EMBEDDING_DIMENSIONS = 384
 
+# Embedding Service (micro-batching of concurrent requests)
+EMBEDDING_BATCHING_ENABLED = os.getenv("EMBEDDING_BATCHING_ENABLED", "true").lower() == "true"
+EMBEDDING_MAX_BATCH_SIZE = 32  # Max texts encoded together
+EMBEDDING_MAX_WAIT_MS = 5  # Max time a request waits for its batch to fill
+EMBEDDING_INTRA_OP_THREADS = int(os.getenv("EMBEDDING_INTRA_OP_THREADS", "2"))  # torch intra-op threads (set once per process) / per ONNX Runtime session
+EMBEDDING_TOKENIZER_CACHE_SIZE = 4096  # Tokenized texts kept by the ONNX backends
+
 # Search Configuration
 SEARCH_LIMIT = 5  # Top N results to return
 CONFIDENCE_THRESHOLD_HIGH = 0.80  # Auto-confirm project
 CONFIDENCE_THRESHOLD_LOW = 0.50   # Ask for more context
 
+# Search Result Cache
+RESULT_CACHE_ENABLED = True
+RESULT_CACHE_TTL = 300  # Seconds a cached search result stays valid
+RESULT_CACHE_MAX_ENTRIES = 10000
+RESULT_CACHE_MAX_BYTES = 16 * 1024 * 1024  # Memory bound for cached results + formatted strings
+RESULT_CACHE_SHARED_PATH = os.getenv("RESULT_CACHE_SHARED_PATH")  # sqlite file shared by workers on one host (unset = per-process only)
+RESULT_CACHE_SHARED_MAX_ROWS = 50000
+INDEX_VERSION_CHECK_INTERVAL = 5  # Seconds between index version reads from Mongo
+
+# Index Generations (blue/green re-embedding when the embedding model changes)
+GENERATION_BUILD_RATE = 20  # Documents embedded per second by a background build (0 = unthrottled)
+GENERATION_BUILD_BATCH_SIZE = 32
+GENERATION_VALIDATION_SAMPLE = 50  # Projects whose names serve as validation queries
+GENERATION_VALIDATION_K = 5
+GENERATION_MIN_OVERLAP = 0.5  # Min mean top-k overlap with the active generation's results
+GENERATION_MAX_RECALL_DROP = 0.05  # Max allowed drop in recall@1 vs the active generation
+
+# Speculative Retrieval (search the raw user message while the first LLM call is in flight)
+SPECULATIVE_RETRIEVAL_ENABLED = True
+SPECULATIVE_REUSE_SIMILARITY = 0.90  # Min cosine between the model's query and a speculative one to reuse it
+SPECULATIVE_CONTEXT_WAIT_MS = int(os.getenv("SPECULATIVE_CONTEXT_WAIT_MS", "0"))  # >0: wait this long for speculative results and hand strong ones to the model up front
+SPECULATIVE_CONTEXT_MIN_SCORE = float(os.getenv("SPECULATIVE_CONTEXT_MIN_SCORE", str(CONFIDENCE_THRESHOLD_HIGH)))  # Top score needed to hand results up front
+SPECULATIVE_WORKERS = 8
+
+# Keyword Spotting (known component names from the keywords collection)
+KEYWORD_SPOTTING_ENABLED = os.getenv("KEYWORD_SPOTTING_ENABLED", "true").lower() == "true"
+KEYWORD_REFRESH_INTERVAL = 60  # Seconds between keyword collection re-reads
+KEYWORD_BOOST = 0.05  # Added to a project's score per spotted keyword it mentions
+KEYWORD_MAX_BOOST = 0.15
+KEYWORD_EXTRA_CANDIDATES = 5  # Extra vector hits fetched so a boost can promote them into the top N
+
+# Project Context Prefetch
+PREFETCH_SCORE_THRESHOLD = CONFIDENCE_THRESHOLD_HIGH  # Prefetch context for candidates at/above this score
+PROJECT_CONTEXT_CACHE_TTL = 600  # Seconds a prefetched bundle stays fresh
+PROJECT_CONTEXT_CACHE_SIZE = 256  # Projects kept in memory (LRU)
+PROJECT_CONTEXT_WORKERS = 4  # Background prefetch threads
+
+# Conversation History (what is sent to the model each turn)
+HISTORY_COMPACTION_ENABLED = os.getenv("HISTORY_COMPACTION_ENABLED", "false").lower() == "true"
+HISTORY_KEEP_MESSAGES = 4  # Recent messages sent verbatim when compacting; older ones become a short summary
+
+# Session Persistence
+SESSION_STORE = os.getenv("SESSION_STORE", "")  # "sqlite" (local), "mongo" (production) or unset (in-memory only)
+SESSION_SNAPSHOT_EVERY = 10  # Turns between full-history snapshots
+
+# Ticket Ingestion (Jira exports / REST API -> tickets collection)
+TICKET_INGEST_BATCH_SIZE = 256  # Tickets embedded and upserted together
+JIRA_BASE_URL = os.getenv("JIRA_BASE_URL")  # e.g. https://yourcompany.atlassian.net
+JIRA_EMAIL = os.getenv("JIRA_EMAIL")
+JIRA_API_TOKEN = os.getenv("JIRA_API_TOKEN")
+JIRA_JQL = os.getenv("JIRA_JQL", "")  # Extra JQL restricting what is synced (e.g. 'project = OPS')
+JIRA_PAGE_SIZE = 100
+# Jira fields holding our project id / root cause / solution (e.g. 'fields.customfield_10050')
+JIRA_PROJECT_ID_FIELD = os.getenv("JIRA_PROJECT_ID_FIELD")
+JIRA_ROOT_CAUSE_FIELD = os.getenv("JIRA_ROOT_CAUSE_FIELD")
+JIRA_SOLUTION_FIELD = os.getenv("JIRA_SOLUTION_FIELD")
+
+# Duplicate Blocker Detection (offline job -> blocker_neighbours collection)
+BLOCKER_NEIGHBOURS_K = 10  # Nearest blockers stored per blocker
+BLOCKER_DUPLICATE_THRESHOLD = 0.90  # Cosine at/above which two blockers count as duplicates
+BLOCKER_SIMILARITY_TILE_MB = 128  # Max size of one block of the similarity matrix (per worker)
+BLOCKER_JOB_WORKERS = int(os.getenv("BLOCKER_JOB_WORKERS", "0"))  # Processes for the matrix blocks (0 = one per CPU)
+
+# Diagnostics (memory accounting, CPU/allocation profiling, cache stats - utils/diagnostics.py)
+DIAGNOSTICS_PORT = int(os.getenv("DIAGNOSTICS_PORT", "0"))  # Localhost admin endpoint (0 = off)
+DIAGNOSTICS_PROFILE_INTERVAL_MS = 10  # Sampling profiler interval
+DIAGNOSTICS_TRACEMALLOC_FRAMES = 10  # Traceback depth kept per allocation while tracing
+
 # Project Paths
 BASE_DIR = Path(__file__).parent.parent
-SCRIPTS_DIR = BASE_DIR / "scripts"
\ No newline at end of file
+SCRIPTS_DIR = BASE_DIR / "scripts"
+EMBEDDING_CACHE_DIR = BASE_DIR / ".model_cache"  # Exported/quantized ONNX models
+SESSION_DB_PATH = os.getenv("SESSION_DB_PATH", str(BASE_DIR / "sessions.db"))
+DIAGNOSTICS_DUMP_DIR = os.getenv("DIAGNOSTICS_DUMP_DIR", str(BASE_DIR / "diagnostics"))
@@ -0,0 +1,314 @@
+"""
+Offline duplicate-blocker detection.
+
+Embeds every blocker, finds each one's top-k most similar blockers with a blocked
+matrix multiplication (row blocks spread over worker processes, column tiles
+merged into a running top-k, so no full N x N matrix is ever held), groups
+near-duplicates into clusters and stores the result in the blocker_neighbours
+collection. At query time a MatchResult is one document lookup, not a scan.
+"""
+import contextlib
+import multiprocessing
+import os
+import tempfile
+import time
+import uuid
+from datetime import datetime, timezone
+from typing import Dict, Iterator, List, Optional, Tuple
+
+import numpy as np
+from pymongo import ReplaceOne
+
+from database.mongo_client import get_collection
+from database.embeddings_CosineSimilarity import generate_embeddings
+from models.Internal_models.BlockerInternalDataTypes import MatchResult
+from config.settings import (
+    BLOCKER_DUPLICATE_THRESHOLD,
+    BLOCKER_JOB_WORKERS,
+    BLOCKER_NEIGHBOURS_K,
+    BLOCKER_SIMILARITY_TILE_MB,
+    EMBEDDING_MODEL,
+)
+
+# One document per blocker:
+# {"_id": "blk-7", "neighbours": [{"id": "blk-31", "score": 0.94}, ...], "cluster_id": "blk-7", "cluster_size": 3, ...}
+NEIGHBOURS_COLLECTION = "blocker_neighbours"
+# One document per duplicate cluster: {"_id": "blk-7", "members": ["blk-7", "blk-31", ...], "size": 3, ...}
+CLUSTERS_COLLECTION = "blocker_clusters"
+
+BLOCKER_TEXT_FIELDS = ("title", "core_issue", "root_cause", "solution")
+COLUMN_TILE = 8192  # Blockers compared against per matrix multiplication
+WRITE_BATCH = 1000
+
+
+def blocker_text(doc: Dict) -> str:
+    """Text that is embedded for a blocker."""
+    return " ".join(doc[f] for f in BLOCKER_TEXT_FIELDS if doc.get(f))
+
+
+def normalize_rows(matrix: np.ndarray) -> np.ndarray:
+    """Unit-length float32 rows, so a dot product is the cosine similarity."""
+    matrix = np.asarray(matrix, dtype=np.float32)
+    norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return matrix / norms
+
+
+def _merge_top_k(scores: np.ndarray, indices: np.ndarray, k: int) -> Tuple[np.ndarray, np.ndarray]:
+    """Keep the k best (unordered) columns of each row."""
+    if scores.shape[1] <= k:
+        return scores, indices
+    keep = np.argpartition(-scores, k - 1, axis=1)[:, :k]
+    return np.take_along_axis(scores, keep, axis=1), np.take_along_axis(indices, keep, axis=1)
+
+
+def _top_k_rows(task: Tuple[str, int, int, int, int]) -> Tuple[int, np.ndarray, np.ndarray]:
+    """
+    Top-k neighbours of rows [start, stop) of the matrix stored at path.
+
+    Runs in a worker process: the matrix is memory-mapped, and only one
+    (rows x column tile) block of similarities exists at a time.
+    """
+    path, start, stop, k, column_tile = task
+    matrix = np.load(path, mmap_mode="r")
+    n = matrix.shape[0]
+    rows = np.asarray(matrix[start:stop])
+
+    best_scores = np.full((stop - start, 0), -np.inf, dtype=np.float32)
+    best_indices = np.full((stop - start, 0), -1, dtype=np.int64)
+    for c0 in range(0, n, column_tile):
+        c1 = min(n, c0 + column_tile)
+        sims = rows @ np.asarray(matrix[c0:c1]).T
+
+        # A blocker is not its own neighbour
+        lo, hi = max(start, c0), min(stop, c1)
+        if lo < hi:
+            diagonal = np.arange(lo, hi)
+            sims[diagonal - start, diagonal - c0] = -np.inf
+
+        tile_indices = np.broadcast_to(np.arange(c0, c1), sims.shape)
+        tile_scores, tile_indices = _merge_top_k(sims, tile_indices, k)
+        best_scores, best_indices = _merge_top_k(
+            np.hstack([best_scores, tile_scores]), np.hstack([best_indices, tile_indices]), k
+        )
+
+    order = np.argsort(-best_scores, axis=1)
+    return start, np.take_along_axis(best_indices, order, axis=1), np.take_along_axis(best_scores, order, axis=1)
+
+
+@contextlib.contextmanager
+def _single_threaded_blas():
+    """Worker processes split the work already - stop each one's BLAS from using every core too."""
+    names = ("OMP_NUM_THREADS", "OPENBLAS_NUM_THREADS", "MKL_NUM_THREADS")
+    saved = {name: os.environ.get(name) for name in names}
+    os.environ.update({name: "1" for name in names})
+    try:
+        yield
+    finally:
+        for name, value in saved.items():
+            if value is None:
+                os.environ.pop(name, None)
+            else:
+                os.environ[name] = value
+
+
+def compute_neighbours(embeddings: np.ndarray, k: int = BLOCKER_NEIGHBOURS_K, workers: int = BLOCKER_JOB_WORKERS,
+                       tile_mb: float = BLOCKER_SIMILARITY_TILE_MB) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Top-k cosine neighbours of every row.
+
+    Args:
+        embeddings: N x D matrix
+        k: Neighbours per row (capped at N - 1)
+        workers: Processes to spread row blocks over (0 = one per CPU, 1 = in-process)
+        tile_mb: Max size of one block of similarities per worker
+
+    Returns:
+        Tuple of (N x k neighbour row indices, N x k scores), best first
+    """
+    n = len(embeddings)
+    k = min(k, n - 1)
+    if k <= 0:
+        return np.zeros((n, 0), dtype=np.int64), np.zeros((n, 0), dtype=np.float32)
+
+    column_tile = min(n, COLUMN_TILE)
+    row_block = int(max(1, min(n, tile_mb * 2**20 / 4 // column_tile)))
+    workers = workers or os.cpu_count() or 1
+
+    indices = np.empty((n, k), dtype=np.int64)
+    scores = np.empty((n, k), dtype=np.float32)
+    with tempfile.TemporaryDirectory(prefix="blockers-") as tmp:
+        # Workers memory-map the matrix instead of each receiving a pickled copy
+        path = os.path.join(tmp, "embeddings.npy")
+        np.save(path, normalize_rows(embeddings))
+        tasks = [(path, start, min(n, start + row_block), k, column_tile) for start in range(0, n, row_block)]
+
+        def store(results: Iterator):
+            for start, block_indices, block_scores in results:
+                indices[start:start + len(block_indices)] = block_indices
+                scores[start:start + len(block_scores)] = block_scores
+
+        if workers == 1 or len(tasks) == 1:
+            store(map(_top_k_rows, tasks))
+        else:
+            with _single_threaded_blas():
+                pool = multiprocessing.get_context("spawn").Pool(min(workers, len(tasks)))
+            with pool:
+                store(pool.imap_unordered(_top_k_rows, tasks))
+
+    return indices, scores
+
+
+def build_clusters(indices: np.ndarray, scores: np.ndarray, threshold: float) -> List[int]:
+    """
+    Union-find over neighbour pairs scoring at/above threshold.
+
+    Returns:
+        Root row of each row's cluster (a row alone in its cluster is its own root)
+    """
+    parent = list(range(len(indices)))
+
+    def find(i: int) -> int:
+        while parent[i] != i:
+            parent[i] = parent[parent[i]]
+            i = parent[i]
+        return i
+
+    rows, cols = np.nonzero(scores >= threshold)
+    for row, col in zip(rows.tolist(), cols.tolist()):
+        a, b = find(row), find(int(indices[row, col]))
+        if a != b:
+            parent[max(a, b)] = min(a, b)
+
+    return [find(i) for i in range(len(parent))]
+
+
+def count_duplicate_pairs(indices: np.ndarray, scores: np.ndarray, threshold: float) -> int:
+    """Distinct pairs at/above threshold (a pair may appear in one or both neighbour lists)."""
+    rows, cols = np.nonzero(scores >= threshold)
+    return len({(min(r, int(indices[r, c])), max(r, int(indices[r, c]))) for r, c in zip(rows.tolist(), cols.tolist())})
+
+
+def _write_batches(collection, ops: List[ReplaceOne]):
+    for i in range(0, len(ops), WRITE_BATCH):
+        collection.bulk_write(ops[i:i + WRITE_BATCH], ordered=False)
+
+
+def run_blocker_job(k: int = BLOCKER_NEIGHBOURS_K, threshold: float = BLOCKER_DUPLICATE_THRESHOLD,
+                    workers: int = BLOCKER_JOB_WORKERS, tile_mb: float = BLOCKER_SIMILARITY_TILE_MB) -> Dict:
+    """
+    Recompute neighbour lists and duplicate clusters for every blocker.
+
+    Results are written under a new run id, then results of earlier runs are
+    removed, so readers never see a half-empty collection.
+
+    Returns:
+        Job stats (counts and per-stage seconds)
+    """
+    timings = {}
+    started = time.perf_counter()
+    docs = list(get_collection("blockers").find(
+        {}, {"_id": 0, "id": 1, **{f: 1 for f in BLOCKER_TEXT_FIELDS}}
+    ))
+    docs = [d for d in docs if d.get("id") and blocker_text(d)]
+    ids = [d["id"] for d in docs]
+    timings["load_s"] = time.perf_counter() - started
+
+    stage = time.perf_counter()
+    embeddings = np.asarray(generate_embeddings([blocker_text(d) for d in docs]), dtype=np.float32)
+    timings["embed_s"] = time.perf_counter() - stage
+
+    stage = time.perf_counter()
+    if ids:
+        indices, scores = compute_neighbours(embeddings, k=k, workers=workers, tile_mb=tile_mb)
+    else:
+        indices, scores = np.zeros((0, 0), dtype=np.int64), np.zeros((0, 0), dtype=np.float32)
+    timings["neighbours_s"] = time.perf_counter() - stage
+
+    stage = time.perf_counter()
+    roots = build_clusters(indices, scores, threshold)
+    members: Dict[int, List[str]] = {}
+    for row, root in enumerate(roots):
+        members.setdefault(root, []).append(ids[row])
+    # Clusters are named after their smallest member id, so names are stable across runs
+    cluster_ids = {root: min(m) for root, m in members.items() if len(m) > 1}
+    timings["cluster_s"] = time.perf_counter() - stage
+
+    stage = time.perf_counter()
+    run_id = uuid.uuid4().hex
+    computed_at = datetime.now(timezone.utc).isoformat()
+    meta = {"run_id": run_id, "computed_at": computed_at, "model": EMBEDDING_MODEL, "threshold": threshold}
+
+    neighbours = get_collection(NEIGHBOURS_COLLECTION)
+    _write_batches(neighbours, [
+        ReplaceOne({"_id": blocker_id}, {
+            "neighbours": [{"id": ids[j], "score": round(float(s), 4)}
+                           for j, s in zip(indices[row].tolist(), scores[row].tolist())],
+            "cluster_id": cluster_ids.get(roots[row]),
+            "cluster_size": len(members[roots[row]]) if roots[row] in cluster_ids else 1,
+            **meta,
+        }, upsert=True)
+        for row, blocker_id in enumerate(ids)
+    ])
+
+    clusters = get_collection(CLUSTERS_COLLECTION)
+    _write_batches(clusters, [
+        ReplaceOne({"_id": cluster_id}, {"members": sorted(members[root]), "size": len(members[root]), **meta}, upsert=True)
+        for root, cluster_id in cluster_ids.items()
+    ])
+
+    # Drop blockers/clusters that no longer exist
+    neighbours.delete_many({"run_id": {"$ne": run_id}})
+    clusters.delete_many({"run_id": {"$ne": run_id}})
+    neighbours.create_index("cluster_id")
+    timings["write_s"] = time.perf_counter() - stage
+
+    return {
+        "blockers": len(ids),
+        "k": int(indices.shape[1]) if len(ids) else 0,
+        "duplicate_pairs": count_duplicate_pairs(indices, scores, threshold),
+        "clusters": len(cluster_ids),
+        "largest_cluster": max((len(members[r]) for r in cluster_ids), default=0),
+        **{name: round(seconds, 3) for name, seconds in timings.items()},
+        "total_s": round(time.perf_counter() - started, 3),
+        "run_id": run_id,
+    }
+
+
+def _to_match_result(doc: Dict, limit: int, threshold: float) -> MatchResult:
+    candidates = [{n["id"]: n["score"]} for n in doc.get("neighbours", [])[:limit]]
+    best = doc["neighbours"][0] if doc.get("neighbours") else None
+    matched = {best["id"]: best["score"]} if best and best["score"] >= threshold else None
+    return MatchResult(matched_blocker=matched, candidates=candidates)
+
+
+def get_match_results(blocker_ids: List[str], limit: int = 5,
+                      threshold: float = BLOCKER_DUPLICATE_THRESHOLD) -> Dict[str, MatchResult]:
+    """
+    Precomputed duplicate matches for several blockers in one query.
+
+    Returns:
+        blocker id -> MatchResult (blockers the job hasn't seen yet are left out)
+    """
+    if not blocker_ids:
+        return {}
+    cursor = get_collection(NEIGHBOURS_COLLECTION).find({"_id": {"$in": list(blocker_ids)}}, {"neighbours": 1})
+    return {doc["_id"]: _to_match_result(doc, limit, threshold) for doc in cursor}
+
+
+def get_match_result(blocker_id: str, limit: int = 5,
+                     threshold: float = BLOCKER_DUPLICATE_THRESHOLD) -> Optional[MatchResult]:
+    """
+    Precomputed duplicate match for a blocker.
+
+    Returns:
+        MatchResult with matched_blocker ({id: score} of the closest blocker if it is a
+        duplicate) and candidates (the closest `limit` blockers), or None if not computed yet
+    """
+    return get_match_results([blocker_id], limit, threshold).get(blocker_id)
+
+
+def get_cluster(cluster_id: str) -> List[str]:
+    """Blocker ids in a duplicate cluster."""
+    doc = get_collection(CLUSTERS_COLLECTION).find_one({"_id": cluster_id})
+    return doc["members"] if doc else []
@@ -0,0 +1,273 @@
+"""
+Selectable CPU inference backends for the embedding model.
+
+EMBEDDING_MODEL is a spec of the form "<model name>[:<backend>]", e.g.
+    all-MiniLM-L6-v2            -> PyTorch (reference)
+    all-MiniLM-L6-v2:int8       -> PyTorch with int8 dynamically-quantized Linear layers
+    all-MiniLM-L6-v2:onnx       -> ONNX Runtime, fp32
+    all-MiniLM-L6-v2:onnx-int8  -> ONNX Runtime, int8 dynamically-quantized
+
+Every backend exposes the same encode() as SentenceTransformer (str -> 1D array,
+list -> 2D array), so callers don't care which one is loaded.
+
+The ONNX backends need the packages in requirements-onnx.txt;
+check_backend_dependencies() reports missing ones at startup.
+"""
+import importlib.util
+import json
+import os
+from abc import ABC, abstractmethod
+from functools import lru_cache
+from pathlib import Path
+from typing import Callable, Dict, List, Tuple, Union
+
+import numpy as np
+
+DEFAULT_BACKEND = "torch"
+
+
+def parse_model_spec(spec: str) -> Tuple[str, str]:
+    """Split 'name:backend' into (name, backend); backend defaults to torch."""
+    if ":" in spec:
+        name, backend = spec.rsplit(":", 1)
+        return name, backend.lower()
+    return spec, DEFAULT_BACKEND
+
+
+def _hf_model_id(model_name: str) -> str:
+    # SentenceTransformer accepts short names; transformers needs the full hub id
+    return model_name if "/" in model_name else f"sentence-transformers/{model_name}"
+
+
+def _max_seq_length(model_id: str, tokenizer) -> int:
+    """
+    Word pieces the model reads before truncating: max_seq_length from its
+    sentence_bert_config.json (what SentenceTransformer uses), else the smaller of
+    the tokenizer's and the position embeddings' limits.
+    """
+    try:
+        from huggingface_hub import hf_hub_download
+        with open(hf_hub_download(model_id, "sentence_bert_config.json")) as f:
+            return int(json.load(f)["max_seq_length"])
+    except Exception:
+        from transformers import AutoConfig
+        return min(tokenizer.model_max_length, AutoConfig.from_pretrained(model_id).max_position_embeddings)
+
+
+class EmbeddingBackend(ABC):
+    """Common interface for embedding backends."""
+
+    name = "base"
+    requires: Tuple[str, ...] = ()  # Importable packages the backend needs
+
+    def __init__(self, model_name: str):
+        self.model_name = model_name
+
+    @abstractmethod
+    def encode_batch(self, texts: List[str], batch_size: int = 32) -> np.ndarray:
+        """Embed a list of strings into a 2D array (one row per text)."""
+
+    def encode(self, texts: Union[str, List[str]], batch_size: int = 32) -> np.ndarray:
+        """Embed a string (returns 1D array) or a list of strings (returns 2D array)."""
+        if isinstance(texts, str):
+            return self.encode_batch([texts], batch_size)[0]
+        return self.encode_batch(list(texts), batch_size)
+
+    def memory_bytes(self) -> int:
+        """Approximate resident size of the model weights."""
+        return 0
+
+
+def _torch_module_bytes(module) -> int:
+    total = 0
+    for value in module.state_dict().values():
+        # Quantized Linear layers store (weight, bias) tuples of packed params
+        tensors = value if isinstance(value, tuple) else (value,)
+        for t in tensors:
+            if hasattr(t, "element_size"):
+                total += t.numel() * t.element_size()
+    return total
+
+
+class TorchBackend(EmbeddingBackend):
+    """Reference SentenceTransformer model on PyTorch."""
+
+    name = "torch"
+    requires = ("torch", "sentence_transformers")
+
+    def __init__(self, model_name: str):
+        super().__init__(model_name)
+        from sentence_transformers import SentenceTransformer
+        self.model = SentenceTransformer(model_name, device="cpu")
+
+    def encode_batch(self, texts: List[str], batch_size: int = 32) -> np.ndarray:
+        return self.model.encode(texts, batch_size=batch_size)
+
+    def memory_bytes(self) -> int:
+        return _torch_module_bytes(self.model)
+
+
+class QuantizedTorchBackend(TorchBackend):
+    """SentenceTransformer with Linear layers dynamically quantized to int8."""
+
+    name = "int8"
+
+    def __init__(self, model_name: str):
+        super().__init__(model_name)
+        import torch
+        self.model = torch.quantization.quantize_dynamic(self.model, {torch.nn.Linear}, dtype=torch.qint8)
+
+
+class OnnxBackend(EmbeddingBackend):
+    """
+    Transformer exported to ONNX and run with ONNX Runtime, followed by the same
+    mean pooling + L2 normalisation as the SentenceTransformer pipeline.
+
+    The export (and int8 quantization) happens once and is cached on disk, so
+    later starts only need onnxruntime and the tokenizer.
+    """
+
+    name = "onnx"
+    requires = ("onnxruntime", "transformers")
+    quantized = False
+
+    def __init__(self, model_name: str):
+        super().__init__(model_name)
+        import onnxruntime as ort
+        from transformers import AutoTokenizer
+        from config.settings import EMBEDDING_CACHE_DIR, EMBEDDING_INTRA_OP_THREADS, EMBEDDING_TOKENIZER_CACHE_SIZE
+
+        self.tokenizer = AutoTokenizer.from_pretrained(_hf_model_id(model_name))
+        self.max_seq_length = _max_seq_length(_hf_model_id(model_name), self.tokenizer)  # Truncate like SentenceTransformer
+        self.model_path = self._ensure_onnx_model(Path(EMBEDDING_CACHE_DIR))
+
+        options = ort.SessionOptions()
+        options.intra_op_num_threads = EMBEDDING_INTRA_OP_THREADS
+        options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+        self.session = ort.InferenceSession(str(self.model_path), options, providers=["CPUExecutionProvider"])
+        self.input_names = {i.name for i in self.session.get_inputs()}
+
+        # Repeated texts (project names, common phrases) skip tokenization entirely
+        self._tokenize = lru_cache(maxsize=EMBEDDING_TOKENIZER_CACHE_SIZE)(self._tokenize_uncached)
+
+    def _ensure_onnx_model(self, cache_dir: Path) -> Path:
+        safe_name = self.model_name.replace("/", "__")
+        fp32_path = cache_dir / f"{safe_name}.onnx"
+        int8_path = cache_dir / f"{safe_name}.int8.onnx"
+
+        if not fp32_path.exists():
+            print(f"Exporting {self.model_name} to ONNX (one-time)...")
+            self._export(fp32_path)
+
+        if not self.quantized:
+            return fp32_path
+
+        if not int8_path.exists():
+            print(f"Quantizing {self.model_name} to int8 (one-time)...")
+            from onnxruntime.quantization import QuantType, quantize_dynamic
+            quantize_dynamic(str(fp32_path), str(int8_path), weight_type=QuantType.QInt8)
+
+        return int8_path
+
+    def _export(self, path: Path):
+        import torch
+        from transformers import AutoModel
+
+        path.parent.mkdir(parents=True, exist_ok=True)
+        model = AutoModel.from_pretrained(_hf_model_id(self.model_name)).eval()
+        dummy = self.tokenizer(["export sample"], return_tensors="pt")
+        names = ["input_ids", "attention_mask", "token_type_ids"]
+        dynamic_axes = {name: {0: "batch", 1: "sequence"} for name in names}
+        dynamic_axes["last_hidden_state"] = {0: "batch", 1: "sequence"}
+
+        tmp_path = path.with_suffix(".tmp")
+        with torch.no_grad():
+            torch.onnx.export(
+                model,
+                tuple(dummy[name] for name in names),
+                str(tmp_path),
+                input_names=names,
+                output_names=["last_hidden_state"],
+                dynamic_axes=dynamic_axes,
+                opset_version=14,
+            )
+        os.replace(tmp_path, path)
+
+    def _tokenize_uncached(self, text: str) -> Tuple[int, ...]:
+        return tuple(self.tokenizer(text, truncation=True, max_length=self.max_seq_length)["input_ids"])
+
+    def encode_batch(self, texts: List[str], batch_size: int = 32) -> np.ndarray:
+        outputs = []
+        for start in range(0, len(texts), batch_size):
+            outputs.append(self._run(texts[start:start + batch_size]))
+        return np.vstack(outputs) if outputs else np.zeros((0, 0), dtype=np.float32)
+
+    def _run(self, texts: List[str]) -> np.ndarray:
+        token_ids = [self._tokenize(text) for text in texts]
+        max_len = max(len(ids) for ids in token_ids)
+
+        input_ids = np.full((len(texts), max_len), self.tokenizer.pad_token_id, dtype=np.int64)
+        attention_mask = np.zeros((len(texts), max_len), dtype=np.int64)
+        for row, ids in enumerate(token_ids):
+            input_ids[row, :len(ids)] = ids
+            attention_mask[row, :len(ids)] = 1
+
+        feeds = {"input_ids": input_ids, "attention_mask": attention_mask}
+        if "token_type_ids" in self.input_names:
+            feeds["token_type_ids"] = np.zeros_like(input_ids)
+
+        hidden = self.session.run(None, feeds)[0]
+
+        # Mean pooling over real tokens, then L2 normalise (matches the SentenceTransformer pipeline)
+        mask = attention_mask[..., None].astype(np.float32)
+        pooled = (hidden * mask).sum(axis=1) / np.clip(mask.sum(axis=1), 1e-9, None)
+        norms = np.linalg.norm(pooled, axis=1, keepdims=True)
+        return (pooled / np.clip(norms, 1e-12, None)).astype(np.float32)
+
+    def memory_bytes(self) -> int:
+        return self.model_path.stat().st_size
+
+    def tokenizer_cache_info(self):
+        return self._tokenize.cache_info()
+
+
+class QuantizedOnnxBackend(OnnxBackend):
+    """ONNX Runtime model with int8 dynamically-quantized weights."""
+
+    name = "onnx-int8"
+    quantized = True
+
+
+BACKENDS: Dict[str, Callable[[str], EmbeddingBackend]] = {
+    TorchBackend.name: TorchBackend,
+    QuantizedTorchBackend.name: QuantizedTorchBackend,
+    OnnxBackend.name: OnnxBackend,
+    QuantizedOnnxBackend.name: QuantizedOnnxBackend,
+}
+
+
+def register_backend(name: str, factory: Callable[[str], EmbeddingBackend]):
+    """Make a custom backend selectable as '<model>:<name>'."""
+    BACKENDS[name] = factory
+
+
+def check_backend_dependencies(spec: str):
+    """
+    Raise if the backend an EMBEDDING_MODEL spec selects is unknown or its packages
+    aren't installed - cheap (nothing is imported), so call it at startup rather
+    than failing on the first embed.
+    """
+    _, backend = parse_model_spec(spec)
+    if backend not in BACKENDS:
+        raise ValueError(f"Unknown embedding backend '{backend}' (choose from: {', '.join(BACKENDS)})")
+    missing = [name for name in getattr(BACKENDS[backend], "requires", ()) if importlib.util.find_spec(name) is None]
+    if missing:
+        hint = "pip install -r requirements-onnx.txt" if backend.startswith("onnx") else "pip install -r requirements.txt"
+        raise ImportError(f"Embedding backend '{backend}' ({spec}) needs {', '.join(missing)} - {hint}")
+
+
+def load_backend(spec: str) -> EmbeddingBackend:
+    """Load the embedding backend described by an EMBEDDING_MODEL spec."""
+    model_name, backend = parse_model_spec(spec)
+    check_backend_dependencies(spec)
+    return BACKENDS[backend](model_name)
@@ -0,0 +1,347 @@
+"""
+Blue/green re-embedding of the projects index.
+
+A generation is a complete set of vectors from one model, stored in its own field
+(embeddings.<id>) alongside the others. Switching models:
+
+1. create_generation(model)   registers a 'building' generation
+2. build_generation(gen)      embeds every project into the new field at a throttled
+                              rate (resumable; writers keep it current, see embedding_targets)
+3. validate_generation(gen)   coverage, dimensions and retrieval agreement with the
+                              active generation
+4. activate_generation(gen)   atomic compare-and-set of the active generation
+
+Searches read the active generation once per call and take its model, field and
+vector index together, so a query is never compared against another model's
+vectors. The previous generation stays in place - and writers keep it current -
+for rollback until drop_generation removes it.
+"""
+import threading
+import time
+from datetime import datetime, timezone
+from typing import Callable, Dict, List, Optional, Tuple
+
+from pymongo import ReturnDocument, UpdateOne
+
+from database.mongo_client import get_collection
+from database.embeddings_CosineSimilarity import generate_embeddings
+from database.index_meta import (
+    INDEX_META_COLLECTION,
+    LEGACY_GENERATION,
+    Generation,
+    forget_index_version,
+    get_active_generation,
+    get_generations,
+    get_index_state,
+)
+from database.search import search_projects_local
+from config.settings import (
+    GENERATION_BUILD_BATCH_SIZE,
+    GENERATION_BUILD_RATE,
+    GENERATION_MAX_RECALL_DROP,
+    GENERATION_MIN_OVERLAP,
+    GENERATION_VALIDATION_K,
+    GENERATION_VALIDATION_SAMPLE,
+    IS_ATLAS,
+)
+
+
+class GenerationSwitchConflict(RuntimeError):
+    """The active generation changed underneath a switch (another worker switched first)."""
+
+
+def project_text(project: Dict) -> str:
+    """Text that is embedded for a project."""
+    return f"{project['name']} {project['description']}"
+
+
+def _now() -> str:
+    return datetime.now(timezone.utc).isoformat()
+
+
+def _fresh_generations(index: str) -> Dict[str, Generation]:
+    forget_index_version(index)
+    return get_generations(index)
+
+
+def _update_generation(index: str, generation_id: str, **fields):
+    get_collection(INDEX_META_COLLECTION).update_one(
+        {"_id": index},
+        {"$set": {f"generations.{generation_id}.{name}": value for name, value in fields.items()}}
+    )
+    forget_index_version(index)
+
+
+def rollback_generation(index: str = "projects") -> Optional[Generation]:
+    """The most recently retired generation - the one a rollback switches back to (None if there is none)."""
+    generations = _fresh_generations(index)
+    docs = get_index_state(index).get("generations", {})
+    retired = [g for g in generations.values() if g.status == "retired"]
+    if not retired:
+        return None
+    return max(retired, key=lambda g: docs.get(g.id, {}).get("retired_at", ""))
+
+
+def embedding_targets(index: str = "projects") -> List[Generation]:
+    """
+    Generations that writers must keep current: the active one, any being built or
+    awaiting activation, and the rollback generation (until drop_generation), so
+    switching back never finds missing or stale vectors. Anything that
+    (re-)embeds a project writes every target.
+    """
+    generations = _fresh_generations(index)
+    targets = [g for g in generations.values() if g.status in ("active", "building", "ready")]
+    previous = rollback_generation(index)
+    if previous is not None:
+        targets.append(previous)
+    return targets
+
+
+def create_generation(model: str, index: str = "projects") -> Generation:
+    """Register a new, empty generation for model (e.g. 'all-MiniLM-L12-v2:onnx')."""
+    dimensions = len(generate_embeddings(["dimension probe"], model=model)[0])
+
+    meta = get_collection(INDEX_META_COLLECTION)
+    meta.update_one({"_id": index}, {"$setOnInsert": {"version": 0}}, upsert=True)
+    counter = meta.find_one_and_update(
+        {"_id": index}, {"$inc": {"generation_counter": 1}}, return_document=ReturnDocument.AFTER
+    )["generation_counter"]
+
+    generation_id = f"g{counter}"
+    generation = Generation(
+        id=generation_id,
+        model=model,
+        field=f"embeddings.{generation_id}",
+        dimensions=dimensions,
+        vector_index=f"vector_index_{generation_id}",
+        status="building",
+    )
+    meta.update_one(
+        {"_id": index},
+        {"$set": {f"generations.{generation_id}": {**generation.to_doc(), "created_at": _now()}}}
+    )
+    forget_index_version(index)
+    return generation
+
+
+def build_generation(generation: Generation, index: str = "projects", rate: float = GENERATION_BUILD_RATE,
+                     batch_size: int = GENERATION_BUILD_BATCH_SIZE, stop_event: Optional[threading.Event] = None,
+                     progress: Optional[Callable[[int, int], None]] = None) -> Dict:
+    """
+    Embed every project that lacks this generation's vector.
+
+    Resumable (only missing vectors are computed) and throttled to `rate`
+    documents per second so a rebuild doesn't starve interactive embedding.
+    Marks the generation 'ready' when nothing is missing.
+
+    Returns:
+        Build stats (embedded, total, seconds, completed)
+    """
+    projects = get_collection(index)
+    total = projects.count_documents({})
+    missing_filter = {generation.field: {"$exists": False}}
+    started = time.monotonic()
+    embedded = 0
+
+    while not (stop_event and stop_event.is_set()):
+        batch = list(projects.find(missing_filter, {"_id": 1, "name": 1, "description": 1}).limit(batch_size))
+        if not batch:
+            break
+
+        vectors = generate_embeddings([project_text(p) for p in batch], model=generation.model)
+        projects.bulk_write(
+            [UpdateOne({"_id": p["_id"]}, {"$set": {generation.field: v}}) for p, v in zip(batch, vectors)],
+            ordered=False
+        )
+        embedded += len(batch)
+        _update_generation(index, generation.id, built=total - projects.count_documents(missing_filter), total=total)
+        if progress:
+            progress(embedded, total)
+
+        if rate:
+            wait = started + embedded / rate - time.monotonic()
+            if wait > 0:
+                if stop_event:
+                    stop_event.wait(wait)
+                else:
+                    time.sleep(wait)
+
+    completed = projects.count_documents(missing_filter) == 0
+    if completed and generation.status == "building":
+        _update_generation(index, generation.id, status="ready", built_at=_now())
+    return {"embedded": embedded, "total": total, "seconds": round(time.monotonic() - started, 2), "completed": completed}
+
+
+def start_background_build(generation: Generation, index: str = "projects",
+                           rate: float = GENERATION_BUILD_RATE) -> Tuple[threading.Thread, threading.Event]:
+    """Run build_generation on a daemon thread; set the returned event to stop it (it can resume later)."""
+    stop_event = threading.Event()
+    thread = threading.Thread(
+        target=build_generation,
+        args=(generation, index, rate),
+        kwargs={"stop_event": stop_event},
+        name=f"build-{generation.id}",
+        daemon=True,
+    )
+    thread.start()
+    return thread, stop_event
+
+
+def validate_generation(candidate: Generation, index: str = "projects", sample: int = GENERATION_VALIDATION_SAMPLE,
+                        k: int = GENERATION_VALIDATION_K) -> Dict:
+    """
+    Check a generation against the active one before switching to it.
+
+    - coverage: every project has a vector of the right dimension
+    - agreement: mean overlap of top-k results for project names as queries
+    - quality: recall@1 (the named project ranks first) must not drop
+
+    The report is stored on the generation and returned, with 'passed'.
+    """
+    projects = get_collection(index)
+    active = get_active_generation(index)
+    total = projects.count_documents({})
+    missing = projects.count_documents({candidate.field: {"$exists": False}})
+
+    probe = projects.find_one({candidate.field: {"$exists": True}}, {candidate.field: 1})
+    stored = probe
+    for part in candidate.field.split("."):
+        stored = stored.get(part) if isinstance(stored, dict) else None
+    dimensions_ok = stored is not None and len(stored) == candidate.dimensions
+
+    samples = list(projects.find({}, {"_id": 0, "id": 1, "name": 1}).sort("id", 1).limit(sample))
+    active_covered = projects.count_documents({active.field: {"$exists": True}}) > 0
+    overlaps, old_hits, new_hits = [], 0, 0
+    for project in samples:
+        new = [r["id"] for r in search_projects_local(project["name"], k, generation=candidate)]
+        new_hits += bool(new) and new[0] == project["id"]
+        if active_covered:
+            old = [r["id"] for r in search_projects_local(project["name"], k, generation=active)]
+            old_hits += bool(old) and old[0] == project["id"]
+            overlaps.append(len(set(old) & set(new)) / max(1, min(k, len(old))))
+
+    recall_new = new_hits / len(samples) if samples else None
+    recall_old = old_hits / len(samples) if samples and active_covered else None
+    mean_overlap = sum(overlaps) / len(overlaps) if overlaps else None
+
+    passed = (
+        missing == 0 and dimensions_ok
+        and (mean_overlap is None or mean_overlap >= GENERATION_MIN_OVERLAP)
+        and (recall_old is None or (recall_new or 0.0) >= recall_old - GENERATION_MAX_RECALL_DROP)
+    )
+    report = {
+        "against": active.id,
+        "total": total,
+        "missing": missing,
+        "dimensions_ok": dimensions_ok,
+        "mean_overlap": mean_overlap,
+        "recall_at_1": recall_new,
+        "active_recall_at_1": recall_old,
+        "passed": passed,
+        "validated_at": _now(),
+    }
+    _update_generation(index, candidate.id, validation=report)
+    return report
+
+
+def _atlas_index_queryable(generation: Generation, index: str) -> bool:
+    indexes = list(get_collection(index).list_search_indexes(generation.vector_index))
+    return any(i.get("queryable") for i in indexes)
+
+
+def activate_generation(generation_id: str, index: str = "projects", expected_active: Optional[str] = None,
+                        force: bool = False) -> Generation:
+    """
+    Atomically make generation_id the active generation.
+
+    The switch is a compare-and-set on the active generation id, so two workers
+    racing to switch can't both win; the loser gets GenerationSwitchConflict.
+    Switching back to a retired generation (rollback) works the same way.
+
+    Args:
+        generation_id: Generation to activate
+        expected_active: Generation that must currently be active (default: whatever is active now)
+        force: Skip the validation / Atlas index checks (coverage is always checked)
+
+    A generation that is still building can't be activated; one that is ready
+    needs a passed validation unless forced. Retired generations were validated
+    before their first activation and writers kept them current since.
+    """
+    generations = _fresh_generations(index)
+    if generation_id not in generations:
+        raise ValueError(f"Unknown generation '{generation_id}' for index '{index}'")
+    target = generations[generation_id]
+    current = get_active_generation(index)
+    expected = expected_active or current.id
+    if target.id == current.id:
+        return current
+    if target.status == "building":
+        raise ValueError(f"Generation {target.id} is still building - finish build_generation first")
+
+    projects = get_collection(index)
+    missing = projects.count_documents({target.field: {"$exists": False}})
+    if missing:
+        raise ValueError(f"Generation {target.id} is missing {missing} vectors - finish build_generation first")
+    if not force:
+        state = get_collection(INDEX_META_COLLECTION).find_one({"_id": index}) or {}
+        validation = state.get("generations", {}).get(target.id, {}).get("validation")
+        if target.status != "retired" and not (validation and validation["passed"]):
+            raise ValueError(f"Generation {target.id} has not passed validation (validate_generation)")
+        if IS_ATLAS and not _atlas_index_queryable(target, index):
+            raise ValueError(f"Atlas vector index '{target.vector_index}' on '{target.field}' is not queryable yet")
+
+    if expected == LEGACY_GENERATION.id:
+        flt = {"_id": index, "$or": [{"active_generation": {"$exists": False}},
+                                     {"active_generation": LEGACY_GENERATION.id}]}
+    else:
+        flt = {"_id": index, "active_generation": expected}
+
+    update = {
+        "active_generation": target.id,
+        f"generations.{target.id}.status": "active",
+        f"generations.{target.id}.activated_at": _now(),
+    }
+    update[f"generations.{current.id}.status"] = "retired"
+    update[f"generations.{current.id}.retired_at"] = _now()
+
+    meta = get_collection(INDEX_META_COLLECTION)
+    meta.update_one({"_id": index}, {"$setOnInsert": {"version": 0}}, upsert=True)
+    doc = meta.find_one_and_update(flt, {"$set": update, "$inc": {"version": 1}}, return_document=ReturnDocument.AFTER)
+    forget_index_version(index)
+    if doc is None:
+        raise GenerationSwitchConflict(f"Active generation of '{index}' is no longer '{expected}'")
+    return get_active_generation(index)
+
+
+def drop_generation(generation_id: str, index: str = "projects"):
+    """Delete a retired generation's vectors and its registry entry (no rollback to it afterwards)."""
+    generations = _fresh_generations(index)
+    if generation_id not in generations:
+        raise ValueError(f"Unknown generation '{generation_id}' for index '{index}'")
+    generation = generations[generation_id]
+    if generation.id == get_active_generation(index).id:
+        raise ValueError(f"Generation {generation.id} is active - activate another one first")
+
+    get_collection(index).update_many({generation.field: {"$exists": True}}, {"$unset": {generation.field: ""}})
+    get_collection(INDEX_META_COLLECTION).update_one(
+        {"_id": index}, {"$unset": {f"generations.{generation.id}": ""}}
+    )
+    forget_index_version(index)
+
+
+def generation_status(index: str = "projects") -> List[Dict]:
+    """Every generation with its build progress and last validation, for display."""
+    state = get_collection(INDEX_META_COLLECTION).find_one({"_id": index}) or {}
+    rows = []
+    for generation in _fresh_generations(index).values():
+        doc = state.get("generations", {}).get(generation.id, {})
+        rows.append({
+            "id": generation.id,
+            "model": generation.model,
+            "field": generation.field,
+            "status": generation.status,
+            "built": doc.get("built"),
+            "total": doc.get("total"),
+            "validation": doc.get("validation"),
+        })
+    return rows
@@ -0,0 +1,182 @@
+import queue
+import threading
+import time
+from concurrent.futures import Future
+from typing import Callable, Dict, List, Optional
+
+_torch_threads_lock = threading.Lock()
+_torch_threads_set = False
+
+
+def set_torch_threads(threads: Optional[int]):
+    """
+    Set torch's intra-op thread count for the process (once; later calls are no-ops).
+
+    torch.set_num_threads is process-wide, so it can't be a per-service setting:
+    every service's worker shares the one pool. No-op without torch.
+    """
+    global _torch_threads_set
+    if not threads:
+        return
+    with _torch_threads_lock:
+        if _torch_threads_set:
+            return
+        _torch_threads_set = True
+        try:
+            import torch
+        except ImportError:
+            return
+        torch.set_num_threads(threads)
+
+
+class EmbeddingService:
+    """
+    Gathers concurrent embedding requests into micro-batches and encodes them
+    on a single dedicated worker thread.
+
+    A batch is flushed as soon as it holds max_batch_size texts, or max_wait_ms
+    after its first text arrived - whichever comes first. Keeping all encoding on
+    one worker stops concurrent sessions from fighting over the GIL/torch thread
+    pool (whose size is set once per process, see set_torch_threads).
+    """
+
+    def __init__(
+        self,
+        encode_batch: Callable[[List[str]], List[List[float]]],
+        max_batch_size: int = 32,
+        max_wait_ms: float = 5.0,
+    ):
+        """
+        Args:
+            encode_batch: Function that embeds a list of texts in one call
+            max_batch_size: Max texts encoded together
+            max_wait_ms: Max time the first text of a batch waits for company
+        """
+        self.encode_batch = encode_batch
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait_ms / 1000.0
+
+        self._queue: "queue.Queue[tuple]" = queue.Queue()
+        self._stats_lock = threading.Lock()
+        self._stopped = threading.Event()
+        # Guards _closed and queueing, so nothing can be queued behind the shutdown sentinel
+        self._submit_lock = threading.Lock()
+        self._closed = False
+
+        # Metrics
+        self.requests = 0
+        self.batches = 0
+        self.max_queue_depth = 0
+        self.total_queue_wait = 0.0
+        self.total_encode_time = 0.0
+        self.batch_size_counts: Dict[int, int] = {}
+
+        self._worker = threading.Thread(target=self._run, name="embedding-worker", daemon=True)
+        self._worker.start()
+
+    def submit(self, text: str) -> Future:
+        """Queue a text for embedding; the future resolves to its vector."""
+        future: Future = Future()
+        with self._submit_lock:
+            if self._closed:
+                raise RuntimeError("EmbeddingService has been shut down")
+            self._queue.put((text, future, time.monotonic()))
+
+        with self._stats_lock:
+            self.requests += 1
+            self.max_queue_depth = max(self.max_queue_depth, self._queue.qsize())
+
+        return future
+
+    def embed(self, text: str, timeout: Optional[float] = None) -> List[float]:
+        """Embed a single text, blocking until its batch has been encoded."""
+        return self.submit(text).result(timeout=timeout)
+
+    def embed_many(self, texts: List[str], timeout: Optional[float] = None) -> List[List[float]]:
+        """Embed several texts; they can share batches with other callers."""
+        futures = [self.submit(text) for text in texts]
+        return [f.result(timeout=timeout) for f in futures]
+
+    def _collect_batch(self) -> List[tuple]:
+        # Block for the first item, then gather more until full or the wait window closes
+        first = self._queue.get()
+        if first is None:
+            return []
+
+        batch = [first]
+        deadline = time.monotonic() + self.max_wait
+        while len(batch) < self.max_batch_size:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                item = self._queue.get(timeout=remaining)
+            except queue.Empty:
+                break
+            if item is None:
+                # Shutdown sentinel - finish this batch, then stop
+                self._stopped.set()
+                break
+            batch.append(item)
+
+        return batch
+
+    def _run(self):
+        while not self._stopped.is_set():
+            batch = self._collect_batch()
+            if not batch:
+                break
+
+            texts = [text for text, _, _ in batch]
+            started = time.monotonic()
+            try:
+                vectors = self.encode_batch(texts)
+            except Exception as e:
+                for _, future, _ in batch:
+                    future.set_exception(e)
+                continue
+            finished = time.monotonic()
+
+            for (_, future, _), vector in zip(batch, vectors):
+                future.set_result(vector)
+
+            with self._stats_lock:
+                self.batches += 1
+                self.total_encode_time += finished - started
+                self.total_queue_wait += sum(started - queued_at for _, _, queued_at in batch)
+                self.batch_size_counts[len(batch)] = self.batch_size_counts.get(len(batch), 0) + 1
+
+        self._fail_pending()
+
+    def _fail_pending(self):
+        # Nothing should be left once the sentinel was reached, but never leave a future unresolved
+        while True:
+            try:
+                item = self._queue.get_nowait()
+            except queue.Empty:
+                return
+            if item is not None:
+                item[1].set_exception(RuntimeError("EmbeddingService has been shut down"))
+
+    def shutdown(self, timeout: Optional[float] = None):
+        """Stop accepting requests; the worker finishes those already queued, then exits."""
+        with self._submit_lock:
+            if not self._closed:
+                self._closed = True
+                self._queue.put(None)
+        self._worker.join(timeout=timeout)
+
+    def stats(self) -> Dict:
+        """Queue-depth and batch-size metrics."""
+        with self._stats_lock:
+            processed = sum(size * count for size, count in self.batch_size_counts.items())
+            return {
+                "queue_depth": self._queue.qsize(),
+                "max_queue_depth": self.max_queue_depth,
+                "requests": self.requests,
+                "batches": self.batches,
+                "avg_batch_size": (processed / self.batches) if self.batches else None,
+                "batch_size_counts": dict(sorted(self.batch_size_counts.items())),
+                "avg_queue_wait_ms": (self.total_queue_wait / processed * 1000) if processed else None,
+                "avg_encode_ms": (self.total_encode_time / self.batches * 1000) if self.batches else None,
+            }
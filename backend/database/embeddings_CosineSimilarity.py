@@ -1,27 +1,86 @@
-from sentence_transformers import SentenceTransformer
-from config.settings import EMBEDDING_MODEL
+from config.settings import EMBEDDING_MODEL, EMBEDDING_BATCHING_ENABLED
+from config.settings import EMBEDDING_MAX_BATCH_SIZE, EMBEDDING_MAX_WAIT_MS, EMBEDDING_INTRA_OP_THREADS
+from database.embedding_service import EmbeddingService, set_torch_threads
+from database.embedding_backends import load_backend
 import numpy as np
-from typing import List
+import threading
+from functools import partial
+from concurrent.futures import TimeoutError as FutureTimeoutError
+from typing import Dict, List, Optional
+from utils.turn_budget import BudgetExceeded
 
-# Global model instance (lazy loaded)
-_model = None
+# Loaded models and their micro-batching services, by model spec (lazy). Usually
+# just EMBEDDING_MODEL; a second one while a new index generation is being built.
+_models: Dict[str, object] = {}
+_services: Dict[str, EmbeddingService] = {}
+_lock = threading.Lock()
 
 
-def get_embedding_model():
-    #Get or load embedding model (lazy loading).
-    global _model
-    if _model is None:
-        print("Loading embedding model (this may take a moment on first run)...")
-        _model = SentenceTransformer(EMBEDDING_MODEL)
-        print("Model loaded!")
-    return _model
+class ModelVector(list):
+    """An embedding that remembers which model produced it (so it is never compared across models)."""
 
+    def __init__(self, values, model: str):
+        super().__init__(values)
+        self.model = model
 
-def generate_embedding(text: str) -> List[float]:
-    #Generate embedding vector for a text string.
-    model = get_embedding_model()
-    embedding = model.encode(text)
-    return embedding.tolist()
+
+def get_embedding_model(model: Optional[str] = None):
+    #Get or load embedding model (lazy loading); model is a spec like EMBEDDING_MODEL (the default).
+    spec = model or EMBEDDING_MODEL
+    if spec not in _models:
+        with _lock:
+            if spec not in _models:
+                print("Loading embedding model (this may take a moment on first run)...")
+                # The spec picks the backend too (e.g. 'all-MiniLM-L6-v2:onnx-int8')
+                _models[spec] = load_backend(spec)
+                print(f"Model loaded! ({spec})")
+    return _models[spec]
+
+
+def _encode_batch(spec: str, texts: List[str]) -> List[List[float]]:
+    model = get_embedding_model(spec)
+    embeddings = model.encode(texts, batch_size=len(texts))
+    return embeddings.tolist()
+
+
+def get_embedding_service(model: Optional[str] = None) -> EmbeddingService:
+    #Get or start the shared micro-batching embedding service for a model.
+    spec = model or EMBEDDING_MODEL
+    if spec not in _services:
+        with _lock:
+            if spec not in _services:
+                set_torch_threads(EMBEDDING_INTRA_OP_THREADS)  # Process-wide, shared by every service
+                _services[spec] = EmbeddingService(
+                    partial(_encode_batch, spec),
+                    max_batch_size=EMBEDDING_MAX_BATCH_SIZE,
+                    max_wait_ms=EMBEDDING_MAX_WAIT_MS,
+                )
+    return _services[spec]
+
+
+def generate_embedding(text: str, timeout: Optional[float] = None, model: Optional[str] = None) -> ModelVector:
+    #Generate embedding vector for a text string (timeout only applies to the batching queue).
+    spec = model or EMBEDDING_MODEL
+    if EMBEDDING_BATCHING_ENABLED:
+        # Concurrent callers share batches on the dedicated worker
+        try:
+            return ModelVector(get_embedding_service(spec).embed(text, timeout=timeout), spec)
+        except FutureTimeoutError:
+            raise BudgetExceeded("deadline")
+
+    embedding = get_embedding_model(spec).encode(text)
+    return ModelVector(embedding.tolist(), spec)
+
+
+def generate_embeddings(texts: List[str], model: Optional[str] = None) -> List[List[float]]:
+    #Generate embedding vectors for many texts at once (backfills, ingestion).
+    if not texts:
+        return []
+    spec = model or EMBEDDING_MODEL
+    if EMBEDDING_BATCHING_ENABLED:
+        return get_embedding_service(spec).embed_many(texts)
+
+    return get_embedding_model(spec).encode(texts, batch_size=EMBEDDING_MAX_BATCH_SIZE).tolist()
 
 
 def cosine_similarity(vec1: List[float], vec2: List[float]) -> float:
@@ -0,0 +1,131 @@
+import threading
+import time
+from dataclasses import asdict, dataclass
+from typing import Dict, Optional
+
+from pymongo import ReturnDocument
+
+from database.mongo_client import get_collection
+from config.settings import EMBEDDING_DIMENSIONS, EMBEDDING_MODEL, INDEX_VERSION_CHECK_INTERVAL
+
+# One document per searchable index, e.g.
+# {"_id": "projects", "version": 7, "active_generation": "g2",
+#  "generations": {"g2": {"model": "all-MiniLM-L12-v2", "field": "embeddings.g2", ...}, ...}}
+INDEX_META_COLLECTION = "index_meta"
+
+_states = {}  # index name -> (meta doc, checked_at)
+_lock = threading.Lock()
+
+
+@dataclass(frozen=True)
+class Generation:
+    """One complete set of embeddings for an index: which model made them and where they are stored."""
+    id: str
+    model: str  # Embedding model spec, e.g. 'all-MiniLM-L6-v2:onnx'
+    field: str  # Document field holding the vectors
+    dimensions: int
+    vector_index: str  # Atlas vector search index over field
+    status: str = "active"  # building | ready | active | retired
+
+    @classmethod
+    def from_doc(cls, generation_id: str, doc: Dict) -> "Generation":
+        return cls(
+            id=generation_id,
+            model=doc["model"],
+            field=doc["field"],
+            dimensions=doc["dimensions"],
+            vector_index=doc["vector_index"],
+            status=doc.get("status", "ready"),
+        )
+
+    def to_doc(self) -> Dict:
+        doc = asdict(self)
+        doc.pop("id")
+        return doc
+
+
+# Embeddings written before generations existed: the single 'embedding' field.
+# Recorded in index_meta the first time an index is read; from then on the stored
+# model spec is used, so changing EMBEDDING_MODEL can't change what those vectors mean
+LEGACY_GENERATION = Generation(
+    id="legacy",
+    model=EMBEDDING_MODEL,
+    field="embedding",
+    dimensions=EMBEDDING_DIMENSIONS,
+    vector_index="vector_index",
+)
+
+
+def _record_legacy_generation(index: str) -> Dict:
+    """Store the legacy generation's spec (first writer wins) and return the fresh meta doc."""
+    meta = get_collection(INDEX_META_COLLECTION)
+    meta.update_one({"_id": index}, {"$setOnInsert": {"version": 0}}, upsert=True)
+    meta.update_one(
+        {"_id": index, "active_generation": {"$exists": False},
+         f"generations.{LEGACY_GENERATION.id}": {"$exists": False}},
+        {"$set": {f"generations.{LEGACY_GENERATION.id}": LEGACY_GENERATION.to_doc()}}
+    )
+    return meta.find_one({"_id": index}) or {}
+
+
+def get_index_state(index: str = "projects") -> Dict:
+    """
+    The index's metadata document ({} if it has none yet).
+
+    Read from Mongo at most once every INDEX_VERSION_CHECK_INTERVAL seconds per
+    process, so calling it on every search is cheap.
+    """
+    now = time.monotonic()
+    with _lock:
+        cached = _states.get(index)
+        if cached and now - cached[1] < INDEX_VERSION_CHECK_INTERVAL:
+            return cached[0]
+
+    doc = get_collection(INDEX_META_COLLECTION).find_one({"_id": index}) or {}
+    if not doc.get("active_generation") and LEGACY_GENERATION.id not in doc.get("generations", {}):
+        doc = _record_legacy_generation(index)
+
+    with _lock:
+        _states[index] = (doc, now)
+    return doc
+
+
+def get_index_version(index: str = "projects") -> int:
+    """Current version of a search index (changes whenever its contents or active generation do)."""
+    return get_index_state(index).get("version", 0)
+
+
+def get_active_generation(index: str = "projects") -> Generation:
+    """The generation searches should use - model, field and vector index always come from the same one."""
+    state = get_index_state(index)
+    active = state.get("active_generation") or LEGACY_GENERATION.id
+    return Generation.from_doc(active, state["generations"][active])
+
+
+def get_generations(index: str = "projects") -> Dict[str, Generation]:
+    """Every known generation of an index, by id (the legacy one until it is dropped)."""
+    state = get_index_state(index)
+    return {gid: Generation.from_doc(gid, doc) for gid, doc in state.get("generations", {}).items()}
+
+
+def bump_index_version(index: str = "projects") -> int:
+    """Mark an index as changed (call after writing embeddings); returns the new version."""
+    doc = get_collection(INDEX_META_COLLECTION).find_one_and_update(
+        {"_id": index},
+        {"$inc": {"version": 1}},
+        upsert=True,
+        return_document=ReturnDocument.AFTER,
+    )
+
+    with _lock:
+        _states[index] = (doc, time.monotonic())
+    return doc["version"]
+
+
+def forget_index_version(index: Optional[str] = None):
+    """Drop the locally cached state(s) so the next read goes to Mongo."""
+    with _lock:
+        if index is None:
+            _states.clear()
+        else:
+            _states.pop(index, None)
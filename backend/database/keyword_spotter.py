@@ -0,0 +1,227 @@
+import hashlib
+import re
+import threading
+import time
+from collections import deque
+from typing import Dict, List, Optional, Set, Tuple
+
+from database.mongo_client import get_collection
+from models.mongo_schema.KeyWords_Schema import KeywordsData
+from config.settings import KEYWORD_REFRESH_INTERVAL
+
+NON_WORD = re.compile(r"[^a-z0-9]+")
+
+
+def normalize_term(text: str) -> str:
+    """Lowercase and treat '-', '_' and other punctuation as spaces ('sentiment-widget' == 'Sentiment Widget')."""
+    return NON_WORD.sub(" ", text.lower()).strip()
+
+
+class AhoCorasick:
+    """
+    Multi-pattern matcher: finds every pattern occurring in a text in one linear pass.
+
+    Add the patterns, then build() computes the failure links (one BFS over the
+    trie). An automaton is not changed once it is searched concurrently -
+    KeywordSpotter compiles a new one and swaps it in instead.
+    """
+
+    def __init__(self):
+        self.goto: List[Dict[str, int]] = [{}]
+        self.fail: List[int] = [0]
+        self.output: List[Optional[str]] = [None]  # Pattern ending at this node
+        self.dict_link: List[int] = [0]  # Nearest node on the fail chain with an output (0 = none)
+        self._dirty = False
+
+    def __len__(self) -> int:
+        return sum(1 for o in self.output if o is not None)
+
+    def add(self, pattern: str):
+        node = 0
+        for ch in pattern:
+            nxt = self.goto[node].get(ch)
+            if nxt is None:
+                nxt = len(self.goto)
+                self.goto.append({})
+                self.fail.append(0)
+                self.output.append(None)
+                self.dict_link.append(0)
+                self.goto[node][ch] = nxt
+                self._dirty = True
+            node = nxt
+        if self.output[node] is None:
+            self._dirty = True  # dict_links must learn about the new terminal
+        self.output[node] = pattern
+
+    def build(self):
+        """(Re)compute failure and dictionary-suffix links."""
+        queue = deque()
+        for child in self.goto[0].values():
+            self.fail[child] = 0
+            self.dict_link[child] = 0
+            queue.append(child)
+
+        while queue:
+            node = queue.popleft()
+            for ch, child in self.goto[node].items():
+                f = self.fail[node]
+                while f and ch not in self.goto[f]:
+                    f = self.fail[f]
+                target = self.goto[f].get(ch, 0)
+                self.fail[child] = target if target != child else 0
+                self.dict_link[child] = self.fail[child] if self.output[self.fail[child]] is not None \
+                    else self.dict_link[self.fail[child]]
+                queue.append(child)
+
+        self._dirty = False
+
+    def search(self, text: str) -> List[Tuple[int, str]]:
+        """All (end index, pattern) occurrences in text."""
+        if self._dirty:
+            self.build()
+
+        hits = []
+        node = 0
+        for i, ch in enumerate(text):
+            while node and ch not in self.goto[node]:
+                node = self.fail[node]
+            node = self.goto[node].get(ch, 0)
+
+            candidate = node if self.output[node] is not None else self.dict_link[node]
+            while candidate:
+                if self.output[candidate] is not None:
+                    hits.append((i, self.output[candidate]))
+                candidate = self.dict_link[candidate]
+        return hits
+
+
+class KeywordSpotter:
+    """
+    Finds known component names from the keywords collection in free text.
+
+    Keywords are re-read from Mongo at most every KEYWORD_REFRESH_INTERVAL seconds.
+    Only the first load happens inline; later refreshes run on a background
+    thread, so spotting never waits on Mongo or a rebuild. When the set of
+    keywords changed, a fresh automaton is compiled off to the side and swapped
+    in with one assignment - readers see the old one or the new one, never a
+    half-linked trie. (A full compile of a few hundred component names takes
+    milliseconds, so it isn't worth relinking failure states incrementally.)
+    """
+
+    def __init__(self):
+        empty = AhoCorasick()
+        empty.build()
+        # (automaton, normalized term -> original keywords), replaced as a whole
+        self._compiled: Tuple[AhoCorasick, Dict[str, Set[str]]] = (empty, {})
+        self.keywords: Dict[str, str] = {}  # keyword -> description
+        self.version = ""  # Fingerprint of the keyword set (same across processes, part of result cache keys)
+        self._loaded_at = None
+        self._lock = threading.Lock()  # Serializes updates; reads take _compiled without it
+        self._refresh_lock = threading.Lock()
+
+    @property
+    def automaton(self) -> AhoCorasick:
+        return self._compiled[0]
+
+    def _load_keywords(self) -> Dict[str, str]:
+        keywords = {}
+        for doc in get_collection("keywords").find({}):
+            keywords.update(KeywordsData.from_mongo(doc).keywords)
+        return keywords
+
+    def update(self, keywords: Dict[str, str]):
+        """Apply a new keyword set; recompiles the automaton only if keywords were added or removed."""
+        with self._lock:
+            if keywords.keys() == self.keywords.keys():
+                self.keywords = dict(keywords)  # At most descriptions changed
+                return
+
+            automaton = AhoCorasick()
+            by_normalized: Dict[str, Set[str]] = {}
+            for keyword in keywords:
+                term = normalize_term(keyword)
+                if not term:
+                    continue
+                by_normalized.setdefault(term, set()).add(keyword)
+                automaton.add(term)
+            automaton.build()
+
+            self._compiled = (automaton, by_normalized)
+            self.keywords = dict(keywords)
+            self.version = hashlib.sha1("\n".join(sorted(keywords)).encode("utf-8")).hexdigest()[:12]
+
+    def _reload(self):
+        try:
+            self.update(self._load_keywords())
+        except Exception as e:
+            print(f"⚠️  Could not refresh keywords: {e}")
+
+    def refresh(self, force: bool = False):
+        """
+        Re-read the keywords collection if the refresh interval has passed: inline
+        the first time (or when forced), in the background afterwards.
+        """
+        now = time.monotonic()
+        if not force and self._loaded_at is not None and now - self._loaded_at < KEYWORD_REFRESH_INTERVAL:
+            return
+        with self._refresh_lock:
+            first = self._loaded_at is None
+            if not (force or first) and now - self._loaded_at < KEYWORD_REFRESH_INTERVAL:
+                return  # Another caller just started the refresh
+            self._loaded_at = now
+            if force or first:
+                self._reload()
+                return
+        threading.Thread(target=self._reload, name="keyword-refresh", daemon=True).start()
+
+    def spot(self, text: str) -> List[str]:
+        """
+        Known keywords mentioned in text (whole words only), in order of appearance.
+
+        Returns:
+            Original keyword names, e.g. ['sentiment-widget', 'ml-service']
+        """
+        self.refresh()
+        normalized = f" {normalize_term(text)} "
+        automaton, by_normalized = self._compiled
+
+        hits = automaton.search(normalized)
+        found = []
+        seen = set()
+        for end, term in sorted(hits, key=lambda h: h[0] - len(h[1])):
+            start = end - len(term) + 1
+            # Whole-word matches only ("api" must not match inside "rapid")
+            if normalized[start - 1] != " " or normalized[end + 1] != " ":
+                continue
+            for keyword in sorted(by_normalized.get(term, ())):
+                if keyword not in seen:
+                    seen.add(keyword)
+                    found.append(keyword)
+        return found
+
+    def stats(self) -> Dict:
+        return {
+            "keywords": len(self.keywords),
+            "trie_nodes": len(self.automaton.goto),
+            "version": self.version,
+        }
+
+
+# Global spotter instance (lazy created)
+_spotter = None
+_spotter_lock = threading.Lock()
+
+
+def get_keyword_spotter() -> KeywordSpotter:
+    """Get or create the process-wide keyword spotter."""
+    global _spotter
+    if _spotter is None:
+        with _spotter_lock:
+            if _spotter is None:
+                _spotter = KeywordSpotter()
+    return _spotter
+
+
+def spot_keywords(text: str) -> List[str]:
+    """Known keywords mentioned in text (see KeywordSpotter.spot)."""
+    return get_keyword_spotter().spot(text)
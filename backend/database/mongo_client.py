@@ -23,6 +23,12 @@ def get_database():
     return _db
 
 
+def set_database(db):
+    """Use a different database object (e.g. an in-memory stand-in for offline runs)."""
+    global _db
+    _db = db
+
+
 def get_collection(collection_name: str):
     """
     Get a specific collection by str input
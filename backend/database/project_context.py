@@ -0,0 +1,238 @@
+import re
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from concurrent.futures import TimeoutError as FutureTimeoutError
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional
+
+from database.mongo_client import get_collection
+from database.blocker_neighbours import get_match_results
+from models.mongo_schema.Blockers_Schema import Blocker
+from models.Internal_models.BlockerInternalDataTypes import MatchResult
+from models.mongo_schema.teamMember_Schema import TeamMember
+from models.mongo_schema.ticketingSystem_Schema import Project, Ticket
+from utils.cache import TTLCache
+from utils.turn_budget import BudgetExceeded, check_deadline, remaining_seconds
+from config.settings import (
+    PROJECT_CONTEXT_CACHE_SIZE,
+    PROJECT_CONTEXT_CACHE_TTL,
+    PROJECT_CONTEXT_WORKERS,
+)
+
+# Only the fields the Blocker dataclass knows about (Blocker.from_mongo is strict)
+BLOCKER_PROJECTION = {
+    "_id": 0, "id": 1, "title": 1, "core_issue": 1, "root_cause": 1,
+    "solution": 1, "tags": 1, "resolved_by": 1,
+}
+
+
+@dataclass
+class ProjectContext:
+    """Everything a follow-up question about a project usually needs."""
+    project_id: str
+    project: Optional[Project] = None
+    tickets: List[Ticket] = field(default_factory=list)
+    blockers: List[Blocker] = field(default_factory=list)
+    blocker_matches: Dict[str, MatchResult] = field(default_factory=dict)  # Precomputed duplicates, by blocker id
+    owners: List[TeamMember] = field(default_factory=list)
+    fetched_at: float = 0.0
+
+
+# Shared across sessions: a project's context is the same whoever asks for it
+_cache = TTLCache(PROJECT_CONTEXT_CACHE_SIZE, PROJECT_CONTEXT_CACHE_TTL, name="project_context")
+_executor = ThreadPoolExecutor(max_workers=PROJECT_CONTEXT_WORKERS, thread_name_prefix="ctx-prefetch")
+_inflight: Dict[str, Future] = {}
+_inflight_lock = threading.Lock()
+
+
+def get_project(project_id: str) -> Optional[Project]:
+    """Fetch a project (with its milestones) by id."""
+    doc = get_collection("projects").find_one({"id": project_id}, {"_id": 0, "embedding": 0, "embeddings": 0})
+    return Project.from_mongo(doc) if doc else None
+
+
+def get_tickets_for_project(project_id: str) -> List[Ticket]:
+    """Fetch all tickets linked to a project_id."""
+    # Ingested tickets carry an embedding - not needed for context
+    cursor = get_collection("tickets").find({"project_id": project_id}, {"_id": 0, "embedding": 0, "embeddings": 0})
+    return [Ticket.from_mongo(doc) for doc in cursor]
+
+
+def get_blockers_for_project(project_id: str) -> List[Blocker]:
+    """Fetch blockers linked to a project, either directly or through a tag."""
+    cursor = get_collection("blockers").find(
+        {"$or": [{"project_id": project_id}, {"tags": project_id}]},
+        BLOCKER_PROJECTION
+    )
+    return [Blocker.from_mongo(doc) for doc in cursor]
+
+
+def get_blocker_matches(blockers: List[Blocker]) -> Dict[str, MatchResult]:
+    """Precomputed duplicates of these blockers (empty if the duplicate job hasn't run)."""
+    try:
+        return get_match_results([b.id for b in blockers], limit=3)
+    except Exception as e:
+        print(f"⚠️  Could not load blocker matches: {e}")
+        return {}
+
+
+def get_owners_for_project(project_id: str) -> List[TeamMember]:
+    """Fetch team members whose responsibilities or current task mention the project."""
+    pattern = {"$regex": re.escape(project_id), "$options": "i"}
+    cursor = get_collection("teamMembers").find(
+        {"$or": [{"project_responsibilities": pattern}, {"current_task": pattern}]}
+    )
+    return [TeamMember.from_mongo(doc) for doc in cursor]
+
+
+def fetch_project_context(project_id: str) -> ProjectContext:
+    """
+    Fetch a project's context bundle from Mongo, running the four queries in parallel,
+    and store it in the shared cache.
+    """
+    # Dedicated pool so nested submits can't deadlock the prefetch pool
+    with ThreadPoolExecutor(max_workers=4) as pool:
+        project = pool.submit(get_project, project_id)
+        tickets = pool.submit(get_tickets_for_project, project_id)
+        blockers = pool.submit(get_blockers_for_project, project_id)
+        owners = pool.submit(get_owners_for_project, project_id)
+
+        context = ProjectContext(
+            project_id=project_id,
+            project=project.result(),
+            tickets=tickets.result(),
+            blockers=blockers.result(),
+            owners=owners.result(),
+            fetched_at=time.time(),
+        )
+    context.blocker_matches = get_blocker_matches(context.blockers)
+
+    _cache.set(project_id, context)
+    return context
+
+
+def _run_prefetch(project_id: str) -> ProjectContext:
+    try:
+        return fetch_project_context(project_id)
+    finally:
+        with _inflight_lock:
+            _inflight.pop(project_id, None)
+
+
+def prefetch_project_context(project_id: str):
+    """Start fetching a project's context in the background (no-op if cached or already in flight)."""
+    if project_id in _cache:
+        return
+
+    with _inflight_lock:
+        if project_id in _inflight:
+            return
+        _inflight[project_id] = _executor.submit(_run_prefetch, project_id)
+
+
+def _wait_seconds(deadline: Optional[float]) -> Optional[float]:
+    remaining = remaining_seconds(deadline)
+    return max(0.0, remaining) if remaining is not None else None
+
+
+def get_project_context(project_id: str, timeout: Optional[float] = None) -> ProjectContext:
+    """
+    Get a project's context, from the cache if possible.
+
+    Args:
+        project_id: Project ID (e.g. 'proj-122')
+        timeout: Max seconds to wait in total (None = no limit)
+
+    Returns:
+        ProjectContext for the project
+
+    Raises:
+        BudgetExceeded: The context isn't available within timeout (the fetch
+            carries on in the background and still fills the cache)
+    """
+    context = _cache.get(project_id)
+    if context is not None:
+        return context
+
+    deadline = time.monotonic() + max(0.0, timeout) if timeout is not None else None
+    with _inflight_lock:
+        future = _inflight.get(project_id)
+
+    if future is not None:
+        try:
+            return future.result(timeout=_wait_seconds(deadline))
+        except FutureTimeoutError:
+            raise BudgetExceeded("deadline")
+        except Exception as e:
+            print(f"⚠️  Context prefetch for {project_id} failed: {e}")
+
+    if deadline is None:
+        return fetch_project_context(project_id)
+
+    # Fetch on the pool so the caller can stop waiting at the deadline
+    check_deadline(deadline)
+    try:
+        return _executor.submit(fetch_project_context, project_id).result(timeout=_wait_seconds(deadline))
+    except FutureTimeoutError:
+        raise BudgetExceeded("deadline")
+
+
+def get_cache_stats() -> Dict:
+    """Cache stats for diagnostics."""
+    return _cache.stats()
+
+
+def format_project_context(context: ProjectContext) -> str:
+    """
+    Format a project context bundle for display to LLM.
+
+    Args:
+        context: ProjectContext to format
+
+    Returns:
+        Formatted string representation
+    """
+    if context.project is None:
+        return f"No project found with ID {context.project_id}."
+
+    project = context.project
+    lines = [
+        f"{project.name} (ID: {project.id})",
+        f"Description: {project.description}",
+        f"Status: {project.status or 'Unknown'}",
+    ]
+
+    lines.append("\nMilestones:")
+    if project.milestones:
+        for m in project.milestones:
+            lines.append(f"  - {m.name} (due {m.due_date or 'n/a'}, {m.status or 'unknown'})")
+    else:
+        lines.append("  (none)")
+
+    lines.append("\nTickets:")
+    if context.tickets:
+        for t in context.tickets:
+            lines.append(f"  - {t.id}: {t.description}")
+    else:
+        lines.append("  (none)")
+
+    lines.append("\nKnown blockers:")
+    if context.blockers:
+        for b in context.blockers:
+            lines.append(f"  - {b.id}: {b.title} (resolved by {b.resolved_by or 'nobody yet'})")
+            match = context.blocker_matches.get(b.id)
+            if match and match.matched_blocker:
+                (duplicate_id, score), = match.matched_blocker.items()
+                lines.append(f"    Same issue as {duplicate_id} (similarity {score:.2f})")
+    else:
+        lines.append("  (none)")
+
+    lines.append("\nOwners:")
+    if context.owners:
+        for o in context.owners:
+            lines.append(f"  - {o.name} ({o.role})")
+    else:
+        lines.append("  (none)")
+
+    return "\n".join(lines)
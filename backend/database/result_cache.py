@@ -0,0 +1,182 @@
+import json
+import re
+import sqlite3
+import threading
+import time
+from typing import Dict, List, Optional, Tuple
+
+from utils.cache import TTLCache
+from config.settings import (
+    RESULT_CACHE_MAX_BYTES,
+    RESULT_CACHE_MAX_ENTRIES,
+    RESULT_CACHE_SHARED_MAX_ROWS,
+    RESULT_CACHE_SHARED_PATH,
+    RESULT_CACHE_TTL,
+)
+
+# (results, formatted string for the LLM)
+CachedSearch = Tuple[List[Dict], str]
+
+
+def normalize_query(query: str) -> str:
+    """Lowercase, trim surrounding punctuation and collapse whitespace."""
+    query = re.sub(r"\s+", " ", query.lower()).strip()
+    return query.strip(" .,!?;:'\"")
+
+
+def make_key(query: str, limit: int, filters: Optional[Dict], index_version) -> str:
+    filters_key = json.dumps(filters or {}, sort_keys=True, default=str)
+    return json.dumps([normalize_query(query), limit, filters_key, str(index_version)])
+
+
+def _entry_size(entry: CachedSearch) -> int:
+    results, formatted = entry
+    return len(formatted) + len(json.dumps(results, default=str))
+
+
+class SharedResultStore:
+    """
+    sqlite file shared by worker processes on the same host.
+
+    Each operation opens its own short-lived connection, so it is safe to use
+    from any thread or process.
+    """
+
+    def __init__(self, path: str, ttl_seconds: float, max_rows: int):
+        self.path = path
+        self.ttl_seconds = ttl_seconds
+        self.max_rows = max_rows
+        self._writes = 0
+
+        with self._connect() as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS search_results ("
+                "key TEXT PRIMARY KEY, index_version TEXT, created_at REAL, payload TEXT)"
+            )
+
+    def _connect(self) -> sqlite3.Connection:
+        return sqlite3.connect(self.path, timeout=1.0)
+
+    def get(self, key: str) -> Optional[CachedSearch]:
+        with self._connect() as conn:
+            row = conn.execute(
+                "SELECT payload FROM search_results WHERE key = ? AND created_at > ?",
+                (key, time.time() - self.ttl_seconds)
+            ).fetchone()
+        if row is None:
+            return None
+        payload = json.loads(row[0])
+        return payload["results"], payload["formatted"]
+
+    def set(self, key: str, index_version, entry: CachedSearch):
+        results, formatted = entry
+        payload = json.dumps({"results": results, "formatted": formatted}, default=str)
+        with self._connect() as conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO search_results VALUES (?, ?, ?, ?)",
+                (key, str(index_version), time.time(), payload)
+            )
+            self._writes += 1
+            if self._writes % 100 == 0:
+                self._prune(conn)
+
+    def drop_other_versions(self, index_version):
+        with self._connect() as conn:
+            conn.execute("DELETE FROM search_results WHERE index_version != ?", (str(index_version),))
+
+    def _prune(self, conn: sqlite3.Connection):
+        conn.execute("DELETE FROM search_results WHERE created_at <= ?", (time.time() - self.ttl_seconds,))
+        conn.execute(
+            "DELETE FROM search_results WHERE key NOT IN "
+            "(SELECT key FROM search_results ORDER BY created_at DESC LIMIT ?)",
+            (self.max_rows,)
+        )
+
+
+class SearchResultCache:
+    """
+    Caches full search_projects results plus their format_search_results string,
+    keyed on (normalized query, limit, filters, index version).
+
+    Entries from an older index version can never be hit again (the version is in
+    the key); when a new version is seen they are dropped to free memory.
+    """
+
+    def __init__(self, shared_path: Optional[str] = None):
+        self.local = TTLCache(
+            RESULT_CACHE_MAX_ENTRIES,
+            RESULT_CACHE_TTL,
+            name="search_results",
+            max_bytes=RESULT_CACHE_MAX_BYTES,
+            sizeof=_entry_size,
+        )
+        self.shared = SharedResultStore(shared_path, RESULT_CACHE_TTL, RESULT_CACHE_SHARED_MAX_ROWS) if shared_path else None
+        self.shared_hits = 0
+        self.invalidations = 0
+        self._index_version = None
+        self._lock = threading.Lock()
+
+    def _observe_version(self, index_version):
+        with self._lock:
+            if index_version == self._index_version:
+                return
+            changed = self._index_version is not None
+            self._index_version = index_version
+
+        if changed:
+            self.invalidations += 1
+            self.local.clear()
+            if self.shared:
+                self.shared.drop_other_versions(index_version)
+
+    def get(self, query: str, limit: int, filters: Optional[Dict], index_version) -> Optional[CachedSearch]:
+        self._observe_version(index_version)
+        key = make_key(query, limit, filters, index_version)
+
+        entry = self.local.get(key)
+        if entry is not None:
+            return entry
+
+        if self.shared:
+            try:
+                entry = self.shared.get(key)
+            except sqlite3.Error as e:
+                print(f"⚠️  Shared result cache read failed: {e}")
+                entry = None
+            if entry is not None:
+                self.shared_hits += 1
+                self.local.set(key, entry)
+                return entry
+
+        return None
+
+    def set(self, query: str, limit: int, filters: Optional[Dict], index_version, entry: CachedSearch):
+        self._observe_version(index_version)
+        key = make_key(query, limit, filters, index_version)
+        self.local.set(key, entry)
+
+        if self.shared:
+            try:
+                self.shared.set(key, index_version, entry)
+            except sqlite3.Error as e:
+                print(f"⚠️  Shared result cache write failed: {e}")
+
+    def stats(self) -> Dict:
+        stats = self.local.stats()
+        stats["shared_hits"] = self.shared_hits
+        stats["invalidations"] = self.invalidations
+        stats["index_version"] = self._index_version
+        return stats
+
+
+# Global cache instance (lazy created)
+_result_cache = None
+
+
+def get_result_cache() -> SearchResultCache:
+    """Get or create the process-wide search result cache."""
+    global _result_cache
+    if _result_cache is None:
+        _result_cache = SearchResultCache(RESULT_CACHE_SHARED_PATH)
+    return _result_cache
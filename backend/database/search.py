@@ -1,13 +1,53 @@
-from typing import List, Dict
+from typing import List, Dict, Optional, Tuple
 from database.mongo_client import get_collection
 from database.embeddings_CosineSimilarity import generate_embedding, cosine_similarity
-from config.settings import SEARCH_LIMIT, IS_ATLAS
+from database.index_meta import Generation, get_active_generation, get_index_version
+from database.result_cache import get_result_cache
+from database.keyword_spotter import get_keyword_spotter, normalize_term
+from utils.turn_budget import check_deadline, remaining_seconds
+from config.settings import (
+    EMBEDDING_MODEL,
+    SEARCH_LIMIT,
+    IS_ATLAS,
+    RESULT_CACHE_ENABLED,
+    KEYWORD_SPOTTING_ENABLED,
+    KEYWORD_BOOST,
+    KEYWORD_MAX_BOOST,
+    KEYWORD_EXTRA_CANDIDATES,
+)
 
 
-def search_projects_atlas(query: str, limit: int = SEARCH_LIMIT) -> List[Dict]:
+def embed_query(query: str, timeout: Optional[float] = None, generation: Optional[Generation] = None) -> List[float]:
+    """Embed a search query with the model of the active (or given) index generation."""
+    generation = generation or get_active_generation("projects")
+    return generate_embedding(query, timeout=timeout, model=generation.model)
+
+
+def _query_vector(query: str, deadline: Optional[float], query_embedding: Optional[List[float]],
+                  generation: Generation) -> List[float]:
+    # A precomputed embedding is only usable if it came from this generation's model
+    # (it may predate a generation switch); plain lists are assumed to be from the default model
+    if query_embedding is not None and getattr(query_embedding, "model", EMBEDDING_MODEL) == generation.model:
+        return query_embedding
+    return embed_query(query, timeout=remaining_seconds(deadline), generation=generation)
+
+
+def _stored_vector(doc: Dict, field: str) -> Optional[List[float]]:
+    # Pops the (possibly nested, e.g. 'embeddings.g2') vector field off a projected document
+    top, *rest = field.split(".")
+    value = doc.pop(top, None)
+    for part in rest:
+        value = value.get(part) if isinstance(value, dict) else None
+    return value
+
+
+def search_projects_atlas(query: str, limit: int = SEARCH_LIMIT, filters: Optional[Dict] = None,
+                          deadline: Optional[float] = None, query_embedding: Optional[List[float]] = None,
+                          generation: Optional[Generation] = None) -> List[Dict]:
     #search through atlast cloud
-    # Generate query embedding
-    query_embedding = generate_embedding(query)
+    generation = generation or get_active_generation("projects")
+    # Generate query embedding (unless the caller already has it)
+    query_embedding = _query_vector(query, deadline, query_embedding, generation)
     
     projects_collection = get_collection("projects")
     
@@ -15,11 +55,13 @@ def search_projects_atlas(query: str, limit: int = SEARCH_LIMIT) -> List[Dict]:
     pipeline = [
         {
             "$vectorSearch": {
-                "index": "vector_index",
-                "path": "embedding",
-                "queryVector": query_embedding,
+                "index": generation.vector_index,
+                "path": generation.field,
+                "queryVector": list(query_embedding),
                 "numCandidates": 3,
-                "limit": limit
+                "limit": limit,
+                # Filter fields must be declared as "filter" fields in the Atlas index
+                **({"filter": filters} if filters else {})
             }
         },
         {
@@ -38,29 +80,33 @@ def search_projects_atlas(query: str, limit: int = SEARCH_LIMIT) -> List[Dict]:
     return results
 
 
-def search_projects_local(query: str, limit: int = SEARCH_LIMIT) -> List[Dict]:
+def search_projects_local(query: str, limit: int = SEARCH_LIMIT, filters: Optional[Dict] = None,
+                          deadline: Optional[float] = None, query_embedding: Optional[List[float]] = None,
+                          generation: Optional[Generation] = None) -> List[Dict]:
     #manual cosine search
-    # Generate query embedding
-    query_embedding = generate_embedding(query)
+    generation = generation or get_active_generation("projects")
+    # Generate query embedding (unless the caller already has it)
+    query_embedding = _query_vector(query, deadline, query_embedding, generation)
     
     projects_collection = get_collection("projects")
     
-    # Get all projects with embeddings
+    # Get all projects with embeddings (from this generation)
     projects = list(projects_collection.find(
-        {"embedding": {"$exists": True}},
-        {"_id": 0, "id": 1, "name": 1, "description": 1, "status": 1, "embedding": 1}
+        {generation.field: {"$exists": True}, **(filters or {})},
+        {"_id": 0, "id": 1, "name": 1, "description": 1, "status": 1, generation.field: 1}
     ))
     
     if not projects:
         print("No projects found with embeddings.")
         return []
     
+    check_deadline(deadline)
+    
     # Calculate similarity for each project
     for project in projects:
-        similarity = cosine_similarity(query_embedding, project["embedding"])
-        project["score"] = similarity
         # Remove embedding from result (don't need to show it)
-        del project["embedding"]
+        similarity = cosine_similarity(query_embedding, _stored_vector(project, generation.field))
+        project["score"] = similarity
     
     # Sort by similarity (highest first)
     projects.sort(key=lambda x: x["score"], reverse=True)
@@ -69,17 +115,99 @@ def search_projects_local(query: str, limit: int = SEARCH_LIMIT) -> List[Dict]:
     return projects[:limit]
 
 
-def search_projects(query: str, limit: int = SEARCH_LIMIT) -> List[Dict]:
+def _vector_search(query: str, limit: int, filters: Optional[Dict], deadline: Optional[float],
+                   query_embedding: Optional[List[float]], generation: Generation) -> List[Dict]:
     #calls above functions based on what DB is available
     if IS_ATLAS:
         try:
-            return search_projects_atlas(query, limit)
+            return search_projects_atlas(query, limit, filters, deadline, query_embedding, generation)
         except Exception as e:
             print(f"⚠️  Atlas search failed: {e}")
+            # A full local scan is the slow path - only worth it if the turn still has time
+            check_deadline(deadline)
             print("Falling back to local search...")
-            return search_projects_local(query, limit)
+            return search_projects_local(query, limit, filters, deadline, query_embedding, generation)
     else:
-        return search_projects_local(query, limit)
+        return search_projects_local(query, limit, filters, deadline, query_embedding, generation)
+
+
+def apply_keyword_boost(results: List[Dict], keywords: List[str]) -> List[Dict]:
+    """
+    Raise the score of projects whose name or description mentions a spotted
+    keyword (KEYWORD_BOOST each, at most KEYWORD_MAX_BOOST), then re-sort.
+    """
+    terms = [f" {normalize_term(k)} " for k in keywords]
+    for project in results:
+        text = f" {normalize_term(project.get('name', '') + ' ' + project.get('description', ''))} "
+        matched = [k for k, term in zip(keywords, terms) if term in text]
+        if matched:
+            project["score"] = min(1.0, project["score"] + min(KEYWORD_MAX_BOOST, KEYWORD_BOOST * len(matched)))
+            project["matched_keywords"] = matched
+    results.sort(key=lambda x: x["score"], reverse=True)
+    return results
+
+
+def _run_search(query: str, limit: int, filters: Optional[Dict], deadline: Optional[float],
+                query_embedding: Optional[List[float]], generation: Generation) -> List[Dict]:
+    keywords = get_keyword_spotter().spot(query) if KEYWORD_SPOTTING_ENABLED else []
+    if not keywords:
+        return _vector_search(query, limit, filters, deadline, query_embedding, generation)
+
+    # Over-fetch so an exact component match ranked just outside the top N can still make it in
+    results = _vector_search(query, limit + KEYWORD_EXTRA_CANDIDATES, filters, deadline, query_embedding, generation)
+    return apply_keyword_boost(results, keywords)[:limit]
+
+
+def search_projects_formatted(query: str, limit: int = SEARCH_LIMIT, filters: Optional[Dict] = None,
+                              deadline: Optional[float] = None,
+                              query_embedding: Optional[List[float]] = None) -> Tuple[List[Dict], str]:
+    """
+    Search projects and format the results for the LLM, reusing a cached answer
+    for the same normalized query/limit/filters while the project index is unchanged.
+
+    The active index generation is read once per call, so the query is embedded
+    with the same model that produced the vectors it is compared against.
+
+    Args:
+        query: Search text
+        limit: Max results
+        filters: Optional Mongo equality filters on project fields (e.g. {"status": "active"})
+        deadline: Optional time.monotonic() deadline; BudgetExceeded is raised once it passes
+        query_embedding: Optional precomputed embedding of query (skips re-embedding)
+
+    Returns:
+        Tuple of (results, formatted results string)
+    """
+    check_deadline(deadline)
+    generation = get_active_generation("projects")
+    if not RESULT_CACHE_ENABLED:
+        results = _run_search(query, limit, filters, deadline, query_embedding, generation)
+        return results, format_search_results(results)
+
+    cache = get_result_cache()
+    index_version = f"{get_index_version('projects')}:{generation.id}"
+    if KEYWORD_SPOTTING_ENABLED:
+        # Boosts depend on the keyword set too
+        spotter = get_keyword_spotter()
+        spotter.refresh()
+        index_version = f"{index_version}:{spotter.version}"
+
+    cached = cache.get(query, limit, filters, index_version)
+    if cached is None:
+        results = _run_search(query, limit, filters, deadline, query_embedding, generation)
+        cached = (results, format_search_results(results))
+        cache.set(query, limit, filters, index_version, cached)
+
+    results, formatted = cached
+    # Callers may modify the dicts - never hand out the cached ones
+    return [dict(r) for r in results], formatted
+
+
+def search_projects(query: str, limit: int = SEARCH_LIMIT, filters: Optional[Dict] = None,
+                    deadline: Optional[float] = None) -> List[Dict]:
+    #search projects (cached), see search_projects_formatted
+    results, _ = search_projects_formatted(query, limit, filters, deadline)
+    return results
 
 
 def format_search_results(results: List[Dict]) -> str:
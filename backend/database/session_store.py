@@ -0,0 +1,251 @@
+"""
+Persistent conversation state: an append-only per-turn log plus periodic snapshots.
+
+Each turn appends only the messages it added (O(turn) write). Every
+SESSION_SNAPSHOT_EVERY turns the full history is written as one snapshot, so
+resuming a session reads one snapshot and at most SESSION_SNAPSHOT_EVERY - 1 log
+entries, however long the conversation is.
+
+Message content is stored compactly: plain strings as UTF-8, content-block lists
+(tool_use / tool_result / text) as zlib-compressed JSON.
+"""
+import json
+import sqlite3
+import threading
+import zlib
+from abc import ABC, abstractmethod
+from typing import Dict, List, Optional, Tuple
+
+from utils.conversation_state import ConversationState
+from config.settings import SESSION_DB_PATH, SESSION_SNAPSHOT_EVERY, SESSION_STORE
+
+# Record = (turn, encoded messages, state metadata)
+Record = Tuple[int, bytes, Dict]
+
+_TEXT = b"s"
+_BLOCKS = b"z"
+
+
+def _block_to_dict(block):
+    # anthropic content blocks are pydantic models
+    if hasattr(block, "model_dump"):
+        return block.model_dump(exclude_none=True)
+    return block
+
+
+def encode_content(content) -> bytes:
+    """Encode one message's content (a string or a list of content blocks)."""
+    if isinstance(content, str):
+        return _TEXT + content.encode("utf-8")
+    blocks = [_block_to_dict(b) for b in content]
+    return _BLOCKS + zlib.compress(json.dumps(blocks, separators=(",", ":"), default=str).encode("utf-8"))
+
+
+def decode_content(data: bytes):
+    kind, body = data[:1], data[1:]
+    if kind == _TEXT:
+        return body.decode("utf-8")
+    return json.loads(zlib.decompress(body).decode("utf-8"))
+
+
+def encode_messages(messages: List[Dict]) -> bytes:
+    """Length-prefixed sequence of (role, encoded content) records."""
+    out = bytearray()
+    for message in messages:
+        role = message["role"].encode("utf-8")
+        content = encode_content(message["content"])
+        out += len(role).to_bytes(1, "big") + role + len(content).to_bytes(4, "big") + content
+    return bytes(out)
+
+
+def decode_messages(data: bytes) -> List[Dict]:
+    messages = []
+    pos = 0
+    while pos < len(data):
+        role_len = data[pos]
+        role = data[pos + 1:pos + 1 + role_len].decode("utf-8")
+        pos += 1 + role_len
+        content_len = int.from_bytes(data[pos:pos + 4], "big")
+        messages.append({"role": role, "content": decode_content(data[pos + 4:pos + 4 + content_len])})
+        pos += 4 + content_len
+    return messages
+
+
+def state_metadata(state: ConversationState) -> Dict:
+    return {
+        "turn_count": state.turn_count,
+        "message_count": len(state.messages),
+        "identified_project_id": state.identified_project_id,
+        "identified_project_name": state.identified_project_name,
+        "confidence_score": state.confidence_score,
+        "identified_at_turn": state.identified_at_turn,
+        "candidate_projects": state.candidate_projects,
+        "llm_calls": state.llm_calls,
+        "input_tokens": state.input_tokens,
+        "output_tokens": state.output_tokens,
+    }
+
+
+class SessionStore(ABC):
+    """Storage backend interface for session logs and snapshots."""
+
+    @abstractmethod
+    def append_turn(self, session_id: str, turn: int, payload: bytes, meta: Dict):
+        ...
+
+    @abstractmethod
+    def write_snapshot(self, session_id: str, turn: int, payload: bytes, meta: Dict):
+        ...
+
+    @abstractmethod
+    def read_snapshot(self, session_id: str) -> Optional[Record]:
+        ...
+
+    @abstractmethod
+    def read_turns(self, session_id: str, after_turn: int) -> List[Record]:
+        ...
+
+
+class SqliteSessionStore(SessionStore):
+    """Local single-host store (one sqlite file, safe across threads and processes)."""
+
+    def __init__(self, path: str):
+        self.path = str(path)
+        with self._connect() as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS session_turns ("
+                "session_id TEXT, turn INTEGER, payload BLOB, meta TEXT, PRIMARY KEY (session_id, turn))"
+            )
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS session_snapshots ("
+                "session_id TEXT PRIMARY KEY, turn INTEGER, payload BLOB, meta TEXT)"
+            )
+
+    def _connect(self) -> sqlite3.Connection:
+        return sqlite3.connect(self.path, timeout=5.0)
+
+    def append_turn(self, session_id, turn, payload, meta):
+        with self._connect() as conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO session_turns VALUES (?, ?, ?, ?)",
+                (session_id, turn, payload, json.dumps(meta))
+            )
+
+    def write_snapshot(self, session_id, turn, payload, meta):
+        with self._connect() as conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO session_snapshots VALUES (?, ?, ?, ?)",
+                (session_id, turn, payload, json.dumps(meta))
+            )
+
+    def read_snapshot(self, session_id):
+        with self._connect() as conn:
+            row = conn.execute(
+                "SELECT turn, payload, meta FROM session_snapshots WHERE session_id = ?", (session_id,)
+            ).fetchone()
+        return (row[0], bytes(row[1]), json.loads(row[2])) if row else None
+
+    def read_turns(self, session_id, after_turn):
+        with self._connect() as conn:
+            rows = conn.execute(
+                "SELECT turn, payload, meta FROM session_turns WHERE session_id = ? AND turn > ? ORDER BY turn",
+                (session_id, after_turn)
+            ).fetchall()
+        return [(turn, bytes(payload), json.loads(meta)) for turn, payload, meta in rows]
+
+
+class MongoSessionStore(SessionStore):
+    """Production store shared by every worker."""
+
+    def __init__(self):
+        from database.mongo_client import get_collection
+        self.turns = get_collection("session_turns")
+        self.snapshots = get_collection("session_snapshots")
+        self.turns.create_index([("session_id", 1), ("turn", 1)], unique=True)
+
+    def append_turn(self, session_id, turn, payload, meta):
+        self.turns.update_one(
+            {"session_id": session_id, "turn": turn},
+            {"$set": {"payload": payload, "meta": meta}},
+            upsert=True
+        )
+
+    def write_snapshot(self, session_id, turn, payload, meta):
+        self.snapshots.update_one(
+            {"_id": session_id},
+            {"$set": {"turn": turn, "payload": payload, "meta": meta}},
+            upsert=True
+        )
+
+    def read_snapshot(self, session_id):
+        doc = self.snapshots.find_one({"_id": session_id})
+        return (doc["turn"], bytes(doc["payload"]), doc["meta"]) if doc else None
+
+    def read_turns(self, session_id, after_turn):
+        cursor = self.turns.find({"session_id": session_id, "turn": {"$gt": after_turn}}).sort("turn", 1)
+        return [(doc["turn"], bytes(doc["payload"]), doc["meta"]) for doc in cursor]
+
+
+def save_turn(store: SessionStore, state: ConversationState):
+    """Append the messages added since the last save; snapshot every SESSION_SNAPSHOT_EVERY turns."""
+    new_messages = state.messages[state.persisted_messages:]
+    meta = state_metadata(state)
+    store.append_turn(state.session_id, state.turn_count, encode_messages(new_messages), meta)
+
+    if state.turn_count % SESSION_SNAPSHOT_EVERY == 0:
+        store.write_snapshot(state.session_id, state.turn_count, encode_messages(state.messages), meta)
+
+    state.persisted_messages = len(state.messages)
+
+
+def load_session(store: SessionStore, session_id: str) -> Optional[ConversationState]:
+    """Rebuild a session from its latest snapshot and the log entries after it."""
+    snapshot = store.read_snapshot(session_id)
+    snapshot_turn, snapshot_payload, meta = snapshot if snapshot else (0, b"", None)
+    turns = store.read_turns(session_id, snapshot_turn)
+
+    if snapshot is None and not turns:
+        return None
+
+    # Decoded up front: every turn reads the whole history anyway
+    history = decode_messages(snapshot_payload)
+    for _, payload, turn_meta in turns:
+        history.extend(decode_messages(payload))
+        meta = turn_meta
+
+    state = ConversationState(
+        messages=history,
+        identified_project_id=meta.get("identified_project_id"),
+        identified_project_name=meta.get("identified_project_name"),
+        confidence_score=meta.get("confidence_score"),
+        identified_at_turn=meta.get("identified_at_turn"),
+        candidate_projects=meta.get("candidate_projects") or {},
+        turn_count=meta.get("turn_count", 0),
+        llm_calls=meta.get("llm_calls", 0),
+        input_tokens=meta.get("input_tokens", 0),
+        output_tokens=meta.get("output_tokens", 0),
+        session_id=session_id,
+    )
+    state.persisted_messages = len(history)
+    return state
+
+
+# Global store instance (lazy created from SESSION_STORE)
+_store = None
+_store_lock = threading.Lock()
+
+
+def get_session_store() -> Optional[SessionStore]:
+    """The configured session store, or None if persistence is off (SESSION_STORE unset)."""
+    global _store
+    if _store is None and SESSION_STORE:
+        with _store_lock:
+            if _store is None:
+                if SESSION_STORE == "sqlite":
+                    _store = SqliteSessionStore(SESSION_DB_PATH)
+                elif SESSION_STORE == "mongo":
+                    _store = MongoSessionStore()
+                else:
+                    raise ValueError(f"Unknown SESSION_STORE '{SESSION_STORE}' (use 'sqlite' or 'mongo')")
+    return _store
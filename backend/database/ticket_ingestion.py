@@ -0,0 +1,527 @@
+"""
+Incremental ticket ingestion from Jira: JSON/CSV exports or the Jira REST API.
+
+Records stream through parsing -> Ticket mapping -> batched embedding -> bulk
+upsert, so memory holds at most two batches however large the export is (the
+next batch is embedded while the previous one is written).
+
+Syncs are incremental and idempotent:
+- a per-source watermark in the sync_state collection (latest 'updated'
+  timestamp seen) lets the next run skip, or not even fetch, older tickets
+- tickets are upserted by id, and one whose content hash matches what is
+  stored is neither re-embedded nor rewritten
+"""
+import base64
+import csv
+import hashlib
+import json
+import time
+import urllib.parse
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import asdict, dataclass
+from datetime import datetime, timedelta, timezone
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple
+
+from pymongo import UpdateOne
+from pymongo.errors import DuplicateKeyError
+
+from database.mongo_client import get_collection
+from database.embeddings_CosineSimilarity import generate_embeddings
+from database.index_meta import Generation, bump_index_version, get_active_generation
+from models.mongo_schema.ticketingSystem_Schema import Ticket
+from config.settings import (
+    JIRA_API_TOKEN,
+    JIRA_EMAIL,
+    JIRA_JQL,
+    JIRA_PAGE_SIZE,
+    JIRA_PROJECT_ID_FIELD,
+    JIRA_ROOT_CAUSE_FIELD,
+    JIRA_SOLUTION_FIELD,
+    TICKET_INGEST_BATCH_SIZE,
+)
+
+# One document per source, e.g. {"_id": "jira:https://acme.atlassian.net", "watermark": "2025-...", ...}
+SYNC_STATE_COLLECTION = "sync_state"
+
+# Where each Ticket field may live in a record, first non-empty wins. Dotted paths
+# cover the Jira REST shape ("fields.summary"), plain names cover CSV columns and
+# exports already in our own schema.
+FIELD_PATHS = {
+    "id": ["key", "Issue key", "id"],
+    "project_id": [JIRA_PROJECT_ID_FIELD, "project_id", "fields.project_id", "Project ID",
+                   "fields.project.key", "Project key"],
+    "summary": ["summary", "fields.summary", "Summary"],
+    "description": ["description", "fields.description", "Description"],
+    "root_cause": [JIRA_ROOT_CAUSE_FIELD, "root_cause", "fields.root_cause", "Root Cause",
+                   "Custom field (Root Cause)"],
+    "solution": [JIRA_SOLUTION_FIELD, "solution", "fields.solution", "Solution", "Custom field (Solution)"],
+    "updated": ["updated", "updated_at", "fields.updated", "Updated"],
+}
+
+# Covers any UTC offset the Jira user's timezone may have
+JQL_OVERLAP = timedelta(hours=14)
+
+TIMESTAMP_FORMATS = ["%d/%b/%y %I:%M %p", "%Y-%m-%d %H:%M", "%Y/%m/%d %H:%M"]  # Jira CSV / JQL styles
+
+
+# ---------------------------------------------------------------------------
+# Sources - each yields raw records one at a time
+# ---------------------------------------------------------------------------
+
+class _JSONStream:
+    """Incremental reader over a JSON text: decodes one value at a time from a sliding buffer."""
+
+    def __init__(self, f, chunk_size: int):
+        self.f = f
+        self.chunk_size = chunk_size
+        self.decoder = json.JSONDecoder()
+        self.buf = ""
+        self.pos = 0
+
+    def _fill(self) -> bool:
+        data = self.f.read(self.chunk_size)
+        if not data:
+            return False
+        self.buf = self.buf[self.pos:] + data
+        self.pos = 0
+        return True
+
+    def peek(self, skip: str = " \t\r\n") -> str:
+        """Next character that is not in skip ('' at end of input)."""
+        while True:
+            while self.pos < len(self.buf) and self.buf[self.pos] in skip:
+                self.pos += 1
+            if self.pos < len(self.buf):
+                return self.buf[self.pos]
+            if not self._fill():
+                return ""
+
+    def expect(self, ch: str):
+        if self.peek() != ch:
+            raise ValueError(f"Malformed JSON export: expected '{ch}' near offset {self.pos}")
+        self.pos += 1
+
+    def value(self) -> Any:
+        self.peek()
+        while True:
+            try:
+                value, end = self.decoder.raw_decode(self.buf, self.pos)
+            except json.JSONDecodeError:
+                # Value continues past the buffer - read more
+                if not self._fill():
+                    raise
+                continue
+            if end == len(self.buf) and self._fill():
+                # A number cut at the buffer edge decodes "successfully" - retry with more input
+                continue
+            self.pos = end
+            return value
+
+    def array_items(self) -> Iterator[Any]:
+        """Items of the array whose '[' is next in the input."""
+        self.expect("[")
+        while True:
+            ch = self.peek(skip=" \t\r\n,")
+            if ch == "]":
+                self.pos += 1
+                return
+            if not ch:
+                raise ValueError("Malformed JSON export: unterminated array")
+            yield self.value()
+
+
+def iter_json_export(path: str, chunk_size: int = 1 << 16) -> Iterator[Dict]:
+    """
+    Stream issues from a JSON export without loading it whole.
+
+    Accepts a top-level array of issues, a Jira search response ({"issues": [...]}, or
+    {"tickets": [...]}), or JSON lines (.jsonl / .ndjson).
+    """
+    with open(path, "r", encoding="utf-8") as f:
+        if path.endswith((".jsonl", ".ndjson")):
+            for line in f:
+                if line.strip():
+                    yield json.loads(line)
+            return
+
+        stream = _JSONStream(f, chunk_size)
+        first = stream.peek()
+        if first == "[":
+            yield from stream.array_items()
+            return
+        if first != "{":
+            raise ValueError(f"{path}: expected a JSON array or object")
+
+        # Walk the top-level object, skipping everything but the issues array
+        stream.expect("{")
+        while stream.peek(skip=" \t\r\n,") not in ("}", ""):
+            key = stream.value()
+            stream.expect(":")
+            if key in ("issues", "tickets") and stream.peek() == "[":
+                yield from stream.array_items()
+            else:
+                stream.value()
+
+
+def iter_csv_export(path: str) -> Iterator[Dict]:
+    """Stream rows of a Jira CSV export (or any CSV with our ticket columns)."""
+    with open(path, "r", encoding="utf-8-sig", newline="") as f:
+        yield from csv.DictReader(f)
+
+
+class JiraAPISource:
+    """Pages through /rest/api/2/search, oldest update first, starting from a watermark."""
+
+    def __init__(self, base_url: str, jql: str = JIRA_JQL, page_size: int = JIRA_PAGE_SIZE,
+                 email: Optional[str] = JIRA_EMAIL, api_token: Optional[str] = JIRA_API_TOKEN,
+                 timeout: float = 30.0):
+        self.base_url = base_url.rstrip("/")
+        self.jql = jql
+        self.page_size = page_size
+        self.timeout = timeout
+        self.headers = {"Accept": "application/json"}
+        if email and api_token:
+            credentials = base64.b64encode(f"{email}:{api_token}".encode("utf-8")).decode("ascii")
+            self.headers["Authorization"] = f"Basic {credentials}"
+
+    @property
+    def name(self) -> str:
+        return f"jira:{self.base_url}"
+
+    def build_jql(self, since: Optional[str]) -> str:
+        clauses = [f"({self.jql})"] if self.jql else []
+        if since:
+            # JQL dates are minute-precision and in the Jira user's timezone, so ask from
+            # JQL_OVERLAP earlier; re-fetched tickets are dropped by the watermark/hash checks
+            start = datetime.fromisoformat(since) - JQL_OVERLAP
+            clauses.append(f'updated >= "{start.strftime("%Y/%m/%d %H:%M")}"')
+        return " AND ".join(clauses) + " ORDER BY updated ASC"
+
+    def _get_page(self, jql: str, start_at: int) -> Dict:
+        query = urllib.parse.urlencode({"jql": jql, "startAt": start_at, "maxResults": self.page_size})
+        request = urllib.request.Request(f"{self.base_url}/rest/api/2/search?{query}", headers=self.headers)
+        with urllib.request.urlopen(request, timeout=self.timeout) as response:
+            return json.load(response)
+
+    def iter_issues(self, since: Optional[str] = None) -> Iterator[Dict]:
+        jql = self.build_jql(since)
+        start_at = 0
+        while True:
+            page = self._get_page(jql, start_at)
+            issues = page.get("issues", [])
+            yield from issues
+            start_at += len(issues)
+            if not issues or start_at >= page.get("total", 0):
+                return
+
+
+# ---------------------------------------------------------------------------
+# Mapping
+# ---------------------------------------------------------------------------
+
+def _lookup(record: Dict, path: str) -> Any:
+    value = record
+    for part in path.split("."):
+        if not isinstance(value, dict):
+            return None
+        value = value.get(part)
+    return value
+
+
+def _as_text(value: Any) -> str:
+    """Plain text from a field value (strings, numbers, {"name"/"value": ...} options, rich-text documents)."""
+    if value is None:
+        return ""
+    if isinstance(value, str):
+        return value.strip()
+    if isinstance(value, list):
+        return " ".join(t for t in (_as_text(v) for v in value) if t)
+    if isinstance(value, dict):
+        for key in ("text", "value", "name"):
+            if isinstance(value.get(key), str):
+                return value[key].strip()
+        return _as_text(value.get("content"))
+    return str(value)
+
+
+def _first(record: Dict, field: str) -> str:
+    for path in FIELD_PATHS[field]:
+        if path:
+            text = _as_text(_lookup(record, path))
+            if text:
+                return text
+    return ""
+
+
+def parse_timestamp(value: Any) -> Optional[str]:
+    """Normalize a Jira timestamp to a UTC ISO-8601 string (sortable as text); None if unparseable."""
+    if value in (None, ""):
+        return None
+    if isinstance(value, (int, float)):
+        # Epoch milliseconds
+        return datetime.fromtimestamp(value / 1000, tz=timezone.utc).isoformat()
+
+    text = str(value).strip()
+    parsed = None
+    try:
+        # '2024-01-05T10:22:33.000+0000' -> '+00:00' so fromisoformat accepts it on 3.10
+        iso = text.replace("Z", "+00:00")
+        if len(iso) > 5 and iso[-5] in "+-" and iso[-4:].isdigit():
+            iso = f"{iso[:-2]}:{iso[-2:]}"
+        parsed = datetime.fromisoformat(iso)
+    except ValueError:
+        for fmt in TIMESTAMP_FORMATS:
+            try:
+                parsed = datetime.strptime(text, fmt)
+                break
+            except ValueError:
+                continue
+    if parsed is None:
+        return None
+    if parsed.tzinfo is None:
+        parsed = parsed.replace(tzinfo=timezone.utc)
+    return parsed.astimezone(timezone.utc).isoformat()
+
+
+def map_record(record: Dict) -> Optional[Tuple[Ticket, Optional[str]]]:
+    """
+    Map a raw record (Jira issue, CSV row or our own schema) to a Ticket.
+
+    Returns:
+        Tuple of (ticket, updated timestamp or None), or None if the record has no id or text
+    """
+    ticket_id = _first(record, "id")
+    summary = _first(record, "summary")
+    body = _first(record, "description")
+    description = "\n".join(part for part in (summary, body) if part) if summary != body else body
+    if not ticket_id or not description:
+        return None
+
+    ticket = Ticket(
+        id=ticket_id,
+        project_id=_first(record, "project_id"),
+        description=description,
+        root_cause=_first(record, "root_cause"),
+        solution=_first(record, "solution"),
+    )
+    return ticket, parse_timestamp(_first(record, "updated"))
+
+
+def ticket_text(ticket: Ticket) -> str:
+    """Text that is embedded for a ticket."""
+    return " ".join(part for part in (ticket.description, ticket.root_cause, ticket.solution) if part)
+
+
+def ticket_hash(ticket: Ticket, model: str) -> str:
+    # The model spec is part of the hash so switching the index's model re-embeds everything
+    payload = json.dumps([asdict(ticket), model], sort_keys=True)
+    return hashlib.sha1(payload.encode("utf-8")).hexdigest()
+
+
+# ---------------------------------------------------------------------------
+# Pipeline
+# ---------------------------------------------------------------------------
+
+def get_watermark(source: str) -> Optional[str]:
+    doc = get_collection(SYNC_STATE_COLLECTION).find_one({"_id": source})
+    return doc.get("watermark") if doc else None
+
+
+def set_watermark(source: str, watermark: str, stats: "IngestStats"):
+    get_collection(SYNC_STATE_COLLECTION).update_one(
+        {"_id": source},
+        {"$set": {"watermark": watermark, "synced_at": datetime.now(timezone.utc).isoformat(),
+                  "last_run": stats.as_dict()}},
+        upsert=True
+    )
+
+
+def _duplicate_ticket_ids(tickets, limit: int = 20) -> List[str]:
+    pipeline = [
+        {"$group": {"_id": "$id", "count": {"$sum": 1}}},
+        {"$match": {"count": {"$gt": 1}}},
+        {"$limit": limit},
+    ]
+    return [doc["_id"] for doc in tickets.aggregate(pipeline)]
+
+
+def _duplicate_ids_error(duplicates: List[str]) -> ValueError:
+    return ValueError(
+        f"tickets has several documents per id (e.g. {', '.join(map(str, duplicates))}) - "
+        f"remove the duplicates before ingesting, the 'id' index must be unique"
+    )
+
+
+def ensure_ticket_indexes():
+    tickets = get_collection("tickets")
+    existing = tickets.index_information().get("id_1")
+    if existing is not None and not existing.get("unique"):
+        # Created non-unique by an earlier version - replace it, unless the data can't be unique
+        duplicates = _duplicate_ticket_ids(tickets)
+        if duplicates:
+            raise _duplicate_ids_error(duplicates)
+        tickets.drop_index("id_1")
+    try:
+        tickets.create_index("id", unique=True)  # Upserts match on it; one document per ticket
+    except DuplicateKeyError as e:
+        raise _duplicate_ids_error(_duplicate_ticket_ids(tickets)) from e
+    tickets.create_index("project_id")  # get_tickets_for_project
+
+
+@dataclass
+class IngestStats:
+    source: str
+    read: int = 0
+    invalid: int = 0  # No id or no text
+    skipped_old: int = 0  # Updated before the watermark
+    unchanged: int = 0  # Same content as stored - not re-embedded
+    upserted: int = 0
+    batches: int = 0
+    embed_seconds: float = 0.0
+    write_seconds: float = 0.0
+    elapsed_seconds: float = 0.0
+    watermark: Optional[str] = None
+
+    @property
+    def throughput(self) -> float:
+        """Records read per second."""
+        return self.read / self.elapsed_seconds if self.elapsed_seconds else 0.0
+
+    def as_dict(self) -> Dict:
+        return {**asdict(self), "throughput": round(self.throughput, 1)}
+
+    def summary(self) -> str:
+        return (
+            f"{self.read} read, {self.upserted} upserted, {self.unchanged} unchanged, "
+            f"{self.skipped_old} older than watermark, {self.invalid} invalid | "
+            f"{self.elapsed_seconds:.1f}s ({self.throughput:.0f} tickets/s; "
+            f"embed {self.embed_seconds:.1f}s, write {self.write_seconds:.1f}s)"
+        )
+
+
+def _prepare_batch(batch: Dict[str, Tuple[Ticket, Optional[str]]], source: str, generation: Generation,
+                   stats: IngestStats) -> List[UpdateOne]:
+    """Drop tickets whose content (and model) is unchanged, embed the rest with the index's model, build upserts."""
+    stored = {
+        doc["id"]: doc.get("content_hash")
+        for doc in get_collection("tickets").find(
+            {"id": {"$in": list(batch)}}, {"_id": 0, "id": 1, "content_hash": 1}
+        )
+    }
+
+    changed = []
+    for ticket, updated in batch.values():
+        content_hash = ticket_hash(ticket, generation.model)
+        if stored.get(ticket.id) == content_hash:
+            stats.unchanged += 1
+        else:
+            changed.append((ticket, updated, content_hash))
+    if not changed:
+        return []
+
+    started = time.perf_counter()
+    embeddings = generate_embeddings([ticket_text(t) for t, _, _ in changed], model=generation.model)
+    stats.embed_seconds += time.perf_counter() - started
+
+    ingested_at = datetime.now(timezone.utc).isoformat()
+    return [
+        UpdateOne(
+            {"id": ticket.id},
+            {"$set": {**asdict(ticket), generation.field: embedding, "content_hash": content_hash,
+                      "updated_at": updated, "source": source, "ingested_at": ingested_at}},
+            upsert=True
+        )
+        for (ticket, updated, content_hash), embedding in zip(changed, embeddings)
+    ]
+
+
+def _write_batch(ops: List[UpdateOne]) -> Tuple[int, float]:
+    started = time.perf_counter()
+    get_collection("tickets").bulk_write(ops, ordered=False)
+    return len(ops), time.perf_counter() - started
+
+
+def ingest_tickets(records: Iterable[Dict], source: str, batch_size: int = TICKET_INGEST_BATCH_SIZE,
+                   full: bool = False, progress_every: int = 10) -> IngestStats:
+    """
+    Map, embed and upsert a stream of raw ticket records.
+
+    Args:
+        records: Raw records from one of the sources above (consumed lazily)
+        source: Name the watermark is kept under (e.g. the export path or 'jira:<url>')
+        batch_size: Tickets embedded and written together
+        full: Ignore the watermark and consider every record
+        progress_every: Print progress every N batches (0 = never)
+
+    Returns:
+        IngestStats for the run; the watermark only advances if the whole run succeeds
+    """
+    stats = IngestStats(source=source)
+    watermark = None if full else get_watermark(source)
+    newest = watermark
+    started = time.perf_counter()
+    ensure_ticket_indexes()
+    generation = get_active_generation("tickets")  # One model for the whole run
+
+    def collect(future):
+        written, seconds = future.result()
+        stats.upserted += written
+        stats.write_seconds += seconds
+
+    batch: Dict[str, Tuple[Ticket, Optional[str]]] = {}
+    pending = None
+    with ThreadPoolExecutor(max_workers=1, thread_name_prefix="ticket-writer") as writer:
+
+        def flush():
+            nonlocal batch, pending
+            ops = _prepare_batch(batch, source, generation, stats)
+            batch = {}
+            stats.batches += 1
+            # At most one write in flight: embedding the next batch overlaps it
+            if pending is not None:
+                collect(pending)
+                pending = None
+            if ops:
+                pending = writer.submit(_write_batch, ops)
+            if progress_every and stats.batches % progress_every == 0:
+                elapsed = time.perf_counter() - started
+                print(f"   ... {stats.read} read, {stats.upserted} upserted ({stats.read / elapsed:.0f} tickets/s)")
+
+        for record in records:
+            stats.read += 1
+            mapped = map_record(record)
+            if mapped is None:
+                stats.invalid += 1
+                continue
+            ticket, updated = mapped
+            if watermark and updated and updated < watermark:
+                stats.skipped_old += 1
+                continue
+            if updated and (newest is None or updated > newest):
+                newest = updated
+
+            batch[ticket.id] = mapped  # A later version of the same ticket replaces an earlier one
+            if len(batch) >= batch_size:
+                flush()
+
+        if batch:
+            flush()
+        if pending is not None:
+            collect(pending)
+
+    stats.elapsed_seconds = time.perf_counter() - started
+    stats.watermark = newest
+    if newest and newest != watermark:
+        set_watermark(source, newest, stats)
+    if stats.upserted:
+        # Invalidates anything cached from the tickets index in every worker
+        bump_index_version("tickets")
+    return stats
+
+
+def sync_from_jira(source: JiraAPISource, batch_size: int = TICKET_INGEST_BATCH_SIZE,
+                   full: bool = False) -> IngestStats:
+    """Incremental sync: only fetches issues updated since the last successful run."""
+    since = None if full else get_watermark(source.name)
+    return ingest_tickets(source.iter_issues(since), source.name, batch_size=batch_size, full=full)
@@ -2,6 +2,11 @@
 from utils.conversation_state import ConversationState
 from agents.orchestrator import run_orchestrator_turn
 from database.mongo_client import close_connection
+from database.session_store import get_session_store, load_session
+from utils.diagnostics import install_dump_signal, start_admin_server
+from database.embedding_backends import check_backend_dependencies
+from config.settings import DIAGNOSTICS_PORT, EMBEDDING_MODEL
+import os
 import sys
 
 def print_separator():
@@ -17,11 +22,39 @@ def print_welcome():
     print_separator()
 
 
+def load_or_create_state(session_id: str = None) -> ConversationState:
+    #resume a stored session if one was asked for (python main.py <session_id>)
+    store = get_session_store()
+    if session_id and store is not None:
+        state = load_session(store, session_id)
+        if state is not None:
+            print(f"Resumed session {session_id} ({state.get_summary()})")
+            return state
+        print(f"No stored session {session_id}, starting a new one.")
+    
+    if session_id:
+        return ConversationState(session_id=session_id)
+    return ConversationState()
+
+
+def start_diagnostics():
+    #memory/CPU/cache diagnostics without a restart: kill -USR1 <pid> writes a dump, DIAGNOSTICS_PORT serves them
+    install_dump_signal()
+    if DIAGNOSTICS_PORT:
+        server = start_admin_server(DIAGNOSTICS_PORT)
+        print(f"Diagnostics: http://127.0.0.1:{server.server_address[1]}/diagnostics (pid {os.getpid()})")
+
+
 def main():
+    #fail now, not on the first search, if the configured embedding backend isn't installed
+    check_backend_dependencies(EMBEDDING_MODEL)
     print_welcome()
+    start_diagnostics()
     
     #conversation state init
-    state = ConversationState()
+    state = load_or_create_state(sys.argv[1] if len(sys.argv) > 1 else None)
+    if get_session_store() is not None:
+        print(f"Session: {state.session_id}")
     print("SRAVAH: Hi! What are you working on today? Any updates or blockers?")
     print_separator()
     
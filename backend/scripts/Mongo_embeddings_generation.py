@@ -1,8 +1,13 @@
-from sentence_transformers import SentenceTransformer
+import sys
+sys.path.append('..')
+
 from pymongo import MongoClient
 import os
 from dotenv import load_dotenv
 from tqdm import tqdm
+from database.embeddings_CosineSimilarity import get_embedding_model
+from database.index_meta import bump_index_version, get_active_generation
+from database.embedding_generations import embedding_targets, project_text
 
 # Load environment variables
 load_dotenv()
@@ -14,14 +19,14 @@ client = MongoClient(uri)
 db = client[db_name]
 projects_collection = db["projects"]
 
-# Load embedding model (downloads on first run, ~80MB)
-model = SentenceTransformer('all-MiniLM-L6-v2')
-print("Model loaded!")
+# Every generation that must stay current (the active one, any being rebuilt and the
+# rollback target), each embedded with its own recorded model - the legacy generation
+# uses the model stored in index_meta when it was first recorded, into 'embedding'
+generations = embedding_targets("projects")
 
-def generate_project_embedding(project: dict) -> list:
-    # Combine name and description
-    text = f"{project['name']} {project['description']}"
-    embedding = model.encode(text)
+def generate_project_embedding(project: dict, model_spec: str) -> list:
+    # Combine name and description; the model is loaded on first use (downloads ~80MB)
+    embedding = get_embedding_model(model_spec).encode(project_text(project))
     return embedding.tolist()
 
 
@@ -38,13 +43,13 @@ def add_embeddings_to_projects():
     updated_count = 0
     for project in tqdm(projects, desc="Generating embeddings"):
         try:
-            # Generate embedding
-            embedding = generate_project_embedding(project)
+            # Generate embeddings
+            embeddings = {g.field: generate_project_embedding(project, g.model) for g in generations}
             
             # Update document in MongoDB
             projects_collection.update_one(
                 {"_id": project["_id"]},
-                {"$set": {"embedding": embedding}}
+                {"$set": embeddings}
             )
             
             updated_count += 1
@@ -52,6 +57,9 @@ def add_embeddings_to_projects():
         except Exception as e:
             print(f"\nError processing project {project.get('id', 'unknown')}: {e}")
             continue
+    if updated_count:
+        # Invalidates cached search results in every worker
+        bump_index_version("projects")
     print(f"\n✅ Successfully added embeddings to {updated_count} projects!")
 
 
@@ -65,23 +73,24 @@ def create_vector_search_index():
     print("\n" + "="*70)
     print("VECTOR SEARCH INDEX SETUP")
     print("="*70)
-    print("""
+    generation = get_active_generation("projects")
+    print(f"""
 If you're using MongoDB Atlas (cloud):
 1. Go to Atlas UI → Database → Search
 2. Create Search Index with this configuration:
 
-{
+{{
   "fields": [
-    {
+    {{
       "type": "vector",
-      "path": "embedding",
-      "numDimensions": 384,
+      "path": "{generation.field}",
+      "numDimensions": {generation.dimensions},
       "similarity": "cosine"
-    }
+    }}
   ]
-}
+}}
 
-3. Name it: "project_vector_index"
+3. Name it: "{generation.vector_index}"
 
 If you're using local MongoDB:
 - Vector search is NOT supported
@@ -0,0 +1,348 @@
+"""
+Conversation-level benchmark: turns, LLM calls, tokens and seconds it takes to
+identify the right project, compared across strategies.
+
+    python benchmark_conversations.py                               # every strategy, 100 synthetic conversations
+    python benchmark_conversations.py --strategies plain,fast-path --conversations 300
+    python benchmark_conversations.py --write-dataset convs.jsonl   # also save the labelled set
+    python benchmark_conversations.py --dataset convs.jsonl --replay recording.jsonl
+
+A labelled conversation is one JSON object per line:
+    {"id": "conv-0001", "project_id": "proj-117", "messages": ["hey...", "it's the ...", ...],
+     "follow_ups": ["what tickets are open on it?", ...]}
+The developer sends one message per turn until the assistant identifies the
+labelled project; a wrong guess just gets the next, more specific message.
+Once it is identified the (optional) follow-up questions are asked, so tokens
+per conversation include the part of the conversation after identification.
+
+Each strategy runs in its own process, so settings and caches don't leak between them.
+"""
+import sys
+sys.path.append('..')
+
+import argparse
+import contextlib
+import json
+import os
+import random
+import subprocess
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+from statistics import mean
+
+# Settings each strategy turns on; everything not listed stays at the baseline
+BASELINE = {
+    "SPECULATIVE_CONTEXT_WAIT_MS": "0",
+    "KEYWORD_SPOTTING_ENABLED": "false",
+    "HISTORY_COMPACTION_ENABLED": "false",
+}
+STRATEGIES = {
+    "plain": {},
+    "fast-path": {"SPECULATIVE_CONTEXT_WAIT_MS": "150"},  # speculative results handed to the model up front
+    "hybrid": {"KEYWORD_SPOTTING_ENABLED": "true"},  # vector search + component keyword boost
+    "compacted": {"HISTORY_COMPACTION_ENABLED": "true"},  # older turns folded into a summary
+    "combined": {
+        "SPECULATIVE_CONTEXT_WAIT_MS": "150",
+        "KEYWORD_SPOTTING_ENABLED": "true",
+        "HISTORY_COMPACTION_ENABLED": "true",
+    },
+}
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Measure turns/tokens/latency to project identification per strategy.")
+    parser.add_argument("--strategies", default=",".join(STRATEGIES), help="Comma-separated strategies to compare")
+    parser.add_argument("--dataset", help="Labelled conversations (JSONL); default: generated from the synthetic catalogue")
+    parser.add_argument("--write-dataset", help="Write the labelled conversations used to this JSONL file")
+    parser.add_argument("--conversations", type=int, default=100, help="Synthetic conversations to generate")
+    parser.add_argument("--follow-ups", type=int, default=None, help="Max follow-up questions per conversation (default: all)")
+    parser.add_argument("--projects", type=int, default=60, help="Synthetic projects in the catalogue")
+    parser.add_argument("--workers", type=int, default=8, help="Conversations run at once")
+    parser.add_argument("--llm-latency-ms", type=float, default=300, help="Mean stub LLM latency per call")
+    parser.add_argument("--llm-jitter-ms", type=float, default=50, help="Std-dev of stub LLM latency")
+    parser.add_argument("--confirm-threshold", type=float, default=0.3,
+                        help="Top score at which the stub LLM confirms a project (hashing embeddings score lower than the real model)")
+    parser.add_argument("--ambiguity-margin", type=float, default=0.05,
+                        help="Stub LLM asks the developer to choose when runners-up score within this of the top hit")
+    parser.add_argument("--real-embeddings", action="store_true", help="Use the configured EMBEDDING_MODEL instead of the hashing stand-in")
+    parser.add_argument("--live-db", action="store_true", help="Search the configured MONGO_URI instead of a seeded in-memory catalogue")
+    parser.add_argument("--replay", help="Replay LLM responses from a recording (JSONL)")
+    parser.add_argument("--record", help="Record real API responses to this JSONL file (costs money!)")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--json-out", help="Also write the report as JSON to this path")
+    parser.add_argument("--strategy", help=argparse.SUPPRESS)  # Child process: run this one strategy
+    return parser.parse_args()
+
+
+def percentile(values, pct):
+    if not values:
+        return None
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, max(0, int(round(pct / 100 * (len(ordered) - 1)))))
+    return ordered[index]
+
+
+def load_dataset(path):
+    with open(path) as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+
+def generate_dataset(args):
+    from load_harness.synthetic import build_catalogue, make_labelled_conversation
+
+    projects = build_catalogue(args.projects, seed=args.seed)["projects"]
+    rng = random.Random(args.seed)
+    return [make_labelled_conversation(projects, rng, i) for i in range(args.conversations)]
+
+
+def run_conversation(orchestrator, ConversationState, conversation, max_follow_ups=None):
+    """
+    Play one labelled conversation: hints until the labelled project is identified,
+    then the follow-up questions. Its LLM calls queue as background work, behind
+    any interactive sessions sharing the process.
+    """
+    from agents.llm_scheduler import PRIORITY_BACKGROUND
+
+    state = ConversationState()
+    turn_latencies, wrong_guesses, errors = [], 0, 0
+
+    def turn(message):
+        nonlocal errors
+        started = time.monotonic()
+        try:
+            orchestrator.run_orchestrator_turn(state, message, priority=PRIORITY_BACKGROUND)
+        except Exception:
+            errors += 1
+        turn_latencies.append(time.monotonic() - started)
+
+    for message in conversation["messages"]:
+        turn(message)
+        if state.identified_project_id == conversation["project_id"]:
+            break
+        if state.identified_at_turn == state.turn_count:
+            wrong_guesses += 1
+
+    correct = state.identified_project_id == conversation["project_id"]
+    identification = {
+        "turns_to_identification": state.identified_at_turn if correct else None,
+        "llm_calls_to_identification": state.llm_calls,
+        "tokens_to_identification": state.input_tokens + state.output_tokens,
+        "seconds_to_identification": sum(turn_latencies),
+    }
+    if correct:
+        for message in conversation.get("follow_ups", [])[:max_follow_ups]:
+            turn(message)
+
+    return {
+        "id": conversation["id"],
+        "difficulty": conversation.get("difficulty", "unlabelled"),
+        "correct": correct,
+        "identified_project_id": state.identified_project_id,
+        **identification,
+        "turns": state.turn_count,
+        "wrong_guesses": wrong_guesses,
+        "llm_calls": state.llm_calls,
+        "tokens": state.input_tokens + state.output_tokens,
+        "input_tokens": state.input_tokens,
+        "output_tokens": state.output_tokens,
+        "turn_latencies": turn_latencies,
+        "errors": errors,
+    }
+
+
+def summarize(strategy, results):
+    correct = [r for r in results if r["correct"]]
+    turn_latencies = [t for r in results for t in r["turn_latencies"]]
+    report = {
+        "strategy": strategy,
+        "conversations": len(results),
+        "accuracy": len(correct) / len(results) if results else None,
+        "wrong_guesses": sum(r["wrong_guesses"] for r in results),
+        "turns_to_identification": {
+            "mean": mean(r["turns_to_identification"] for r in correct) if correct else None,
+            "p50": percentile([r["turns_to_identification"] for r in correct], 50),
+            "p95": percentile([r["turns_to_identification"] for r in correct], 95),
+        },
+        "llm_calls_to_identification": mean(r["llm_calls_to_identification"] for r in correct) if correct else None,
+        "tokens_to_identification": mean(r["tokens_to_identification"] for r in correct) if correct else None,
+        "llm_calls_per_conversation": mean(r["llm_calls"] for r in results) if results else None,
+        "tokens_per_conversation": {
+            "mean": mean(r["tokens"] for r in results) if results else None,
+            "p50": percentile([r["tokens"] for r in results], 50),
+            "p95": percentile([r["tokens"] for r in results], 95),
+            "input_mean": mean(r["input_tokens"] for r in results) if results else None,
+            "output_mean": mean(r["output_tokens"] for r in results) if results else None,
+        },
+        "seconds_to_identification": {
+            "p50": percentile([r["seconds_to_identification"] for r in correct], 50),
+            "p95": percentile([r["seconds_to_identification"] for r in correct], 95),
+        },
+        "turn_latency_ms": {
+            "p50": (percentile(turn_latencies, 50) or 0) * 1000,
+            "p95": (percentile(turn_latencies, 95) or 0) * 1000,
+        },
+        "by_difficulty": {},
+        "errors": sum(r["errors"] for r in results),
+    }
+    for difficulty in sorted({r["difficulty"] for r in results}):
+        group = [r for r in results if r["difficulty"] == difficulty]
+        group_correct = [r for r in group if r["correct"]]
+        report["by_difficulty"][difficulty] = {
+            "conversations": len(group),
+            "accuracy": len(group_correct) / len(group),
+            "mean_turns": mean(r["turns_to_identification"] for r in group_correct) if group_correct else None,
+            "mean_tokens": mean(r["tokens"] for r in group),
+        }
+    return report
+
+
+def run_strategy(args):
+    """Child process: settings for this strategy are already in the environment."""
+    # Imported after the environment is set up
+    from load_harness.stub_llm import ScriptedLLM, ReplayLLM, RecordingLLM
+    from utils.conversation_state import ConversationState
+    from agents import orchestrator
+
+    if not args.live_db:
+        from load_harness.stub_mongo import StubDatabase
+        from load_harness.synthetic import build_catalogue, seed_database
+        from database.mongo_client import set_database
+        from database.embeddings_CosineSimilarity import generate_embeddings
+        db = StubDatabase()
+        set_database(db)
+        seed_database(db, build_catalogue(args.projects, seed=args.seed), generate_embeddings)
+
+    if args.record:
+        llm = RecordingLLM(orchestrator.client, args.record)
+    elif args.replay:
+        llm = ReplayLLM(args.replay, latency_ms=args.llm_latency_ms, jitter_ms=args.llm_jitter_ms, seed=args.seed)
+    else:
+        llm = ScriptedLLM(latency_ms=args.llm_latency_ms, jitter_ms=args.llm_jitter_ms, seed=args.seed,
+                          confirm_threshold=args.confirm_threshold, ambiguity_margin=args.ambiguity_margin,
+                          use_history=True)
+    orchestrator.set_client(llm)
+
+    conversations = load_dataset(args.dataset)
+    with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+        with ThreadPoolExecutor(max_workers=args.workers) as pool:
+            results = list(pool.map(
+                lambda c: run_conversation(orchestrator, ConversationState, c, args.follow_ups), conversations
+            ))
+
+    report = summarize(args.strategy, results)
+    report["llm"] = llm.stats()
+    with open(args.json_out, "w") as f:
+        json.dump(report, f, indent=2, default=str)
+
+
+def child_command(args, strategy, dataset, json_out):
+    command = [
+        sys.executable, os.path.abspath(__file__), "--strategy", strategy, "--dataset", dataset, "--json-out", json_out,
+        "--projects", str(args.projects), "--workers", str(args.workers), "--seed", str(args.seed),
+        "--llm-latency-ms", str(args.llm_latency_ms), "--llm-jitter-ms", str(args.llm_jitter_ms),
+        "--confirm-threshold", str(args.confirm_threshold), "--ambiguity-margin", str(args.ambiguity_margin),
+    ]
+    if args.follow_ups is not None:
+        command += ["--follow-ups", str(args.follow_ups)]
+    for flag, value in (("--replay", args.replay), ("--record", args.record)):
+        if value:
+            command += [flag, os.path.abspath(value)]
+    for flag, value in (("--real-embeddings", args.real_embeddings), ("--live-db", args.live_db)):
+        if value:
+            command.append(flag)
+    return command
+
+
+def fmt(value, spec=".2f"):
+    return "-" if value is None else format(value, spec)
+
+
+def print_comparison(reports):
+    baseline = reports[0]["tokens_per_conversation"]["mean"] or 0
+    print(f"{'':<11} {'':>8} {'':>6} {'--- to identification ---':^26} {'-- per conversation --':^22}")
+    print(f"{'strategy':<11} {'accuracy':>8} {'wrong':>6} {'turns':>6} {'calls':>6} {'tokens':>6} {'s p50':>6} "
+          f"{'calls':>6} {'tokens':>7} {'Δ':>6} {'turn p95':>9}")
+    for r in reports:
+        tokens = r["tokens_per_conversation"]["mean"]
+        delta = f"{(tokens - baseline) / baseline:+.0%}" if baseline and tokens is not None else "-"
+        print(f"{r['strategy']:<11} {fmt(r['accuracy'], '.1%'):>8} {r['wrong_guesses']:>6} "
+              f"{fmt(r['turns_to_identification']['mean']):>6} {fmt(r['llm_calls_to_identification']):>6} "
+              f"{fmt(r['tokens_to_identification'], '.0f'):>6} {fmt(r['seconds_to_identification']['p50']):>6} "
+              f"{fmt(r['llm_calls_per_conversation']):>6} {fmt(tokens, '.0f'):>7} {delta:>6} "
+              f"{fmt(r['turn_latency_ms']['p95'], '.0f'):>7}ms")
+    print()
+    for r in reports:
+        by_difficulty = ", ".join(
+            f"{d}: {fmt(g['accuracy'], '.0%')} in {fmt(g['mean_turns'], '.1f')} turns"
+            for d, g in r["by_difficulty"].items()
+        )
+        print(f"   {r['strategy']:<11} {by_difficulty}" + (f" | {r['errors']} errors" if r["errors"] else ""))
+
+
+def main():
+    args = parse_args()
+
+    if not args.live_db:
+        # Never touch the real database
+        os.environ.setdefault("ANTHROPIC_API_KEY", "offline-benchmark")
+        os.environ["MONGO_URI"] = "mongodb://localhost:27017"
+        os.environ.setdefault("MONGO_DB_NAME", "benchmark")
+        if not args.real_embeddings:
+            os.environ["EMBEDDING_MODEL"] = "load-test:hash"
+            # Hashing scores run lower than the real model's; hand results up front at the stub's confidence
+            os.environ["SPECULATIVE_CONTEXT_MIN_SCORE"] = str(args.confirm_threshold)
+    if not args.record:
+        # Stub/replayed LLM: the scheduler's API rate limits would only add queueing
+        os.environ["LLM_REQUESTS_PER_MINUTE"] = "100000"
+        os.environ["LLM_TOKENS_PER_MINUTE"] = "100000000"
+        os.environ["LLM_MAX_CONCURRENCY"] = "64"
+
+    if args.strategy:
+        run_strategy(args)
+        return
+
+    strategies = [s.strip() for s in args.strategies.split(",") if s.strip()]
+    unknown = [s for s in strategies if s not in STRATEGIES]
+    if unknown:
+        sys.exit(f"Unknown strategies: {', '.join(unknown)} (choose from {', '.join(STRATEGIES)})")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        dataset = args.dataset or os.path.join(tmp, "conversations.jsonl")
+        conversations = load_dataset(args.dataset) if args.dataset else generate_dataset(args)
+        for path in {dataset, args.write_dataset} - {None, args.dataset}:
+            with open(path, "w") as f:
+                f.writelines(json.dumps(c) + "\n" for c in conversations)
+
+        print(f"🏁 Conversation benchmark: {len(conversations)} labelled conversations × {len(strategies)} strategies")
+        print(f"   LLM: {'replay' if args.replay else 'recording' if args.record else 'ScriptedLLM'} "
+              f"({args.llm_latency_ms:.0f}±{args.llm_jitter_ms:.0f} ms) | Embeddings: {os.environ.get('EMBEDDING_MODEL', 'configured')}")
+        print("="*70)
+
+        reports = []
+        for strategy in strategies:
+            json_out = os.path.join(tmp, f"{strategy}.json")
+            env = {**os.environ, **BASELINE, **STRATEGIES[strategy]}
+            started = time.monotonic()
+            completed = subprocess.run(child_command(args, strategy, dataset, json_out), env=env,
+                                       cwd=os.path.dirname(os.path.abspath(__file__)))
+            if completed.returncode != 0:
+                print(f"   {strategy}: failed (exit code {completed.returncode})")
+                continue
+            with open(json_out) as f:
+                reports.append(json.load(f))
+            print(f"   {strategy}: done in {time.monotonic() - started:.1f}s")
+
+    print("="*70)
+    if reports:
+        print_comparison(reports)
+    print("="*70)
+
+    if args.json_out:
+        with open(args.json_out, "w") as f:
+            json.dump(reports, f, indent=2, default=str)
+        print(f"Report written to {args.json_out}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,105 @@
+"""
+Recompute duplicate-blocker neighbours and clusters (database/blocker_neighbours.py).
+
+    python find_duplicate_blockers.py                          # against MONGO_URI
+    python find_duplicate_blockers.py --offline --synthetic 20000 --verify
+                                                               # in-memory Mongo, synthetic blockers,
+                                                               # checked against a brute-force scan
+"""
+import sys
+sys.path.append('..')
+
+import argparse
+import os
+import resource
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Find near-duplicate blockers and store neighbour lists and clusters.")
+    parser.add_argument("--k", type=int, default=None, help="Neighbours stored per blocker")
+    parser.add_argument("--threshold", type=float, default=None, help="Cosine at/above which blockers are duplicates")
+    parser.add_argument("--workers", type=int, default=None, help="Processes (0 = one per CPU, 1 = in-process)")
+    parser.add_argument("--tile-mb", type=float, default=None, help="Max similarity block size per worker")
+    parser.add_argument("--offline", action="store_true", help="Use an in-memory Mongo with hashing embeddings")
+    parser.add_argument("--real-embeddings", action="store_true", help="With --offline: use EMBEDDING_MODEL")
+    parser.add_argument("--synthetic", type=int, default=2000, help="With --offline: synthetic blockers to generate")
+    parser.add_argument("--verify", action="store_true", help="Compare neighbours with a brute-force full matrix (small runs)")
+    return parser.parse_args()
+
+
+def verify(k: int):
+    """Brute-force top-k over the full similarity matrix must agree with the stored lists."""
+    import numpy as np
+    from database.mongo_client import get_collection
+    from database.embeddings_CosineSimilarity import generate_embeddings
+    from database.blocker_neighbours import NEIGHBOURS_COLLECTION, blocker_text, normalize_rows
+
+    docs = list(get_collection("blockers").find({}, {"_id": 0}))
+    ids = [d["id"] for d in docs]
+    matrix = normalize_rows(np.asarray(generate_embeddings([blocker_text(d) for d in docs])))
+    sims = matrix @ matrix.T
+    np.fill_diagonal(sims, -np.inf)
+
+    stored = {d["_id"]: d["neighbours"] for d in get_collection(NEIGHBOURS_COLLECTION).find({})}
+    mismatches = 0
+    for row, blocker_id in enumerate(ids):
+        expected = np.sort(sims[row])[::-1][:k]
+        got = np.array([n["score"] for n in stored[blocker_id]])
+        if not np.allclose(expected, got, atol=1e-3):
+            mismatches += 1
+    print(f"   Verify: {len(ids) - mismatches}/{len(ids)} neighbour lists match brute force")
+
+
+def main():
+    args = parse_args()
+
+    if args.offline:
+        # Never touch the real database
+        os.environ.setdefault("ANTHROPIC_API_KEY", "offline-blockers")
+        os.environ["MONGO_URI"] = "mongodb://localhost:27017"
+        os.environ.setdefault("MONGO_DB_NAME", "blockers_test")
+        if not args.real_embeddings:
+            os.environ["EMBEDDING_MODEL"] = "load-test:hash"
+
+    # Imported after the environment is set up
+    from load_harness.synthetic import make_blockers
+    from database.blocker_neighbours import get_match_result, get_cluster, run_blocker_job
+    from config.settings import (
+        BLOCKER_DUPLICATE_THRESHOLD, BLOCKER_JOB_WORKERS, BLOCKER_NEIGHBOURS_K, BLOCKER_SIMILARITY_TILE_MB,
+    )
+
+    if args.offline:
+        from load_harness.stub_mongo import StubDatabase
+        from database.mongo_client import set_database
+        db = StubDatabase()
+        set_database(db)
+        db["blockers"].insert_many(make_blockers(args.synthetic))
+
+    k = args.k if args.k is not None else BLOCKER_NEIGHBOURS_K
+    stats = run_blocker_job(
+        k=k,
+        threshold=args.threshold if args.threshold is not None else BLOCKER_DUPLICATE_THRESHOLD,
+        workers=args.workers if args.workers is not None else BLOCKER_JOB_WORKERS,
+        tile_mb=args.tile_mb if args.tile_mb is not None else BLOCKER_SIMILARITY_TILE_MB,
+    )
+
+    print("="*70)
+    print(f"🧱 {stats['blockers']} blockers → {stats['duplicate_pairs']} duplicate pairs in "
+          f"{stats['clusters']} clusters (largest {stats['largest_cluster']})")
+    print(f"   load {stats['load_s']}s | embed {stats['embed_s']}s | neighbours {stats['neighbours_s']}s | "
+          f"cluster {stats['cluster_s']}s | write {stats['write_s']}s | total {stats['total_s']}s")
+    print(f"   Peak RSS: {resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024:.0f} MB")
+
+    if stats["blockers"]:
+        sample = get_match_result("blk-0")
+        print(f"   blk-0: {sample}")
+        if sample and sample.matched_blocker:
+            print(f"   Cluster of blk-0: {get_cluster(min(['blk-0', *sample.matched_blocker]))[:10]}")
+
+    if args.verify:
+        verify(stats["k"])
+    print("="*70)
+
+
+if __name__ == "__main__":
+    main()
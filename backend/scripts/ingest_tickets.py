@@ -0,0 +1,132 @@
+"""
+Sync tickets into the tickets collection from a Jira export or the Jira API.
+
+    python ingest_tickets.py export.json            # JSON / JSONL / CSV export (streamed)
+    python ingest_tickets.py --jira                 # JIRA_BASE_URL, incremental from the last sync
+    python ingest_tickets.py --stand-in 20000 --offline
+                                                    # local Jira stand-in + in-memory Mongo
+    python ingest_tickets.py --write-sample big.json --count 100000
+                                                    # generate a large export to test streaming
+"""
+import sys
+sys.path.append('..')
+
+import argparse
+import csv
+import json
+import os
+import resource
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Stream tickets from Jira exports or the Jira API into Mongo.")
+    parser.add_argument("export", nargs="?", help="Path to a .json, .jsonl/.ndjson or .csv export")
+    parser.add_argument("--jira", action="store_true", help="Sync from the Jira REST API at JIRA_BASE_URL")
+    parser.add_argument("--stand-in", type=int, metavar="N", help="Sync from a local Jira stand-in serving N synthetic issues")
+    parser.add_argument("--offline", action="store_true", help="Write to an in-memory Mongo with hashing embeddings")
+    parser.add_argument("--real-embeddings", action="store_true", help="With --offline: use EMBEDDING_MODEL instead of the hashing stand-in")
+    parser.add_argument("--source-name", help="Watermark key (default: export path or 'jira:<url>')")
+    parser.add_argument("--full", action="store_true", help="Ignore the watermark and reconsider every ticket")
+    parser.add_argument("--batch-size", type=int, default=None)
+    parser.add_argument("--write-sample", metavar="PATH", help="Write a synthetic export (.json or .csv) and exit")
+    parser.add_argument("--count", type=int, default=10000, help="Issues in the --write-sample export")
+    return parser.parse_args()
+
+
+def peak_rss_mb() -> float:
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def write_sample(path: str, count: int):
+    """Written issue by issue, so even huge samples don't need to fit in memory."""
+    from load_harness.jira_stub import make_jira_issues
+
+    with open(path, "w", encoding="utf-8", newline="") as f:
+        if path.endswith(".csv"):
+            writer = csv.writer(f)
+            writer.writerow(["Issue key", "Summary", "Description", "Updated", "Project ID", "Root Cause", "Solution"])
+            for issue in make_jira_issues(count):
+                fields = issue["fields"]
+                writer.writerow([issue["key"], fields["summary"], fields["description"], fields["updated"],
+                                 fields["project_id"], fields["root_cause"], fields["solution"]])
+        else:
+            f.write('{"startAt": 0, "total": %d, "issues": [\n' % count)
+            for i, issue in enumerate(make_jira_issues(count)):
+                f.write(("," if i else "") + json.dumps(issue) + "\n")
+            f.write("]}\n")
+    print(f"✅ Wrote {count} issues to {path}")
+
+
+def main():
+    args = parse_args()
+
+    if args.offline:
+        # Never touch the real database
+        os.environ.setdefault("ANTHROPIC_API_KEY", "offline-ingest")
+        os.environ["MONGO_URI"] = "mongodb://localhost:27017"
+        os.environ.setdefault("MONGO_DB_NAME", "ingest_test")
+        if not args.real_embeddings:
+            os.environ["EMBEDDING_MODEL"] = "load-test:hash"
+
+    if args.write_sample:
+        write_sample(args.write_sample, args.count)
+        return
+
+    # Imported after the environment is set up
+    import load_harness.synthetic  # noqa: F401 - registers the hashing backend
+    from database.ticket_ingestion import (
+        JiraAPISource, ingest_tickets, iter_csv_export, iter_json_export, sync_from_jira,
+    )
+    from config.settings import JIRA_BASE_URL, TICKET_INGEST_BATCH_SIZE
+
+    batch_size = args.batch_size or TICKET_INGEST_BATCH_SIZE
+    if args.offline:
+        from load_harness.stub_mongo import StubDatabase
+        from database.mongo_client import set_database
+        set_database(StubDatabase())
+
+    print("="*70)
+    if args.stand_in:
+        from load_harness.jira_stub import JiraStub, make_jira_issues
+
+        issues = list(make_jira_issues(args.stand_in))
+        with JiraStub(issues) as stub:
+            source = JiraAPISource(stub.url)
+            print(f"🎫 Syncing {args.stand_in} issues from the local Jira stand-in ({stub.url})")
+            stats = sync_from_jira(source, batch_size=batch_size, full=args.full)
+            print(f"   Full sync:        {stats.summary()}")
+
+            # Nothing changed: the overlap window is re-fetched but nothing is re-embedded
+            stats = sync_from_jira(source, batch_size=batch_size)
+            print(f"   Repeat sync:      {stats.summary()}")
+
+            # A few new issues arrive
+            stub.add(list(make_jira_issues(args.stand_in + 50, seed=1))[args.stand_in:])
+            stats = sync_from_jira(source, batch_size=batch_size)
+            print(f"   Incremental sync: {stats.summary()}")
+            print(f"   Jira requests: {stub.requests}")
+
+    elif args.jira:
+        if not JIRA_BASE_URL:
+            raise SystemExit("JIRA_BASE_URL is not set")
+        source = JiraAPISource(JIRA_BASE_URL)
+        print(f"🎫 Syncing tickets from {source.base_url}")
+        stats = sync_from_jira(source, batch_size=batch_size, full=args.full)
+        print(f"   {stats.summary()}")
+
+    elif args.export:
+        records = iter_csv_export(args.export) if args.export.endswith(".csv") else iter_json_export(args.export)
+        source_name = args.source_name or f"export:{os.path.basename(args.export)}"
+        print(f"🎫 Ingesting {args.export}")
+        stats = ingest_tickets(records, source_name, batch_size=batch_size, full=args.full)
+        print(f"   {stats.summary()}")
+
+    else:
+        raise SystemExit("Give an export path, --jira or --stand-in N (see --help)")
+
+    print(f"   Watermark: {stats.watermark} | Peak RSS: {peak_rss_mb():.0f} MB")
+    print("="*70)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,105 @@
+"""
+Local stand-in for the Jira REST API (/rest/api/2/search) serving synthetic
+issues, so ticket ingestion can be exercised end to end without a Jira instance.
+"""
+import json
+import random
+import re
+import threading
+from datetime import datetime, timedelta, timezone
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, Iterator, List
+from urllib.parse import parse_qs, urlparse
+
+from load_harness.synthetic import COMPONENTS, DOMAINS, SYMPTOMS
+
+JQL_SINCE = re.compile(r'updated\s*>=\s*"([^"]+)"')
+
+
+def make_jira_issues(count: int, num_projects: int = 60, seed: int = 0,
+                     start: datetime = datetime(2025, 1, 1, tzinfo=timezone.utc)) -> Iterator[Dict]:
+    """Synthetic issues in Jira REST shape, one update per minute from start (oldest first)."""
+    rng = random.Random(seed)
+    for i in range(count):
+        project = rng.randrange(num_projects)
+        component, _ = COMPONENTS[project % len(COMPONENTS)]
+        domain = DOMAINS[project % len(DOMAINS)]
+        updated = start + timedelta(minutes=i)
+        yield {
+            "id": str(10000 + i),
+            "key": f"OPS-{i + 1}",
+            "fields": {
+                "summary": f"{domain} {component} {rng.choice(SYMPTOMS)}",
+                "description": f"Reported on the {domain.lower()} {component}. Steps to reproduce attached.",
+                "updated": updated.strftime("%Y-%m-%dT%H:%M:%S.000+0000"),
+                "project": {"key": "OPS"},
+                "project_id": f"proj-{100 + project}",
+                "root_cause": rng.choice(["", "configuration drift between environments", "expired credentials"]),
+                "solution": rng.choice(["", "pinned the configuration and redeployed", "rotated the credentials"]),
+            },
+        }
+
+
+class JiraStub:
+    """
+    Serves issues from memory with Jira's pagination (startAt/maxResults/total) and
+    the 'updated >= "yyyy/MM/dd HH:mm"' JQL clause the ingestion pipeline sends.
+    """
+
+    def __init__(self, issues: List[Dict], port: int = 0):
+        self.issues = sorted(issues, key=lambda issue: issue["fields"]["updated"])
+        self.requests = 0
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                url = urlparse(self.path)
+                if url.path != "/rest/api/2/search":
+                    self.send_error(404)
+                    return
+                params = parse_qs(url.query)
+                body = json.dumps(stub.search(
+                    params.get("jql", [""])[0],
+                    int(params.get("startAt", ["0"])[0]),
+                    int(params.get("maxResults", ["50"])[0]),
+                )).encode("utf-8")
+                self.send_response(200)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, *args):
+                pass
+
+        self.server = ThreadingHTTPServer(("127.0.0.1", port), Handler)
+        self._thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+
+    @property
+    def url(self) -> str:
+        return f"http://127.0.0.1:{self.server.server_address[1]}"
+
+    def search(self, jql: str, start_at: int, max_results: int) -> Dict:
+        self.requests += 1
+        issues = self.issues
+        match = JQL_SINCE.search(jql)
+        if match:
+            since = datetime.strptime(match.group(1), "%Y/%m/%d %H:%M").strftime("%Y-%m-%dT%H:%M")
+            issues = [issue for issue in issues if issue["fields"]["updated"] >= since]
+        return {
+            "startAt": start_at,
+            "maxResults": max_results,
+            "total": len(issues),
+            "issues": issues[start_at:start_at + max_results],
+        }
+
+    def add(self, issues: List[Dict]):
+        self.issues = sorted(self.issues + issues, key=lambda issue: issue["fields"]["updated"])
+
+    def __enter__(self):
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self.server.shutdown()
+        self.server.server_close()
@@ -0,0 +1,310 @@
+"""
+Deterministic local stand-ins for the Anthropic Messages API.
+
+ScriptedLLM  - follows the orchestrator's expected workflow: search with the key
+               terms of the user message, then confirm the top project.
+RecordingLLM - wraps a real client and writes every response to a JSONL file.
+ReplayLLM    - plays a recording back (falls back to ScriptedLLM on a miss).
+
+All of them return objects shaped like anthropic.types.Message (content blocks with
+.type/.text/.id/.name/.input, stop_reason, usage) and sleep for a configurable
+latency so the orchestrator sees realistic timings.
+"""
+import hashlib
+import json
+import random
+import re
+import threading
+import time
+from abc import ABC, abstractmethod
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional
+
+from utils.text import extract_key_terms
+
+ID_PATTERN = re.compile(r"\(ID: ([^)]+)\)")
+SCORE_PATTERN = re.compile(r"Similarity Score: ([0-9.]+)")
+NAME_PATTERN = re.compile(r"^\d+\. (.+?) \(ID:", re.MULTILINE)
+SAID_PREFIX = "Developer said: "  # See ConversationState.compacted_messages
+
+
+def estimate_tokens(value: Any) -> int:
+    return max(1, len(json.dumps(value, default=_block_to_dict)) // 4)
+
+
+def _block_to_dict(block):
+    if hasattr(block, "model_dump"):
+        return block.model_dump()
+    return str(block)
+
+
+class StubAPIError(Exception):
+    """Mimics anthropic.APIStatusError (status_code attribute) for injected failures."""
+
+    def __init__(self, status_code: int, message: str = ""):
+        super().__init__(message or f"stub API error {status_code}")
+        self.status_code = status_code
+        self.response = None
+
+
+@dataclass
+class StubBlock:
+    type: str
+    text: Optional[str] = None
+    id: Optional[str] = None
+    name: Optional[str] = None
+    input: Optional[Dict] = None
+
+    def model_dump(self, **kwargs) -> Dict:
+        return {k: v for k, v in self.__dict__.items() if v is not None}
+
+
+@dataclass
+class StubUsage:
+    input_tokens: int = 0
+    output_tokens: int = 0
+
+
+@dataclass
+class StubMessage:
+    content: List[StubBlock]
+    stop_reason: str
+    usage: StubUsage = field(default_factory=StubUsage)
+    model: str = "stub"
+    role: str = "assistant"
+
+
+def message_from_dict(data: Dict) -> StubMessage:
+    return StubMessage(
+        content=[StubBlock(**b) for b in data["content"]],
+        stop_reason=data["stop_reason"],
+        usage=StubUsage(**data.get("usage", {})),
+    )
+
+
+def message_to_dict(message) -> Dict:
+    return {
+        "content": [_block_to_dict(b) for b in message.content],
+        "stop_reason": message.stop_reason,
+        "usage": {"input_tokens": message.usage.input_tokens, "output_tokens": message.usage.output_tokens},
+    }
+
+
+class _Messages:
+    def __init__(self, owner):
+        self._owner = owner
+
+    def create(self, **kwargs):
+        return self._owner.create(**kwargs)
+
+
+class StubLLMBase(ABC):
+    """Shared latency model and counters."""
+
+    def __init__(self, latency_ms: float = 800.0, jitter_ms: float = 200.0,
+                 ms_per_output_token: float = 0.0, seed: int = 0, error_rate: float = 0.0):
+        self.latency_ms = latency_ms
+        self.jitter_ms = jitter_ms
+        self.ms_per_output_token = ms_per_output_token
+        self.error_rate = error_rate  # Fraction of calls that fail with a 429
+        self.messages = _Messages(self)
+
+        self._rng = random.Random(seed)
+        self._lock = threading.Lock()
+        self.calls = 0
+        self.in_flight = 0
+        self.max_in_flight = 0
+        self.input_tokens = 0
+        self.output_tokens = 0
+        self.injected_errors = 0
+
+    def _sleep(self, output_tokens: int):
+        with self._lock:
+            jitter = self._rng.gauss(0, self.jitter_ms) if self.jitter_ms else 0.0
+        delay = max(0.0, self.latency_ms + jitter + output_tokens * self.ms_per_output_token) / 1000.0
+        time.sleep(delay)
+
+    def create(self, **kwargs):
+        with self._lock:
+            self.calls += 1
+            if self.error_rate and self._rng.random() < self.error_rate:
+                self.injected_errors += 1
+                raise StubAPIError(429, "rate_limit_error (injected)")
+            self.in_flight += 1
+            self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        try:
+            message = self.respond(**kwargs)
+            self._sleep(message.usage.output_tokens)
+        finally:
+            with self._lock:
+                self.in_flight -= 1
+
+        with self._lock:
+            self.input_tokens += message.usage.input_tokens
+            self.output_tokens += message.usage.output_tokens
+        return message
+
+    @abstractmethod
+    def respond(self, **kwargs) -> StubMessage:
+        """The reply to one messages.create request (called with its keyword arguments)."""
+
+    def stats(self) -> Dict:
+        return {
+            "calls": self.calls,
+            "max_in_flight": self.max_in_flight,
+            "input_tokens": self.input_tokens,
+            "output_tokens": self.output_tokens,
+            "injected_errors": self.injected_errors,
+        }
+
+
+class ScriptedLLM(StubLLMBase):
+    """
+    Rule-based stand-in for Claude:
+      user text      -> brief message + search_projects(key terms)
+      search results -> confirm the top project if it scores >= confirm_threshold,
+                        otherwise ask for more details
+    Search results handed over up front (with the user text) are used directly.
+
+    With use_history the search covers everything the developer has said (as the
+    real model would combine earlier hints), and with ambiguity_margin > 0 close
+    runners-up make it ask the developer to choose instead of confirming.
+    """
+
+    def __init__(self, confirm_threshold: float = 0.5, ambiguity_margin: float = 0.0,
+                 use_history: bool = False, **kwargs):
+        super().__init__(**kwargs)
+        self.confirm_threshold = confirm_threshold
+        self.ambiguity_margin = ambiguity_margin
+        self.use_history = use_history
+        self._tool_ids = 0
+
+    def _next_tool_id(self) -> str:
+        with self._lock:
+            self._tool_ids += 1
+            return f"toolu_stub_{self._tool_ids:06d}"
+
+    def respond(self, messages: List[Dict], system: str = "", **kwargs) -> StubMessage:
+        input_tokens = estimate_tokens(system) + estimate_tokens(messages) + estimate_tokens(kwargs.get("tools", []))
+        last = messages[-1]
+        content = last["content"]
+        is_tool_results = isinstance(content, list) and any(
+            isinstance(b, dict) and b.get("type") == "tool_result" for b in content
+        )
+        if not is_tool_results and isinstance(content, list):
+            content = "\n".join(b.get("text", "") for b in content if isinstance(b, dict))
+
+        if not is_tool_results and "search_projects results" in content and self._confident(content):
+            blocks = [StubBlock(type="text", text=self._answer_from_text(content))]
+            stop_reason = "end_turn"
+        elif not is_tool_results:
+            query_text = " ".join(self._user_texts(messages)) if self.use_history else content
+            blocks = [
+                StubBlock(type="text", text="Give me a second to double check with the database..."),
+                StubBlock(type="tool_use", id=self._next_tool_id(), name="search_projects",
+                          input={"query": self._query(query_text) or content}),
+            ]
+            stop_reason = "tool_use"
+        else:
+            blocks = [StubBlock(type="text", text=self._answer_from_results(content))]
+            stop_reason = "end_turn"
+
+        output_tokens = estimate_tokens([b.model_dump() for b in blocks])
+        return StubMessage(blocks, stop_reason, StubUsage(input_tokens, output_tokens))
+
+    @staticmethod
+    def _user_texts(messages: List[Dict]) -> List[str]:
+        """What the developer has said so far (including a compacted history summary)."""
+        texts = []
+        for message in messages:
+            if message["role"] != "user":
+                continue
+            content = message["content"]
+            if isinstance(content, str):
+                content = [{"type": "text", "text": content}]
+            for block in content:
+                if not isinstance(block, dict) or block.get("type") != "text" or block["text"].startswith("(Automatic"):
+                    continue
+                if block["text"].startswith("(Summary"):
+                    texts += [line[len(SAID_PREFIX):] for line in block["text"].splitlines() if line.startswith(SAID_PREFIX)]
+                else:
+                    texts.append(block["text"])
+        return texts
+
+    @staticmethod
+    def _query(text: str) -> str:
+        """Key terms, each once, in order of first mention."""
+        return " ".join(dict.fromkeys(extract_key_terms(text).split()))
+
+    def _confident(self, text: str) -> bool:
+        scores = SCORE_PATTERN.findall(text)
+        return bool(scores) and float(scores[0]) >= self.confirm_threshold
+
+    def _answer_from_results(self, tool_results: List[Dict]) -> str:
+        text = "\n".join(str(r.get("content", "")) for r in tool_results if isinstance(r, dict))
+        return self._answer_from_text(text)
+
+    def _answer_from_text(self, text: str) -> str:
+        ids = ID_PATTERN.findall(text)
+        scores = [float(s) for s in SCORE_PATTERN.findall(text)]
+        names = NAME_PATTERN.findall(text)
+
+        if ids and scores and scores[0] >= self.confirm_threshold:
+            close = [i for i, score in enumerate(scores[:len(ids)]) if scores[0] - score < self.ambiguity_margin]
+            if len(close) > 1 and len(names) >= len(close):
+                options = " or ".join(f"{names[i]} (ID: {ids[i]})" for i in close[:3])
+                return f"I found a few close matches: {options}. Which one is it?"
+            name = names[0] if names else ids[0]
+            return f"Sounds like you're working on {name} (Project ID: {ids[0]}). Is that right?"
+        return "I couldn't find a strong match. Could you tell me a bit more about what you're working on?"
+
+
+def request_key(kwargs: Dict) -> str:
+    """Stable key for a request: the conversation so far (system prompt/tools excluded)."""
+    payload = json.dumps(kwargs.get("messages", []), default=_block_to_dict, sort_keys=True)
+    return hashlib.sha256(payload.encode()).hexdigest()
+
+
+class RecordingLLM(StubLLMBase):
+    """Passes requests to a real client and appends each response to a JSONL recording."""
+
+    def __init__(self, real_client, path: str):
+        super().__init__(latency_ms=0, jitter_ms=0)
+        self.real_client = real_client
+        self.path = path
+        self._file_lock = threading.Lock()
+
+    def respond(self, **kwargs):
+        message = self.real_client.messages.create(**kwargs)
+        record = {"key": request_key(kwargs), "response": message_to_dict(message)}
+        with self._file_lock, open(self.path, "a") as f:
+            f.write(json.dumps(record) + "\n")
+        return message
+
+
+class ReplayLLM(StubLLMBase):
+    """Plays back a RecordingLLM file; requests that weren't recorded go to a ScriptedLLM."""
+
+    def __init__(self, path: str, **kwargs):
+        super().__init__(**kwargs)
+        self.fallback = ScriptedLLM()
+        self.recorded: Dict[str, Dict] = {}
+        self.misses = 0
+        with open(path) as f:
+            for line in f:
+                if line.strip():
+                    record = json.loads(line)
+                    self.recorded[record["key"]] = record["response"]
+
+    def respond(self, **kwargs) -> StubMessage:
+        response = self.recorded.get(request_key(kwargs))
+        if response is None:
+            with self._lock:
+                self.misses += 1
+            return self.fallback.respond(**kwargs)
+        return message_from_dict(response)
+
+    def stats(self) -> Dict:
+        stats = super().stats()
+        stats["replay_misses"] = self.misses
+        return stats
@@ -0,0 +1,439 @@
+"""
+In-memory stand-in for the parts of pymongo the backend uses.
+
+Good enough for offline load tests and benchmarks: equality/$or/$and/$in/$exists/
+$regex/comparison filters, dotted paths, include/exclude projections, $set/$inc/
+$unset/$setOnInsert updates with upsert, and bulk_write of pymongo operations.
+create_index builds a hash index used for equality/$in lookups on that field, so
+ingestion-sized collections don't turn every upsert into a full scan. Every
+operation can be given an artificial latency to mimic a network hop.
+"""
+import copy
+import re
+import threading
+import time
+from typing import Any, Dict, List, Optional
+
+_MISSING = object()
+
+
+def _get(doc: Dict, path: str) -> Any:
+    value = doc
+    for part in path.split("."):
+        if not isinstance(value, dict) or part not in value:
+            return _MISSING
+        value = value[part]
+    return value
+
+
+def _set(doc: Dict, path: str, value: Any):
+    parts = path.split(".")
+    for part in parts[:-1]:
+        doc = doc.setdefault(part, {})
+    doc[parts[-1]] = value
+
+
+def _unset(doc: Dict, path: str):
+    parts = path.split(".")
+    for part in parts[:-1]:
+        doc = doc.get(part)
+        if not isinstance(doc, dict):
+            return
+    doc.pop(parts[-1], None)
+
+
+def _match_value(value: Any, condition: Any) -> bool:
+    if isinstance(condition, dict) and condition and all(k.startswith("$") for k in condition):
+        for op, arg in condition.items():
+            if op == "$exists":
+                if (value is not _MISSING) != bool(arg):
+                    return False
+            elif op == "$regex":
+                flags = re.IGNORECASE if "i" in condition.get("$options", "") else 0
+                candidates = value if isinstance(value, list) else [value]
+                if not any(isinstance(c, str) and re.search(arg, c, flags) for c in candidates):
+                    return False
+            elif op == "$options":
+                continue
+            elif op == "$in":
+                candidates = value if isinstance(value, list) else [value]
+                if not any(c in arg for c in candidates):
+                    return False
+            elif op == "$ne":
+                if value == arg:
+                    return False
+            elif op in ("$gt", "$gte", "$lt", "$lte"):
+                if value is _MISSING or value is None:
+                    return False
+                if op == "$gt" and not value > arg:
+                    return False
+                if op == "$gte" and not value >= arg:
+                    return False
+                if op == "$lt" and not value < arg:
+                    return False
+                if op == "$lte" and not value <= arg:
+                    return False
+            else:
+                raise NotImplementedError(f"Stub Mongo does not support {op}")
+        return True
+
+    if isinstance(value, list) and not isinstance(condition, list):
+        return condition in value
+    return value == condition
+
+
+def match(doc: Dict, flt: Optional[Dict]) -> bool:
+    for key, condition in (flt or {}).items():
+        if key == "$or":
+            if not any(match(doc, f) for f in condition):
+                return False
+        elif key == "$and":
+            if not all(match(doc, f) for f in condition):
+                return False
+        elif not _match_value(_get(doc, key), condition):
+            return False
+    return True
+
+
+def project(doc: Dict, projection: Optional[Dict]) -> Dict:
+    if not projection:
+        return copy.deepcopy(doc)
+
+    include = {k for k, v in projection.items() if v and k != "_id"}
+    if include:
+        result = {}
+        for path in include:
+            value = _get(doc, path)
+            if value is not _MISSING:
+                _set(result, path, copy.deepcopy(value))
+        if projection.get("_id", 1) and "_id" in doc:
+            result["_id"] = doc["_id"]
+        return result
+
+    result = copy.deepcopy(doc)
+    for path, keep in projection.items():
+        if not keep:
+            _unset(result, path)
+    return result
+
+
+class InsertOneResult:
+    def __init__(self, inserted_id):
+        self.inserted_id = inserted_id
+
+
+class UpdateResult:
+    def __init__(self, matched: int, modified: int, upserted_id=None):
+        self.matched_count = matched
+        self.modified_count = modified
+        self.upserted_id = upserted_id
+
+
+class BulkWriteResult:
+    def __init__(self):
+        self.matched_count = 0
+        self.modified_count = 0
+        self.upserted_count = 0
+        self.inserted_count = 0
+
+
+class DeleteResult:
+    def __init__(self, deleted: int):
+        self.deleted_count = deleted
+
+
+class StubCursor:
+    def __init__(self, docs: List[Dict]):
+        self._docs = docs
+
+    def sort(self, key, direction: int = 1):
+        if isinstance(key, list):
+            for k, d in reversed(key):
+                self._docs.sort(key=lambda doc: _sort_key(_get(doc, k)), reverse=d < 0)
+        else:
+            self._docs.sort(key=lambda doc: _sort_key(_get(doc, key)), reverse=direction < 0)
+        return self
+
+    def limit(self, n: int):
+        if n:
+            self._docs = self._docs[:n]
+        return self
+
+    def batch_size(self, n: int):
+        return self
+
+    def __iter__(self):
+        return iter(self._docs)
+
+
+def _sort_key(value):
+    return (value is _MISSING or value is None, value if value is not _MISSING else None)
+
+
+class StubCollection:
+    def __init__(self, name: str, latency_ms: float = 0.0):
+        self.name = name
+        self.latency = latency_ms / 1000.0
+        self._docs: List[Dict] = []
+        self._lock = threading.Lock()
+        self._next_id = 0
+        # field -> value -> docs (None = unusable); _id is always indexed, as in Mongo
+        self._indexes: Dict[str, Optional[Dict[Any, List[Dict]]]] = {"_id": {}}
+        self._indexes_stale = False
+        self._index_info: Dict[str, Dict] = {}  # Index name -> index_information() entry
+        self.op_count = 0
+
+    def _hop(self):
+        self.op_count += 1
+        if self.latency:
+            time.sleep(self.latency)
+
+    def _new_id(self):
+        self._next_id += 1
+        return f"{self.name}-{self._next_id}"
+
+    # Indexes
+
+    def _index_doc(self, doc: Dict):
+        for path, index in self._indexes.items():
+            if index is None:
+                continue
+            value = _get(doc, path)
+            if value is _MISSING:
+                continue
+            for v in (value if isinstance(value, list) else [value]):
+                try:
+                    index.setdefault(v, []).append(doc)
+                except TypeError:
+                    # Unhashable (sub-document) values - fall back to scanning for this field
+                    self._indexes[path] = None
+                    break
+
+    def _rebuild_indexes(self):
+        for path in self._indexes:
+            self._indexes[path] = {}
+        for doc in self._docs:
+            self._index_doc(doc)
+        self._indexes_stale = False
+
+    def _indexed_values(self, doc: Dict) -> List:
+        return [_get(doc, path) for path in self._indexes]
+
+    def _candidates(self, flt: Optional[Dict]) -> List[Dict]:
+        """Docs that may match flt: an index lookup when flt pins an indexed field, else everything."""
+        if self._indexes_stale:
+            self._rebuild_indexes()
+        for key, condition in (flt or {}).items():
+            index = self._indexes.get(key)
+            if index is None:
+                continue
+            if isinstance(condition, dict) and set(condition) == {"$in"}:
+                values = condition["$in"]
+            elif condition is not None and not isinstance(condition, (dict, list)):
+                values = [condition]
+            else:
+                continue
+            try:
+                found = {id(d): d for v in values for d in index.get(v, ())}
+            except TypeError:
+                continue
+            return list(found.values())
+        return self._docs
+
+    def create_index(self, keys, **kwargs) -> str:
+        # Single field or the leading field of a compound index (uniqueness is recorded, not enforced)
+        path = keys if isinstance(keys, str) else keys[0][0]
+        with self._lock:
+            if path not in self._indexes:
+                self._indexes[path] = {}
+                self._rebuild_indexes()
+            self._index_info[f"{path}_1"] = {"key": [(path, 1)], **({"unique": True} if kwargs.get("unique") else {})}
+        return f"{path}_1"
+
+    def index_information(self) -> Dict[str, Dict]:
+        with self._lock:
+            return {"_id_": {"key": [("_id", 1)]}, **copy.deepcopy(self._index_info)}
+
+    def drop_index(self, name: str):
+        with self._lock:
+            info = self._index_info.pop(name)
+            self._indexes.pop(info["key"][0][0], None)
+
+    # Reads
+
+    def find(self, flt: Optional[Dict] = None, projection: Optional[Dict] = None, **kwargs) -> StubCursor:
+        self._hop()
+        with self._lock:
+            return StubCursor([project(d, projection) for d in self._candidates(flt) if match(d, flt)])
+
+    def find_one(self, flt: Optional[Dict] = None, projection: Optional[Dict] = None, **kwargs) -> Optional[Dict]:
+        self._hop()
+        with self._lock:
+            for d in self._candidates(flt):
+                if match(d, flt):
+                    return project(d, projection)
+        return None
+
+    def count_documents(self, flt: Optional[Dict] = None) -> int:
+        self._hop()
+        with self._lock:
+            return sum(1 for d in self._candidates(flt) if match(d, flt))
+
+    def aggregate(self, pipeline: List[Dict]):
+        raise NotImplementedError("Stub Mongo has no aggregation ($vectorSearch needs Atlas)")
+
+    # Writes
+
+    def insert_one(self, doc: Dict) -> InsertOneResult:
+        self._hop()
+        with self._lock:
+            return InsertOneResult(self._insert(doc))
+
+    def insert_many(self, docs: List[Dict]):
+        self._hop()
+        with self._lock:
+            for doc in docs:
+                self._insert(doc)
+
+    def _insert(self, doc: Dict):
+        doc = copy.deepcopy(doc)
+        doc.setdefault("_id", self._new_id())
+        self._docs.append(doc)
+        self._index_doc(doc)
+        return doc["_id"]
+
+    def _apply_update(self, doc: Dict, update: Dict, inserting: bool):
+        if not any(k.startswith("$") for k in update):
+            # Replacement document
+            keep_id = doc.get("_id")
+            doc.clear()
+            doc.update(copy.deepcopy(update))
+            if keep_id is not None:
+                doc["_id"] = keep_id
+            return
+
+        for path, value in update.get("$set", {}).items():
+            _set(doc, path, copy.deepcopy(value))
+        for path, amount in update.get("$inc", {}).items():
+            current = _get(doc, path)
+            _set(doc, path, (0 if current is _MISSING else current) + amount)
+        for path in update.get("$unset", {}):
+            _unset(doc, path)
+        if inserting:
+            for path, value in update.get("$setOnInsert", {}).items():
+                _set(doc, path, copy.deepcopy(value))
+
+    def _apply_updated_indexed(self, doc: Dict, update: Dict):
+        before = self._indexed_values(doc)
+        self._apply_update(doc, update, inserting=False)
+        if self._indexed_values(doc) != before:
+            self._indexes_stale = True
+
+    def _upsert_doc(self, flt: Dict, update: Dict) -> Dict:
+        doc = {k: copy.deepcopy(v) for k, v in flt.items() if not k.startswith("$") and not isinstance(v, dict)}
+        self._apply_update(doc, update, inserting=True)
+        doc.setdefault("_id", self._new_id())
+        self._docs.append(doc)
+        self._index_doc(doc)
+        return doc
+
+    def _update(self, flt: Dict, update: Dict, upsert: bool, many: bool) -> UpdateResult:
+        matched = 0
+        for doc in self._candidates(flt):
+            if match(doc, flt):
+                self._apply_updated_indexed(doc, update)
+                matched += 1
+                if not many:
+                    break
+        if matched == 0 and upsert:
+            return UpdateResult(0, 0, self._upsert_doc(flt, update)["_id"])
+        return UpdateResult(matched, matched)
+
+    def update_one(self, flt: Dict, update: Dict, upsert: bool = False) -> UpdateResult:
+        self._hop()
+        with self._lock:
+            return self._update(flt, update, upsert, many=False)
+
+    def update_many(self, flt: Dict, update: Dict, upsert: bool = False) -> UpdateResult:
+        self._hop()
+        with self._lock:
+            return self._update(flt, update, upsert, many=True)
+
+    def replace_one(self, flt: Dict, replacement: Dict, upsert: bool = False) -> UpdateResult:
+        return self.update_one(flt, replacement, upsert)
+
+    def find_one_and_update(self, flt: Dict, update: Dict, projection: Optional[Dict] = None,
+                            upsert: bool = False, return_document=False, **kwargs) -> Optional[Dict]:
+        self._hop()
+        with self._lock:
+            for doc in self._candidates(flt):
+                if match(doc, flt):
+                    before = project(doc, projection)
+                    self._apply_updated_indexed(doc, update)
+                    return project(doc, projection) if return_document else before
+            if upsert:
+                doc = self._upsert_doc(flt, update)
+                return project(doc, projection) if return_document else None
+        return None
+
+    def bulk_write(self, requests: List, ordered: bool = True) -> BulkWriteResult:
+        """Accepts pymongo UpdateOne/UpdateMany/ReplaceOne/InsertOne/DeleteOne operations."""
+        self._hop()
+        result = BulkWriteResult()
+        with self._lock:
+            for op in requests:
+                kind = type(op).__name__
+                if kind == "InsertOne":
+                    self._insert(op._doc)
+                    result.inserted_count += 1
+                elif kind in ("UpdateOne", "UpdateMany", "ReplaceOne"):
+                    r = self._update(op._filter, op._doc, op._upsert, many=kind == "UpdateMany")
+                    result.matched_count += r.matched_count
+                    result.modified_count += r.modified_count
+                    result.upserted_count += 1 if r.upserted_id is not None else 0
+                elif kind == "DeleteOne":
+                    self._delete(op._filter, many=False)
+                else:
+                    raise NotImplementedError(f"Stub Mongo does not support bulk {kind}")
+        return result
+
+    def delete_many(self, flt: Dict) -> DeleteResult:
+        self._hop()
+        with self._lock:
+            return DeleteResult(self._delete(flt, many=True))
+
+    def delete_one(self, flt: Dict) -> DeleteResult:
+        self._hop()
+        with self._lock:
+            return DeleteResult(self._delete(flt, many=False))
+
+    def _delete(self, flt: Dict, many: bool) -> int:
+        deleted = 0
+        remaining = []
+        for doc in self._docs:
+            if (many or deleted == 0) and match(doc, flt):
+                deleted += 1
+            else:
+                remaining.append(doc)
+        self._docs = remaining
+        if deleted:
+            self._indexes_stale = True
+        return deleted
+
+
+class StubDatabase:
+    """Dict-like database of StubCollections, created on first access."""
+
+    def __init__(self, latency_ms: float = 0.0):
+        self.latency_ms = latency_ms
+        self._collections: Dict[str, StubCollection] = {}
+        self._lock = threading.Lock()
+
+    def __getitem__(self, name: str) -> StubCollection:
+        with self._lock:
+            if name not in self._collections:
+                self._collections[name] = StubCollection(name, self.latency_ms)
+            return self._collections[name]
+
+    def op_counts(self) -> Dict[str, int]:
+        return {name: c.op_count for name, c in self._collections.items()}
@@ -0,0 +1,225 @@
+"""
+Synthetic data for offline runs: a project catalogue (with tickets, owners and
+keywords), developer utterances about those projects, and a cheap deterministic
+hashing embedder that can stand in for the real model.
+"""
+import random
+import re
+import zlib
+from typing import Dict, List, Tuple
+
+import numpy as np
+
+from database.embedding_backends import EmbeddingBackend, register_backend
+
+DOMAINS = [
+    "Customer Feedback", "Checkout", "Billing", "Search", "Onboarding", "Analytics",
+    "Notifications", "Inventory", "Support Portal", "Recommendations", "Fraud Detection",
+    "Partner Integrations", "Mobile App", "Reporting", "Identity", "Pricing",
+]
+COMPONENTS = [
+    ("sentiment widget", "React widget that charts sentiment trends"),
+    ("ml-service", "Python inference API serving the classification model"),
+    ("dashboard", "internal dashboard with real-time charts"),
+    ("data pipeline", "nightly ETL job loading events into the warehouse"),
+    ("auth gateway", "OAuth gateway in front of the public API"),
+    ("email digest", "scheduled email digest built from templates"),
+    ("search indexer", "worker that keeps the search index in sync"),
+    ("payment webhook", "webhook consumer for payment provider events"),
+    ("staging-environment", "shared staging environment on Kubernetes"),
+    ("feature flags", "feature flag rollout service"),
+]
+SYMPTOMS = [
+    "is blank after the last deploy", "keeps timing out", "returns 500 on emoji input",
+    "is showing stale numbers", "crashes on startup", "is really slow today",
+    "drops events under load", "fails the integration tests",
+]
+TEMPLATES = [
+    "hey, the {component} for {domain} {symptom}",
+    "I'm stuck on the {domain} {component}, it {symptom}",
+    "working on {domain} today - the {component} {symptom}",
+    "our {component} {symptom}, this is the {domain} project",
+    "{domain} {component} {symptom}, any ideas?",
+]
+# Hints a developer gives, vaguest first, when the project isn't clear from the start
+OPENERS = [
+    "morning! quick one about my work", "hey, got a minute?", "ugh, rough day with deploys",
+    "hi, need a hand with something",
+]
+COMPONENT_HINTS = ["the {component} {symptom}", "it's the {component}, it {symptom}"]
+DOMAIN_HINTS = ["this is for the {domain} team", "it's the {domain} one", "sorry, I mean for {domain}"]
+NAME_HINTS = ["I mean {name}", "the project is called {name}"]
+FOLLOW_UPS = [
+    "yes that's the one",
+    "what tickets are open on it?",
+    "who owns that project?",
+    "any known blockers there?",
+]
+
+FIRST_NAMES = ["Alice", "Bob", "Chen", "Dana", "Eli", "Fatima", "Gus", "Hana", "Ivan", "Jo", "Liam", "Mei"]
+LAST_NAMES = ["Johnson", "Patel", "Garcia", "Kim", "Nguyen", "Smith", "Okafor", "Rossi"]
+ROLES = ["Frontend Developer", "Backend Developer", "ML Engineer", "DevOps Engineer", "Product Manager"]
+
+
+class HashingBackend(EmbeddingBackend):
+    """
+    Deterministic bag-of-words embedder (signed feature hashing of word unigrams
+    and bigrams). Costs microseconds, needs no model download, and still ranks
+    lexically similar texts close together - enough to exercise the search path.
+    """
+
+    name = "hash"
+
+    def __init__(self, model_name: str, dimensions: int = 384):
+        super().__init__(model_name)
+        self.dimensions = dimensions
+        # Different model names hash differently, so two "models" give unrelated vectors
+        self.salt = zlib.crc32(model_name.encode())
+
+    def _embed(self, text: str) -> np.ndarray:
+        vec = np.zeros(self.dimensions, dtype=np.float32)
+        words = re.findall(r"[a-z0-9]+", text.lower())
+        features = words + [f"{a}_{b}" for a, b in zip(words, words[1:])]
+        for feature in features:
+            h = zlib.crc32(feature.encode(), self.salt)
+            vec[h % self.dimensions] += 1.0 if (h >> 16) & 1 else -1.0
+        norm = np.linalg.norm(vec)
+        return vec / norm if norm else vec
+
+    def encode_batch(self, texts: List[str], batch_size: int = 32) -> np.ndarray:
+        return np.vstack([self._embed(t) for t in texts]) if texts else np.zeros((0, self.dimensions))
+
+
+register_backend(HashingBackend.name, HashingBackend)
+
+
+def build_catalogue(num_projects: int, seed: int = 0) -> Dict[str, List[Dict]]:
+    """Projects, tickets, team members, blockers and keywords documents."""
+    rng = random.Random(seed)
+    pairs = [(d, c) for d in DOMAINS for c in COMPONENTS]
+    rng.shuffle(pairs)
+
+    projects, tickets, members, blockers = [], [], [], []
+    for i in range(num_projects):
+        domain, (component, blurb) = pairs[i % len(pairs)]
+        project_id = f"proj-{100 + i}"
+        projects.append({
+            "id": project_id,
+            "name": f"{domain} {component.replace('-', ' ').title()}",
+            "description": f"{blurb} for the {domain.lower()} team",
+            "status": rng.choice(["active", "active", "at risk", "planning"]),
+            "component": component,
+            "domain": domain,
+            "milestones": [
+                {"id": f"{project_id}-m{m}", "name": f"Milestone {m}",
+                 "due_date": f"2026-{m + 2:02d}-15", "status": rng.choice(["done", "in progress", "planned"])}
+                for m in range(1, 4)
+            ],
+        })
+        for t in range(rng.randint(2, 6)):
+            tickets.append({
+                "id": f"TCK-{100 + i}-{t}",
+                "project_id": project_id,
+                "description": f"{component} {rng.choice(SYMPTOMS)}",
+                "root_cause": "",
+                "solution": "",
+            })
+        member = f"{rng.choice(FIRST_NAMES)} {rng.choice(LAST_NAMES)}"
+        members.append({
+            "id": f"tm-{i}",
+            "name": member,
+            "role": rng.choice(ROLES),
+            "current_task": f"Fixing the {component} on {project_id}",
+            "skills": [component],
+            "project_responsibilities": f"Owns {project_id} ({domain} {component})",
+        })
+        blockers.append({
+            "id": f"blk-{i}",
+            "title": f"{component} {rng.choice(SYMPTOMS)}",
+            "core_issue": f"The {component} {rng.choice(SYMPTOMS)}",
+            "root_cause": "configuration drift between environments",
+            "solution": "pin the configuration and redeploy",
+            "tags": [project_id, component],
+            "resolved_by": member,
+        })
+
+    keywords = {component: blurb for component, blurb in COMPONENTS}
+    return {"projects": projects, "tickets": tickets, "teamMembers": members,
+            "blockers": blockers, "keywords": [keywords]}
+
+
+def make_blockers(count: int, seed: int = 0) -> List[Dict]:
+    """Blockers as different teams report them: the same few problems, worded a little differently."""
+    rng = random.Random(seed)
+    causes = [
+        ("configuration drift between environments", "pin the configuration and redeploy"),
+        ("expired service credentials", "rotate the credentials and update the secret store"),
+        ("a breaking change in an upstream API", "pin the client version until the migration is done"),
+        ("the connection pool running out under load", "raise the pool size and add a timeout"),
+    ]
+    blockers = []
+    for i in range(count):
+        component, _ = rng.choice(COMPONENTS)
+        symptom = rng.choice(SYMPTOMS)
+        root_cause, solution = rng.choice(causes)
+        domain = rng.choice(DOMAINS)
+        blockers.append({
+            "id": f"blk-{i}",
+            "title": f"{component} {symptom}",
+            "core_issue": rng.choice(["The {c} {s}", "{c} {s} again", "Our {c} {s} since the last release"]).format(
+                c=component, s=symptom),
+            "root_cause": root_cause,
+            "solution": solution,
+            "tags": [domain.lower(), component],
+            "resolved_by": f"{rng.choice(FIRST_NAMES)} {rng.choice(LAST_NAMES)}",
+        })
+    return blockers
+
+
+def seed_database(db, catalogue: Dict[str, List[Dict]], embed) -> None:
+    """Insert the catalogue into db, embedding projects the way the backfill does."""
+    projects = catalogue["projects"]
+    vectors = embed([f"{p['name']} {p['description']}" for p in projects])
+    for project, vector in zip(projects, vectors):
+        project["embedding"] = list(map(float, vector))
+
+    for name, docs in catalogue.items():
+        if docs:
+            db[name].insert_many(docs)
+
+
+def make_conversation(projects: List[Dict], rng: random.Random, turns: int) -> Tuple[str, List[str]]:
+    """Pick a target project and script a developer's messages about it."""
+    project = rng.choice(projects)
+    first = rng.choice(TEMPLATES).format(
+        component=project["component"], domain=project["domain"], symptom=rng.choice(SYMPTOMS)
+    )
+    messages = [first] + [rng.choice(FOLLOW_UPS) for _ in range(max(0, turns - 1))]
+    return project["id"], messages
+
+
+def make_labelled_conversation(projects: List[Dict], rng: random.Random, index: int = 0) -> Dict:
+    """
+    A developer talking about one project, giving more specific hints each message
+    until the last one names it. Difficulty is how vague the first message is:
+    specific (component + domain), partial (component only) or vague (small talk).
+    """
+    project = rng.choice(projects)
+    fields = dict(component=project["component"], domain=project["domain"],
+                  symptom=rng.choice(SYMPTOMS), name=project["name"])
+    difficulty = rng.choice(["specific", "partial", "vague"])
+
+    messages = []
+    if difficulty == "vague":
+        messages.append(rng.choice(OPENERS))
+    if difficulty == "specific":
+        messages.append(rng.choice(TEMPLATES).format(**fields))
+    else:
+        messages.append(rng.choice(COMPONENT_HINTS).format(**fields))
+        messages.append(rng.choice(DOMAIN_HINTS).format(**fields))
+    messages.append(rng.choice(NAME_HINTS).format(**fields))
+    # Asked once the project is identified
+    follow_ups = [FOLLOW_UPS[0]] + rng.sample(FOLLOW_UPS[1:], 2)
+
+    return {"id": f"conv-{index:04d}", "project_id": project["id"], "difficulty": difficulty,
+            "messages": messages, "follow_ups": follow_ups}
@@ -0,0 +1,245 @@
+import sys
+sys.path.append('..')
+
+import argparse
+import contextlib
+import json
+import os
+import random
+import resource
+import threading
+import time
+
+# Offline run: never talk to the real API or the real database
+os.environ.setdefault("ANTHROPIC_API_KEY", "offline-load-test")
+os.environ["MONGO_URI"] = "mongodb://localhost:27017"
+os.environ.setdefault("MONGO_DB_NAME", "load_test")
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Drive run_orchestrator_turn with N concurrent synthetic conversations, fully offline.")
+    parser.add_argument("--conversations", type=int, default=50, help="Concurrent synthetic developers")
+    parser.add_argument("--turns", type=int, default=3, help="Messages per conversation")
+    parser.add_argument("--workers", type=int, default=None, help="Turns processed at once (default: one per conversation)")
+    parser.add_argument("--think-time-ms", type=float, default=500, help="Pause between a developer's messages")
+    parser.add_argument("--projects", type=int, default=60, help="Synthetic projects in the catalogue")
+    parser.add_argument("--llm-latency-ms", type=float, default=800, help="Mean stub LLM latency per call")
+    parser.add_argument("--llm-jitter-ms", type=float, default=200, help="Std-dev of stub LLM latency")
+    parser.add_argument("--llm-error-rate", type=float, default=0.0, help="Fraction of stub LLM calls that fail with a 429")
+    parser.add_argument("--llm-rpm", type=int, default=100000, help="Scheduler requests/minute limit (default: effectively unlimited)")
+    parser.add_argument("--llm-tpm", type=int, default=100000000, help="Scheduler tokens/minute limit (default: effectively unlimited)")
+    parser.add_argument("--llm-concurrency", type=int, default=64, help="Scheduler cap on requests in flight")
+    parser.add_argument("--mongo-latency-ms", type=float, default=2, help="Latency per stub Mongo operation")
+    parser.add_argument("--real-embeddings", action="store_true", help="Use the configured EMBEDDING_MODEL instead of the hashing stand-in")
+    parser.add_argument("--replay", help="Replay LLM responses from a recording (JSONL)")
+    parser.add_argument("--record", help="Record real API responses to this JSONL file (costs money!)")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--profile", action="store_true", help="Run the sampling CPU profiler during the test and report hot functions")
+    parser.add_argument("--json-out", help="Also write the report as JSON to this path")
+    return parser.parse_args()
+
+
+def percentile(values, pct):
+    if not values:
+        return None
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, max(0, int(round(pct / 100 * (len(ordered) - 1)))))
+    return ordered[index]
+
+
+def rss_mb() -> float:
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * 4096 / 1e6
+    except OSError:
+        return 0.0
+
+
+class ResourceMonitor:
+    """Samples RSS and thread count in the background."""
+
+    def __init__(self, interval: float = 0.1):
+        self.interval = interval
+        self.peak_rss_mb = 0.0
+        self.peak_threads = 0
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+
+    def _run(self):
+        while not self._stop.is_set():
+            self.peak_rss_mb = max(self.peak_rss_mb, rss_mb())
+            self.peak_threads = max(self.peak_threads, threading.active_count())
+            self._stop.wait(self.interval)
+
+    def __enter__(self):
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self._stop.set()
+        self._thread.join()
+
+
+def run_conversation(orchestrator, ConversationState, messages, slots, think_time, turn_log, lock):
+    state = ConversationState()
+    for i, message in enumerate(messages):
+        if i:
+            time.sleep(think_time)
+
+        submitted = time.perf_counter()
+        with slots:
+            started = time.perf_counter()
+            error = None
+            try:
+                orchestrator.run_orchestrator_turn(state, message)
+            except Exception as e:
+                error = f"{type(e).__name__}: {e}"
+            finished = time.perf_counter()
+
+        with lock:
+            turn_log.append({
+                "queue_wait": started - submitted,
+                "latency": finished - started,
+                "end_to_end": finished - submitted,
+                "error": error,
+            })
+
+
+def main():
+    args = parse_args()
+    if not args.real_embeddings:
+        os.environ["EMBEDDING_MODEL"] = "load-test:hash"
+    os.environ["LLM_REQUESTS_PER_MINUTE"] = str(args.llm_rpm)
+    os.environ["LLM_TOKENS_PER_MINUTE"] = str(args.llm_tpm)
+    os.environ["LLM_MAX_CONCURRENCY"] = str(args.llm_concurrency)
+
+    # Imported after the environment is set up
+    from load_harness.stub_mongo import StubDatabase
+    from load_harness.stub_llm import ScriptedLLM, ReplayLLM, RecordingLLM
+    from load_harness.synthetic import build_catalogue, seed_database, make_conversation
+    from database.mongo_client import set_database
+    from database.embeddings_CosineSimilarity import generate_embeddings, get_embedding_service
+    from database.project_context import get_cache_stats
+    from database.result_cache import get_result_cache
+    from database.keyword_spotter import get_keyword_spotter
+    from utils.conversation_state import ConversationState
+    from agents import orchestrator
+    from agents.llm_scheduler import get_scheduler
+    from agents.speculative import get_speculative_stats
+    from utils.diagnostics import collect_memory, start_profiler, stop_profiler
+
+    db = StubDatabase(latency_ms=args.mongo_latency_ms)
+    set_database(db)
+    catalogue = build_catalogue(args.projects, seed=args.seed)
+    seed_database(db, catalogue, generate_embeddings)
+
+    if args.record:
+        llm = RecordingLLM(orchestrator.client, args.record)
+    elif args.replay:
+        llm = ReplayLLM(args.replay, latency_ms=args.llm_latency_ms, jitter_ms=args.llm_jitter_ms,
+                        seed=args.seed, error_rate=args.llm_error_rate)
+    else:
+        llm = ScriptedLLM(latency_ms=args.llm_latency_ms, jitter_ms=args.llm_jitter_ms,
+                          seed=args.seed, error_rate=args.llm_error_rate)
+    orchestrator.set_client(llm)
+
+    rng = random.Random(args.seed)
+    conversations = [make_conversation(catalogue["projects"], rng, args.turns) for _ in range(args.conversations)]
+    workers = args.workers or args.conversations
+    slots = threading.BoundedSemaphore(workers)
+    turn_log, lock = [], threading.Lock()
+
+    print(f"🚦 Load test: {args.conversations} conversations × {args.turns} turns, {workers} workers")
+    print(f"   LLM: {type(llm).__name__} ({args.llm_latency_ms:.0f}±{args.llm_jitter_ms:.0f} ms) | "
+          f"Mongo: stub ({args.mongo_latency_ms} ms/op) | Embeddings: {os.environ.get('EMBEDDING_MODEL', 'configured')}")
+
+    if args.profile:
+        start_profiler()
+    usage_before = resource.getrusage(resource.RUSAGE_SELF)
+    started = time.perf_counter()
+    with ResourceMonitor() as monitor, open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+        threads = [
+            threading.Thread(
+                target=run_conversation,
+                args=(orchestrator, ConversationState, messages, slots, args.think_time_ms / 1000, turn_log, lock),
+            )
+            for _, messages in conversations
+        ]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+    wall = time.perf_counter() - started
+    usage_after = resource.getrusage(resource.RUSAGE_SELF)
+    profile = stop_profiler(top=15) if args.profile else None
+
+    cpu = (usage_after.ru_utime - usage_before.ru_utime) + (usage_after.ru_stime - usage_before.ru_stime)
+    latencies = [t["latency"] for t in turn_log]
+    waits = [t["queue_wait"] for t in turn_log]
+    errors = [t["error"] for t in turn_log if t["error"]]
+
+    report = {
+        "conversations": args.conversations,
+        "turns": len(turn_log),
+        "workers": workers,
+        "wall_s": wall,
+        "throughput_turns_per_s": len(turn_log) / wall if wall else None,
+        "latency_ms": {f"p{p}": percentile(latencies, p) * 1000 for p in (50, 90, 95, 99)} if latencies else {},
+        "latency_max_ms": max(latencies) * 1000 if latencies else None,
+        "queue_wait_ms": {f"p{p}": percentile(waits, p) * 1000 for p in (50, 95, 99)} if waits else {},
+        "errors": len(errors),
+        "error_samples": errors[:5],
+        "cpu_s": cpu,
+        "cpu_utilisation": cpu / wall if wall else None,
+        "peak_rss_mb": monitor.peak_rss_mb,
+        "peak_threads": monitor.peak_threads,
+        "llm": llm.stats(),
+        "llm_scheduler": get_scheduler().stats(),
+        "mongo_ops": db.op_counts(),
+        "speculative_retrieval": get_speculative_stats(),
+        "keyword_spotter": get_keyword_spotter().stats(),
+        "embedding_service": get_embedding_service().stats(),
+        "result_cache": get_result_cache().stats(),
+        "project_context_cache": get_cache_stats(),
+        "memory": collect_memory(),
+    }
+    if profile:
+        report["profile"] = profile
+
+    print("\n" + "="*70)
+    print(f"Turns: {report['turns']} in {wall:.1f}s → {report['throughput_turns_per_s']:.2f} turns/s "
+          f"({report['errors']} errors)")
+    if latencies:
+        lat = report["latency_ms"]
+        print(f"Turn latency ms: p50 {lat['p50']:.0f} | p90 {lat['p90']:.0f} | p95 {lat['p95']:.0f} | "
+              f"p99 {lat['p99']:.0f} | max {report['latency_max_ms']:.0f}")
+        qw = report["queue_wait_ms"]
+        print(f"Queue wait ms:   p50 {qw['p50']:.0f} | p95 {qw['p95']:.0f} | p99 {qw['p99']:.0f}")
+    print(f"CPU: {cpu:.1f}s ({report['cpu_utilisation']:.0%} of one core) | Peak RSS: {monitor.peak_rss_mb:.0f} MB | "
+          f"Peak threads: {monitor.peak_threads}")
+    print(f"LLM: {report['llm']}")
+    print(f"LLM scheduler: {report['llm_scheduler']}")
+    print(f"Speculative retrieval: {report['speculative_retrieval']}")
+    print(f"Keyword spotter: {report['keyword_spotter']}")
+    print(f"Embedding service: {report['embedding_service']}")
+    print(f"Result cache hit rate: {report['result_cache']['hit_rate']}")
+    memory = report["memory"]
+    print(f"Memory: RSS {memory['rss_bytes'] / 1e6:.0f} MB, by component: " + ", ".join(
+        f"{name} {component['bytes'] / 1e6:.2f} MB" for name, component in memory["components"].items()
+    ))
+    if profile:
+        print(f"CPU profile ({profile['samples']} samples, own time):")
+        for row in profile["self"][:10]:
+            print(f"   {row['percent']:5.1f}%  {row['function']}")
+    for sample in report["error_samples"]:
+        print(f"   ❌ {sample}")
+    print("="*70)
+
+    if args.json_out:
+        with open(args.json_out, "w") as f:
+            json.dump(report, f, indent=2, default=str)
+        print(f"Report written to {args.json_out}")
+
+
+if __name__ == "__main__":
+    main()
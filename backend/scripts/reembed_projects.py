@@ -0,0 +1,176 @@
+"""
+Switch the projects index to a new embedding model without downtime
+(database/embedding_generations.py).
+
+    python reembed_projects.py --model all-MiniLM-L12-v2:onnx     # build, validate, activate
+    python reembed_projects.py --model all-MiniLM-L12-v2:onnx --no-activate
+    python reembed_projects.py --status
+    python reembed_projects.py --activate g3                      # e.g. after --no-activate
+    python reembed_projects.py --rollback                         # back to the previous generation
+    python reembed_projects.py --drop legacy                      # free a retired generation's vectors
+    python reembed_projects.py --offline                          # in-memory demo with searches running
+"""
+import sys
+sys.path.append('..')
+
+import argparse
+import json
+import os
+import threading
+import time
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Blue/green re-embedding of the projects index.")
+    parser.add_argument("--model", help="Embedding model spec for a new generation ('<model>[:<backend>]')")
+    parser.add_argument("--rate", type=float, default=None, help="Projects embedded per second while building (0 = unthrottled)")
+    parser.add_argument("--no-activate", action="store_true", help="With --model: stop after validation")
+    parser.add_argument("--resume", help="Continue building an existing generation (id)")
+    parser.add_argument("--status", action="store_true", help="Show generations and exit")
+    parser.add_argument("--activate", help="Switch to this generation (id)")
+    parser.add_argument("--rollback", action="store_true", help="Switch back to the most recently retired generation")
+    parser.add_argument("--drop", help="Delete a retired generation's vectors (id)")
+    parser.add_argument("--force", action="store_true", help="Activate without a passed validation")
+    parser.add_argument("--offline", action="store_true", help="Demo against an in-memory Mongo with hashing embeddings")
+    parser.add_argument("--projects", type=int, default=300, help="With --offline: synthetic projects")
+    return parser.parse_args()
+
+
+def print_status():
+    from database.embedding_generations import generation_status
+
+    for row in generation_status("projects"):
+        progress = f"{row['built']}/{row['total']}" if row["total"] else "-"
+        validation = row["validation"]
+        verdict = "-" if not validation else ("passed" if validation["passed"] else "FAILED")
+        print(f"   {row['id']:<8} {row['status']:<9} {row['model']:<32} {row['field']:<16} built {progress:<11} validation {verdict}")
+
+
+def rebuild(model: str, rate: float, activate: bool, force: bool, resume: str = None):
+    from database.embedding_generations import (
+        activate_generation, build_generation, create_generation, validate_generation,
+    )
+    from database.index_meta import get_active_generation, get_generations
+
+    previous = get_active_generation("projects")
+    generation = get_generations("projects")[resume] if resume else create_generation(model)
+    print(f"🧬 Generation {generation.id}: {generation.model} → {generation.field} ({generation.dimensions} dims)")
+
+    def progress(done, total):
+        print(f"\r   embedded {done}/{total}", end="", flush=True)
+
+    stats = build_generation(generation, rate=rate, progress=progress)
+    print(f"\n   Built in {stats['seconds']}s ({'complete' if stats['completed'] else 'incomplete'})")
+
+    report = validate_generation(generation)
+    print(f"   Validation vs {report['against']}: {json.dumps({k: v for k, v in report.items() if k != 'validated_at'})}")
+
+    if not activate:
+        print(f"   Not activated - run with --activate {generation.id}")
+        return generation
+    if not (report["passed"] or force):
+        print("   ❌ Validation failed - not activated (use --force to override)")
+        return generation
+
+    active = activate_generation(generation.id, expected_active=previous.id, force=force)
+    print(f"   ✅ Active generation: {active.id} ({active.model}); {previous.id} kept for --rollback")
+    return generation
+
+
+def rollback():
+    from database.embedding_generations import activate_generation, rollback_generation
+
+    previous = rollback_generation("projects")
+    if previous is None:
+        print("   Nothing to roll back to")
+        return
+    # Writers kept it current since it was retired, and it was validated before its first activation
+    active = activate_generation(previous.id)
+    print(f"   ↩️  Active generation: {active.id} ({active.model})")
+
+
+def offline_demo(args):
+    """Seed a catalogue, re-embed it with a second model while searches run, then switch and roll back."""
+    from load_harness.stub_mongo import StubDatabase
+    from load_harness.synthetic import build_catalogue, seed_database
+    from database.mongo_client import set_database
+    from database.embeddings_CosineSimilarity import generate_embeddings
+    from database.index_meta import get_active_generation
+    from database.search import search_projects_formatted
+
+    db = StubDatabase()
+    set_database(db)
+    catalogue = build_catalogue(args.projects)
+    seed_database(db, catalogue, generate_embeddings)
+    queries = [p["name"] for p in catalogue["projects"][:50]]
+
+    stop = threading.Event()
+    searches = {"count": 0, "errors": 0, "generations": {}}
+
+    def searcher():
+        i = 0
+        while not stop.is_set():
+            generation = get_active_generation("projects").id
+            try:
+                search_projects_formatted(queries[i % len(queries)])
+                searches["generations"][generation] = searches["generations"].get(generation, 0) + 1
+            except Exception as e:
+                searches["errors"] += 1
+                print(f"\n   search failed: {e}")
+            searches["count"] += 1
+            i += 1
+            time.sleep(0.005)
+
+    thread = threading.Thread(target=searcher, daemon=True)
+    thread.start()
+
+    rebuild("load-test-v2:hash", args.rate if args.rate is not None else 200, activate=True, force=False)
+    time.sleep(0.2)
+    rollback()
+    time.sleep(0.2)
+    stop.set()
+    thread.join()
+
+    print_status()
+    print(f"   Searches during the switch: {searches['count']} ({searches['errors']} errors), "
+          f"by generation: {searches['generations']}")
+
+
+def main():
+    args = parse_args()
+
+    if args.offline:
+        # Never touch the real database
+        os.environ.setdefault("ANTHROPIC_API_KEY", "offline-reembed")
+        os.environ["MONGO_URI"] = "mongodb://localhost:27017"
+        os.environ.setdefault("MONGO_DB_NAME", "reembed_test")
+        os.environ["EMBEDDING_MODEL"] = "load-test:hash"
+
+    # Imported after the environment is set up
+    from config.settings import GENERATION_BUILD_RATE
+
+    print("="*70)
+    if args.offline:
+        offline_demo(args)
+    elif args.status:
+        print_status()
+    elif args.activate:
+        from database.embedding_generations import activate_generation
+        active = activate_generation(args.activate, force=args.force)
+        print(f"   ✅ Active generation: {active.id} ({active.model})")
+    elif args.rollback:
+        rollback()
+    elif args.drop:
+        from database.embedding_generations import drop_generation
+        drop_generation(args.drop)
+        print(f"   🗑️  Dropped generation {args.drop}")
+    elif args.model or args.resume:
+        rate = args.rate if args.rate is not None else GENERATION_BUILD_RATE
+        rebuild(args.model, rate, activate=not args.no_activate, force=args.force, resume=args.resume)
+    else:
+        print_status()
+    print("="*70)
+
+
+if __name__ == "__main__":
+    main()
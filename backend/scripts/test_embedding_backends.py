@@ -0,0 +1,136 @@
+import sys
+sys.path.append('..')
+
+import gc
+import time
+import numpy as np
+
+from database.embedding_backends import load_backend, parse_model_spec
+from config.settings import EMBEDDING_MODEL
+
+# Backends compared against the PyTorch reference, with the minimum cosine each must reach on every text
+CANDIDATES = {
+    "int8": 0.97,
+    "onnx": 0.999,
+    "onnx-int8": 0.97,
+}
+
+# Used when the projects collection can't be reached
+FALLBACK_TEXTS = [
+    "Customer Feedback Sentiment Dashboard Real-time dashboard showing sentiment trends from support tickets",
+    "sentiment widget is blank after the last deploy",
+    "ML API returns 500 on emoji edge case",
+    "staging environment keeps timing out when the ml-service restarts",
+    "customer feedback",
+    "widget blank",
+]
+
+
+def load_project_texts() -> list:
+    """Project texts in the same 'name description' form the backfill embeds."""
+    try:
+        from database.mongo_client import get_collection
+        projects = get_collection("projects").find({}, {"_id": 0, "name": 1, "description": 1})
+        texts = [f"{p['name']} {p['description']}" for p in projects]
+        if texts:
+            return texts
+    except Exception as e:
+        print(f"   ⚠️  Could not load projects ({e}), using built-in sample texts")
+    return FALLBACK_TEXTS
+
+
+def rss_bytes() -> int:
+    """Current resident set size (Linux)."""
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * 4096
+    except OSError:
+        return 0
+
+
+def measure(spec: str, texts: list) -> dict:
+    """Load a backend and time single-text and batched encoding."""
+    gc.collect()
+    rss_before = rss_bytes()
+    started = time.perf_counter()
+    backend = load_backend(spec)
+    load_s = time.perf_counter() - started
+    backend.encode(texts[0])  # warm-up
+    rss_after = rss_bytes()
+
+    single = []
+    for text in texts:
+        t0 = time.perf_counter()
+        backend.encode(text)
+        single.append((time.perf_counter() - t0) * 1000)
+
+    t0 = time.perf_counter()
+    embeddings = np.asarray(backend.encode(texts, batch_size=32))
+    batch_s = time.perf_counter() - t0
+
+    return {
+        "backend": backend,
+        "embeddings": embeddings,
+        "load_s": load_s,
+        "p50_ms": float(np.percentile(single, 50)),
+        "p95_ms": float(np.percentile(single, 95)),
+        "texts_per_s": len(texts) / batch_s if batch_s else float("inf"),
+        "weights_mb": backend.memory_bytes() / 1e6,
+        "rss_delta_mb": (rss_after - rss_before) / 1e6,
+    }
+
+
+def cosine_rows(a: np.ndarray, b: np.ndarray) -> np.ndarray:
+    a = a / np.linalg.norm(a, axis=1, keepdims=True)
+    b = b / np.linalg.norm(b, axis=1, keepdims=True)
+    return (a * b).sum(axis=1)
+
+
+def test_embedding_backends():
+    """Check each backend's cosine agreement with the PyTorch reference and compare cost."""
+    model_name, _ = parse_model_spec(EMBEDDING_MODEL)
+    texts = load_project_texts()
+
+    print("🧪 Embedding Backend Parity")
+    print("="*70)
+    print(f"Model: {model_name} | Texts: {len(texts)}")
+
+    reference = measure(f"{model_name}:torch", texts)
+    rows = [("torch", reference, None)]
+    failures = []
+
+    for backend_name, min_cosine in CANDIDATES.items():
+        print(f"\n📝 Backend: {backend_name}")
+        try:
+            result = measure(f"{model_name}:{backend_name}", texts)
+        except ImportError as e:
+            print(f"   ⏭️  Skipped (missing dependency: {e})")
+            continue
+
+        cosines = cosine_rows(reference["embeddings"], result["embeddings"])
+        print(f"   Cosine vs torch: mean {cosines.mean():.5f}, min {cosines.min():.5f} (required ≥ {min_cosine})")
+        if cosines.min() < min_cosine:
+            worst = int(cosines.argmin())
+            print(f"   ❌ Parity failed on: '{texts[worst][:80]}'")
+            failures.append(backend_name)
+        else:
+            print("   ✅ Parity OK")
+        rows.append((backend_name, result, cosines.mean()))
+
+    print("\n" + "="*70)
+    print(f"{'backend':<11}{'load s':>8}{'p50 ms':>9}{'p95 ms':>9}{'texts/s':>10}{'weights MB':>12}{'RSS Δ MB':>10}{'cos':>9}")
+    for name, r, cos in rows:
+        cos_str = f"{cos:.4f}" if cos is not None else "ref"
+        print(f"{name:<11}{r['load_s']:>8.2f}{r['p50_ms']:>9.2f}{r['p95_ms']:>9.2f}"
+              f"{r['texts_per_s']:>10.1f}{r['weights_mb']:>12.1f}{r['rss_delta_mb']:>10.1f}{cos_str:>9}")
+
+    print("="*70)
+    if failures:
+        print(f"❌ Parity failed for: {', '.join(failures)}")
+        return False
+    print("✅ Test complete!")
+    return True
+
+
+if __name__ == "__main__":
+    sys.exit(0 if test_embedding_backends() else 1)
@@ -0,0 +1,128 @@
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Hashable, List, Optional
+
+
+class TTLCache:
+    """Thread-safe LRU cache whose entries expire after a fixed TTL."""
+
+    def __init__(
+        self,
+        max_entries: int,
+        ttl_seconds: float,
+        name: str = "cache",
+        max_bytes: Optional[int] = None,
+        sizeof: Optional[Callable[[Any], int]] = None,
+    ):
+        """
+        Args:
+            max_entries: Maximum number of entries kept (least recently used evicted first)
+            ttl_seconds: Seconds an entry stays valid after it was stored
+            name: Label used in stats output
+            max_bytes: Optional bound on the summed size of stored values
+            sizeof: Estimates a value's size in bytes (required with max_bytes)
+        """
+        if max_bytes is not None and sizeof is None:
+            raise ValueError("TTLCache needs a sizeof function when max_bytes is set")
+
+        self.name = name
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.max_bytes = max_bytes
+        self.sizeof = sizeof
+        self._bytes = 0
+
+        self._data: "OrderedDict[Hashable, tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+
+        # Stats
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        """Return the cached value for key, or default if missing/expired."""
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                self.misses += 1
+                return default
+
+            value, expires_at, size = entry
+            if expires_at < time.monotonic():
+                del self._data[key]
+                self._bytes -= size
+                self.expirations += 1
+                self.misses += 1
+                return default
+
+            self._data.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def set(self, key: Hashable, value: Any):
+        """Store value under key, evicting the least recently used entries if full."""
+        size = self.sizeof(value) if self.sizeof else 0
+        if self.max_bytes is not None and size > self.max_bytes:
+            return  # Would evict everything else and still not fit
+
+        with self._lock:
+            old = self._data.pop(key, None)
+            if old is not None:
+                self._bytes -= old[2]
+
+            self._data[key] = (value, time.monotonic() + self.ttl_seconds, size)
+            self._bytes += size
+
+            while len(self._data) > self.max_entries or (
+                self.max_bytes is not None and self._bytes > self.max_bytes
+            ):
+                _, (_, _, evicted_size) = self._data.popitem(last=False)
+                self._bytes -= evicted_size
+                self.evictions += 1
+
+    def pop(self, key: Hashable, default: Any = None) -> Any:
+        """Remove key and return its value (expired or not)."""
+        with self._lock:
+            entry = self._data.pop(key, None)
+            if entry is None:
+                return default
+            self._bytes -= entry[2]
+            return entry[0]
+
+    def clear(self):
+        """Drop every entry (stats are kept)."""
+        with self._lock:
+            self._data.clear()
+            self._bytes = 0
+
+    def __contains__(self, key: Hashable) -> bool:
+        with self._lock:
+            entry = self._data.get(key)
+            return entry is not None and entry[1] >= time.monotonic()
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def values(self) -> List[Any]:
+        """Stored values (expired ones included until they are next looked up)."""
+        with self._lock:
+            return [entry[0] for entry in self._data.values()]
+
+    def stats(self) -> Dict[str, Optional[float]]:
+        """Hit/miss/eviction counters for diagnostics."""
+        lookups = self.hits + self.misses
+        return {
+            "name": self.name,
+            "entries": len(self._data),
+            "max_entries": self.max_entries,
+            "bytes": self._bytes,
+            "max_bytes": self.max_bytes,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": (self.hits / lookups) if lookups else None,
+            "evictions": self.evictions,
+            "expirations": self.expirations,
+        }
@@ -1,6 +1,11 @@
+import uuid
+import weakref
 from typing import List, Dict, Optional
 from dataclasses import dataclass, field
 
+# Every ConversationState alive in this process (for memory diagnostics), by id()
+_live_states = weakref.WeakValueDictionary()
+
 
 @dataclass
 class ConversationState:
@@ -13,9 +18,21 @@ class ConversationState:
     identified_project_id: Optional[str] = None
     identified_project_name: Optional[str] = None
     confidence_score: Optional[float] = None
+    identified_at_turn: Optional[int] = None  # Turn on which the current project was first identified
+    
+    # Best search hit per project id seen so far (fallback answer when a turn runs out of budget)
+    candidate_projects: Dict[str, Dict] = field(default_factory=dict)
     
     # Metadata
     turn_count: int = 0
+    llm_calls: int = 0
+    input_tokens: int = 0
+    output_tokens: int = 0
+    session_id: str = field(default_factory=lambda: uuid.uuid4().hex)
+    persisted_messages: int = 0  # Messages already written to the session store
+    
+    def __post_init__(self):
+        _live_states[id(self)] = self
     
     def add_message(self, role: str, content):
         """
@@ -30,8 +47,56 @@ class ConversationState:
             "content": content
         })
     
+    def record_candidates(self, results: List[Dict]):
+        """Remember search results, keeping the best score per project."""
+        for result in results:
+            best = self.candidate_projects.get(result["id"])
+            if best is None or result["score"] > best["score"]:
+                self.candidate_projects[result["id"]] = result
+    
+    def top_candidates(self, n: int = 3) -> List[Dict]:
+        """Highest-scoring candidate projects seen so far."""
+        return sorted(self.candidate_projects.values(), key=lambda r: r["score"], reverse=True)[:n]
+    
+    def record_usage(self, response):
+        """Count one LLM call and its tokens against the conversation."""
+        self.llm_calls += 1
+        usage = getattr(response, "usage", None)
+        if usage is not None:
+            self.input_tokens += usage.input_tokens
+            self.output_tokens += usage.output_tokens
+    
+    def compacted_messages(self, keep: int) -> List[Dict]:
+        """
+        History for the next LLM request with all but the last `keep` messages folded
+        into one short note: what the developer said earlier and the project(s) found.
+        """
+        cut = len(self.messages) - keep
+        # The kept part must start with a user message
+        while 0 < cut < len(self.messages) and self.messages[cut]["role"] != "user":
+            cut += 1
+        if cut <= 0 or cut >= len(self.messages):
+            return self.messages.copy()
+        
+        earlier = [m["content"] for m in self.messages[:cut] if m["role"] == "user" and isinstance(m["content"], str)]
+        lines = ["(Summary of the earlier conversation)"]
+        if earlier:
+            lines.append("Developer said: " + " / ".join(text[:200] for text in earlier))
+        if self.identified_project_id:
+            lines.append(f"Identified project: {self.identified_project_name} (ID: {self.identified_project_id})")
+        elif self.candidate_projects:
+            lines.append("Candidates so far: " + ", ".join(
+                f"{p['name']} (ID: {p['id']}, score {p['score']:.2f})" for p in self.top_candidates()
+            ))
+        
+        first = self.messages[cut]["content"]
+        blocks = [{"type": "text", "text": first}] if isinstance(first, str) else list(first)
+        return [{"role": "user", "content": [{"type": "text", "text": "\n".join(lines)}] + blocks}] + self.messages[cut + 1:]
+    
     def set_identified_project(self, project_id: str, project_name: str, confidence: float):
         """Record identified project information."""
+        if project_id != self.identified_project_id:
+            self.identified_at_turn = self.turn_count
         self.identified_project_id = project_id
         self.identified_project_name = project_name
         self.confidence_score = confidence
@@ -46,4 +111,9 @@ class ConversationState:
         else:
             summary.append("Project: Not yet identified")
         
-        return " | ".join(summary)
\ No newline at end of file
+        return " | ".join(summary)
+
+
+def live_states() -> List[ConversationState]:
+    """Conversation states currently held in memory."""
+    return list(_live_states.values())
@@ -0,0 +1,542 @@
+"""
+Diagnostics for a long-lived backend process: what is holding memory, where CPU
+goes, and how well the caches work - collected on demand, without a restart.
+
+- collect_memory()   per-component resident size (embedding models, caches,
+                     keyword automaton, conversation histories) next to process RSS
+- cache_stats()      hit rates, evictions and queue stats of every cache/service
+- SamplingProfiler   low-overhead CPU profile of all threads (sys._current_frames)
+- tracemalloc        start/stop and top allocation sites (diffed against a baseline)
+
+Everything can be written to a JSON file (dump_diagnostics, or SIGUSR1 once
+install_dump_signal() ran) or served by a localhost-only admin endpoint
+(start_admin_server, enabled with DIAGNOSTICS_PORT).
+
+Only modules the process has already imported are inspected, so collecting
+diagnostics never loads a model or opens a connection.
+"""
+import gc
+import json
+import os
+import resource
+import signal
+import sys
+import threading
+import time
+import tracemalloc
+from collections import Counter, deque
+from datetime import datetime, timezone
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from types import BuiltinFunctionType, FunctionType, MethodType, ModuleType
+from typing import Any, Callable, Dict, List, Optional
+from urllib.parse import parse_qs, urlparse
+
+from config.settings import (
+    DIAGNOSTICS_DUMP_DIR,
+    DIAGNOSTICS_PORT,
+    DIAGNOSTICS_PROFILE_INTERVAL_MS,
+    DIAGNOSTICS_TRACEMALLOC_FRAMES,
+)
+
+_SKIP_TYPES = (type, ModuleType, FunctionType, BuiltinFunctionType, MethodType)
+
+# Extra components registered by other code: name -> callable returning a dict with at least "bytes"
+_components: Dict[str, Callable[[], Dict]] = {}
+
+
+def register_component(name: str, measure: Callable[[], Dict]):
+    """Add a component to collect_memory() (measure returns {"bytes": ..., ...})."""
+    _components[name] = measure
+
+
+def deep_sizeof(obj: Any) -> int:
+    """
+    Approximate bytes reachable from obj: containers, instance attributes and numpy
+    buffers, each object counted once. Classes, modules and functions are not followed.
+    """
+    seen = set()
+    stack = [obj]
+    total = 0
+    while stack:
+        o = stack.pop()
+        if id(o) in seen or isinstance(o, _SKIP_TYPES):
+            continue
+        seen.add(id(o))
+
+        if hasattr(o, "nbytes") and hasattr(o, "dtype"):
+            total += sys.getsizeof(o) + (o.nbytes if getattr(o, "base", None) is None else 0)
+            continue
+        total += sys.getsizeof(o)
+
+        if isinstance(o, dict):
+            stack.extend(dict.keys(o))
+            stack.extend(dict.values(o))
+        elif isinstance(o, (list, tuple, set, frozenset, deque)):
+            stack.extend(o)
+        if hasattr(o, "__dict__"):
+            stack.append(vars(o))
+        for slot in getattr(type(o), "__slots__", ()):
+            if hasattr(o, slot):
+                stack.append(getattr(o, slot))
+    return total
+
+
+def _loaded(module_name: str):
+    """The module if this process already imported it, else None."""
+    return sys.modules.get(module_name)
+
+
+def _rss_bytes() -> int:
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError):
+        return 0
+
+
+# ------------------------------------------------------------------ memory
+
+def _embedding_models() -> Optional[Dict]:
+    module = _loaded("database.embeddings_CosineSimilarity")
+    if module is None:
+        return None
+    models = {}
+    for spec, backend in list(module._models.items()):
+        entry = {"backend": type(backend).__name__, "bytes": backend.memory_bytes()}
+        if hasattr(backend, "tokenizer_cache_info"):
+            entry["tokenizer_cache"] = backend.tokenizer_cache_info()._asdict()
+        models[spec] = entry
+    return {"bytes": sum(m["bytes"] for m in models.values()), "models": models}
+
+
+def _result_cache() -> Optional[Dict]:
+    module = _loaded("database.result_cache")
+    if module is None or module._result_cache is None:
+        return None
+    cache = module._result_cache
+    entry = {"bytes": cache.local.stats()["bytes"], "entries": len(cache.local)}
+    if module.RESULT_CACHE_SHARED_PATH and os.path.exists(module.RESULT_CACHE_SHARED_PATH):
+        entry["shared_file_bytes"] = os.path.getsize(module.RESULT_CACHE_SHARED_PATH)  # On disk, not resident
+    return entry
+
+
+def _project_context_cache() -> Optional[Dict]:
+    module = _loaded("database.project_context")
+    if module is None:
+        return None
+    values = module._cache.values()
+    return {"bytes": deep_sizeof(values), "entries": len(values)}
+
+
+def _keyword_automaton() -> Optional[Dict]:
+    module = _loaded("database.keyword_spotter")
+    if module is None or module._spotter is None:
+        return None
+    spotter = module._spotter
+    return {"bytes": deep_sizeof(spotter.automaton) + deep_sizeof(spotter.keywords), **spotter.stats()}
+
+
+def _conversation_histories() -> Optional[Dict]:
+    module = _loaded("utils.conversation_state")
+    if module is None:
+        return None
+    states = module.live_states()
+    sizes = [deep_sizeof(state.messages) for state in states]
+    return {"bytes": sum(sizes), "sessions": len(states), "largest_bytes": max(sizes, default=0)}
+
+
+BUILTIN_COMPONENTS = {
+    "embedding_models": _embedding_models,
+    "result_cache": _result_cache,
+    "project_context_cache": _project_context_cache,
+    "keyword_automaton": _keyword_automaton,
+    "conversation_histories": _conversation_histories,
+}
+
+
+def collect_memory() -> Dict:
+    """Resident memory by component, next to the process totals."""
+    components = {}
+    for name, measure in {**BUILTIN_COMPONENTS, **_components}.items():
+        try:
+            entry = measure()
+        except Exception as e:
+            entry = {"bytes": 0, "error": str(e)}
+        if entry is not None:
+            components[name] = entry
+
+    rss = _rss_bytes()
+    accounted = sum(c.get("bytes", 0) for c in components.values())
+    memory = {
+        "rss_bytes": rss,
+        # ru_maxrss is in KiB on Linux
+        "peak_rss_bytes": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024,
+        "accounted_bytes": accounted,
+        "unaccounted_bytes": max(0, rss - accounted),  # Interpreter, libraries, allocator slack
+        "components": components,
+        "gc_objects": len(gc.get_objects()),
+        "threads": threading.active_count(),
+    }
+    if tracemalloc.is_tracing():
+        current, peak = tracemalloc.get_traced_memory()
+        memory["tracemalloc"] = {"current_bytes": current, "peak_bytes": peak}
+    return memory
+
+
+# ------------------------------------------------------------------ caches
+
+def cache_stats() -> Dict:
+    """Hit rates, evictions and queue stats of every cache and shared service in use."""
+    stats = {}
+    module = _loaded("database.result_cache")
+    if module is not None and module._result_cache is not None:
+        stats["result_cache"] = module._result_cache.stats()
+    module = _loaded("database.project_context")
+    if module is not None:
+        stats["project_context_cache"] = module.get_cache_stats()
+    module = _loaded("database.embeddings_CosineSimilarity")
+    if module is not None:
+        stats["embedding_services"] = {spec: s.stats() for spec, s in list(module._services.items())}
+    module = _loaded("database.keyword_spotter")
+    if module is not None and module._spotter is not None:
+        stats["keyword_spotter"] = module._spotter.stats()
+    module = _loaded("agents.speculative")
+    if module is not None:
+        stats["speculative_retrieval"] = module.get_speculative_stats()
+    module = _loaded("agents.llm_scheduler")
+    if module is not None and module._scheduler is not None:
+        stats["llm_scheduler"] = module._scheduler.stats()
+    return stats
+
+
+# ------------------------------------------------------------------ CPU profiling
+
+# Innermost frames of threads parked on a lock, queue or socket - sampled as idle, not CPU
+IDLE_FRAMES = {
+    ("threading.py", "wait"), ("threading.py", "_wait_for_tstate_lock"), ("queue.py", "get"),
+    ("thread.py", "_worker"), ("selectors.py", "select"), ("socketserver.py", "serve_forever"),
+}
+
+
+class SamplingProfiler:
+    """
+    Statistical CPU profiler: a background thread records every other thread's
+    stack at a fixed interval. Costs a few percent of one core at 10 ms and needs
+    no instrumentation, so it can be switched on in a live process.
+
+    Stacks are sampled whether or not the thread is running, so threads parked
+    in a known wait (IDLE_FRAMES) are counted separately as idle. Waits inside C
+    calls such as time.sleep or socket reads still show up under their caller.
+    """
+
+    def __init__(self, interval: float = DIAGNOSTICS_PROFILE_INTERVAL_MS / 1000, max_depth: int = 64):
+        self.interval = interval
+        self.max_depth = max_depth
+        self.samples = 0
+        self.idle_samples = 0
+        self.started_at: Optional[float] = None
+        self.stopped_at: Optional[float] = None
+        self._self_counts: Counter = Counter()  # Innermost frame
+        self._total_counts: Counter = Counter()  # Anywhere on the stack
+        self._stacks: Counter = Counter()  # thread;outer;...;inner -> samples (collapsed stacks)
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def running(self) -> bool:
+        return self._thread is not None and self._thread.is_alive()
+
+    def start(self):
+        if self.running:
+            return
+        self._stop.clear()
+        self.started_at, self.stopped_at = time.monotonic(), None
+        self._thread = threading.Thread(target=self._run, name="diagnostics-profiler", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+        self.stopped_at = time.monotonic()
+
+    def _run(self):
+        own = threading.get_ident()
+        while not self._stop.wait(self.interval):
+            names = {t.ident: t.name for t in threading.enumerate()}
+            frames = sys._current_frames()
+            with self._lock:
+                self.samples += 1
+                for ident, frame in frames.items():
+                    if ident == own:
+                        continue
+                    if (os.path.basename(frame.f_code.co_filename), frame.f_code.co_name) in IDLE_FRAMES:
+                        self.idle_samples += 1
+                        continue
+                    stack = []
+                    while frame is not None and len(stack) < self.max_depth:
+                        code = frame.f_code
+                        stack.append(f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})")
+                        frame = frame.f_back
+                    self._self_counts[stack[0]] += 1
+                    self._total_counts.update(set(stack))
+                    thread = names.get(ident, str(ident)).rstrip("0123456789_-")
+                    self._stacks[";".join([thread] + stack[::-1])] += 1
+
+    def report(self, top: int = 30) -> Dict:
+        """Hottest functions by own (innermost) and cumulative samples."""
+        end = self.stopped_at or time.monotonic()
+        with self._lock:
+            thread_samples = sum(self._self_counts.values())
+
+            def rows(counter):
+                return [
+                    {"function": fn, "samples": n, "percent": round(100 * n / thread_samples, 2)}
+                    for fn, n in counter.most_common(top)
+                ] if thread_samples else []
+
+            return {
+                "running": self.running,
+                "interval_ms": self.interval * 1000,
+                "seconds": round(end - self.started_at, 2) if self.started_at else 0,
+                "samples": self.samples,
+                "thread_samples": thread_samples,
+                "idle_thread_samples": self.idle_samples,
+                "self": rows(self._self_counts),
+                "cumulative": rows(self._total_counts),
+            }
+
+    def collapsed(self) -> str:
+        """Stacks in collapsed format ('thread;outer;...;inner count'), for flamegraph tools."""
+        with self._lock:
+            return "\n".join(f"{stack} {n}" for stack, n in self._stacks.most_common()) + "\n"
+
+
+_profiler: Optional[SamplingProfiler] = None
+_profiler_lock = threading.Lock()
+
+
+def start_profiler(interval_ms: Optional[float] = None) -> Dict:
+    """Start a fresh sampling profile (replacing the previous one)."""
+    global _profiler
+    with _profiler_lock:
+        if _profiler is not None and _profiler.running:
+            _profiler.stop()
+        interval = (interval_ms if interval_ms is not None else DIAGNOSTICS_PROFILE_INTERVAL_MS) / 1000
+        _profiler = SamplingProfiler(interval=interval)
+        _profiler.start()
+        return {"running": True, "interval_ms": interval * 1000}
+
+
+def stop_profiler(top: int = 30) -> Dict:
+    """Stop the running profile and return its report."""
+    with _profiler_lock:
+        if _profiler is None:
+            return {"running": False, "samples": 0}
+        if _profiler.running:
+            _profiler.stop()
+        return _profiler.report(top)
+
+
+def profiler_report(top: int = 30) -> Dict:
+    """Report of the current (or last) profile."""
+    with _profiler_lock:
+        return _profiler.report(top) if _profiler is not None else {"running": False, "samples": 0}
+
+
+def profiler_collapsed() -> str:
+    with _profiler_lock:
+        return _profiler.collapsed() if _profiler is not None else ""
+
+
+# ------------------------------------------------------------------ tracemalloc
+
+# Growth is reported against this baseline; only start_tracemalloc and an explicit
+# mark_tracemalloc_baseline() move it, so reading a snapshot never resets anyone's diff
+_baseline: Optional[tracemalloc.Snapshot] = None
+_baseline_at: Optional[str] = None
+_tracemalloc_lock = threading.Lock()
+
+
+def _take_snapshot() -> tracemalloc.Snapshot:
+    return tracemalloc.take_snapshot().filter_traces((
+        tracemalloc.Filter(False, tracemalloc.__file__),
+        tracemalloc.Filter(False, "<frozen importlib._bootstrap*>"),
+    ))
+
+
+def _set_baseline():
+    global _baseline, _baseline_at
+    _baseline = _take_snapshot()
+    _baseline_at = datetime.now(timezone.utc).isoformat()
+
+
+def start_tracemalloc(frames: int = DIAGNOSTICS_TRACEMALLOC_FRAMES) -> Dict:
+    """Start tracing allocations (slows allocation-heavy code down noticeably while on); growth is measured from here."""
+    with _tracemalloc_lock:
+        if not tracemalloc.is_tracing():
+            tracemalloc.start(frames)
+            _set_baseline()
+        return {"tracing": True, "frames": tracemalloc.get_traceback_limit(), "baseline_at": _baseline_at}
+
+
+def mark_tracemalloc_baseline() -> Dict:
+    """Measure growth from now on (e.g. before a load run)."""
+    with _tracemalloc_lock:
+        if not tracemalloc.is_tracing():
+            return {"tracing": False}
+        _set_baseline()
+        return {"tracing": True, "baseline_at": _baseline_at}
+
+
+def stop_tracemalloc() -> Dict:
+    global _baseline, _baseline_at
+    with _tracemalloc_lock:
+        tracemalloc.stop()
+        _baseline, _baseline_at = None, None
+    return {"tracing": False}
+
+
+def tracemalloc_snapshot(top: int = 25) -> Dict:
+    """Top allocation sites now, and the biggest changes since the baseline (read-only)."""
+    with _tracemalloc_lock:
+        if not tracemalloc.is_tracing():
+            return {"tracing": False}
+        snapshot = _take_snapshot()
+        baseline, baseline_at = _baseline, _baseline_at
+
+    current, peak = tracemalloc.get_traced_memory()
+    result = {
+        "tracing": True,
+        "current_bytes": current,
+        "peak_bytes": peak,
+        "top": [
+            {"site": str(stat.traceback[0]), "bytes": stat.size, "count": stat.count}
+            for stat in snapshot.statistics("lineno")[:top]
+        ],
+    }
+    if baseline is not None:
+        result["baseline_at"] = baseline_at
+        result["growth"] = [
+            {"site": str(stat.traceback[0]), "bytes_diff": stat.size_diff, "bytes": stat.size, "count_diff": stat.count_diff}
+            for stat in snapshot.compare_to(baseline, "lineno")[:top]
+        ]
+    return result
+
+
+# ------------------------------------------------------------------ dumping
+
+def collect_diagnostics() -> Dict:
+    """Everything above in one document."""
+    return {
+        "collected_at": datetime.now(timezone.utc).isoformat(),
+        "pid": os.getpid(),
+        "memory": collect_memory(),
+        "caches": cache_stats(),
+        "profile": profiler_report(),
+        "tracemalloc": tracemalloc_snapshot() if tracemalloc.is_tracing() else {"tracing": False},
+    }
+
+
+def dump_diagnostics(path: Optional[str] = None) -> str:
+    """Write collect_diagnostics() as JSON (default: DIAGNOSTICS_DUMP_DIR/diagnostics-<pid>-<time>.json)."""
+    if path is None:
+        os.makedirs(DIAGNOSTICS_DUMP_DIR, exist_ok=True)
+        stamp = datetime.now().strftime("%Y%m%d-%H%M%S")
+        path = os.path.join(DIAGNOSTICS_DUMP_DIR, f"diagnostics-{os.getpid()}-{stamp}.json")
+    with open(path, "w") as f:
+        json.dump(collect_diagnostics(), f, indent=2, default=str)
+    return path
+
+
+def install_dump_signal(signum: int = getattr(signal, "SIGUSR1", 0)):
+    """Dump diagnostics to a file on `kill -USR1 <pid>` (call from the main thread)."""
+    if not signum:
+        return  # No SIGUSR1 on this platform
+
+    def handler(*_):
+        # Off the signal handler: collecting can take a moment and may need locks
+        threading.Thread(target=lambda: print(f"\n🩺 Diagnostics written to {dump_diagnostics()}"), daemon=True).start()
+
+    signal.signal(signum, handler)
+
+
+def _number_param(params: Dict[str, str], name: str, default: Optional[float]) -> Optional[float]:
+    return float(params[name]) if name in params else default
+
+
+# Admin endpoint routes: (method, path) -> handler(query params) returning a dict (JSON) or str (text)
+ROUTES: Dict[tuple, Callable[[Dict[str, str]], Any]] = {
+    ("GET", "/diagnostics"): lambda p: collect_diagnostics(),
+    ("GET", "/diagnostics/memory"): lambda p: collect_memory(),
+    ("GET", "/diagnostics/caches"): lambda p: cache_stats(),
+    ("GET", "/diagnostics/profile"): lambda p: profiler_report(int(_number_param(p, "top", 30))),
+    ("GET", "/diagnostics/profile/collapsed"): lambda p: profiler_collapsed(),
+    ("POST", "/diagnostics/profile/start"): lambda p: start_profiler(_number_param(p, "interval_ms", None)),
+    ("POST", "/diagnostics/profile/stop"): lambda p: stop_profiler(int(_number_param(p, "top", 30))),
+    ("GET", "/diagnostics/tracemalloc"): lambda p: tracemalloc_snapshot(int(_number_param(p, "top", 25))),
+    ("POST", "/diagnostics/tracemalloc/start"): lambda p: start_tracemalloc(
+        int(_number_param(p, "frames", DIAGNOSTICS_TRACEMALLOC_FRAMES))),
+    ("POST", "/diagnostics/tracemalloc/baseline"): lambda p: mark_tracemalloc_baseline(),
+    ("POST", "/diagnostics/tracemalloc/stop"): lambda p: stop_tracemalloc(),
+    ("POST", "/diagnostics/dump"): lambda p: {"path": dump_diagnostics()},  # Always into DIAGNOSTICS_DUMP_DIR
+}
+
+# Required on POSTs: a custom header makes the request non-simple, so a cross-site
+# page can't send it to 127.0.0.1 without a CORS preflight (which is never answered)
+ADMIN_POST_HEADER = "X-Diagnostics"
+
+
+class _AdminHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        self._dispatch("GET")
+
+    def do_POST(self):
+        self._dispatch("POST")
+
+    def _dispatch(self, method: str):
+        url = urlparse(self.path)
+        params = {name: values[-1] for name, values in parse_qs(url.query).items()}
+        route = ROUTES.get((method, url.path.rstrip("/") or "/"))
+        if route is None:
+            self._send(404, {"error": f"no route {method} {url.path}",
+                             "routes": [f"{m} {p}" for m, p in ROUTES]})
+            return
+        if method == "POST" and ADMIN_POST_HEADER not in self.headers:
+            self._send(403, {"error": f"POST requests need a '{ADMIN_POST_HEADER}' header"})
+            return
+        try:
+            self._send(200, route(params))
+        except Exception as e:
+            self._send(500, {"error": str(e)})
+
+    def _send(self, status: int, payload):
+        if isinstance(payload, str):
+            body, content_type = payload.encode("utf-8"), "text/plain; charset=utf-8"
+        else:
+            body, content_type = json.dumps(payload, indent=2, default=str).encode("utf-8"), "application/json"
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass  # Keep the chat console clean
+
+
+_server: Optional[ThreadingHTTPServer] = None
+
+
+def start_admin_server(port: int = DIAGNOSTICS_PORT) -> Optional[ThreadingHTTPServer]:
+    """
+    Serve the diagnostics routes on 127.0.0.1:port in a daemon thread (port 0 =
+    pick a free one). Localhost only: the endpoint has no authentication, and
+    POSTs must carry ADMIN_POST_HEADER (e.g. curl -X POST -H 'X-Diagnostics: 1' ...).
+    """
+    global _server
+    if _server is None:
+        _server = ThreadingHTTPServer(("127.0.0.1", port), _AdminHandler)
+        threading.Thread(target=_server.serve_forever, name="diagnostics-admin", daemon=True).start()
+    return _server
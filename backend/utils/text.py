@@ -0,0 +1,36 @@
+import re
+from typing import List
+
+# Filler words that never help identify a project (see SYSTEM_PROMPT: not "working" or "issue")
+STOPWORDS = {
+    "a", "an", "the", "i", "i'm", "im", "me", "my", "we", "our", "is", "are", "was", "were", "be",
+    "been", "it", "its", "it's", "on", "in", "at", "to", "for", "of", "and", "or", "but", "with",
+    "this", "that", "these", "those", "working", "work", "stuck", "issue", "issues", "problem",
+    "today", "still", "again", "just", "so", "some", "any", "can", "could", "you", "help", "hey",
+    "hi", "please", "having", "have", "has", "got", "get", "keeps", "keep", "am", "when",
+    "after", "from", "about", "what", "which", "there", "their", "they", "all", "up", "out", "not",
+    "yes", "yeah", "no", "ok", "okay", "thanks", "one", "ideas", "idea", "sorry", "mean", "called",
+}
+
+WORD_PATTERN = re.compile(r"[a-z0-9][a-z0-9\-_']*")
+
+
+def extract_key_terms(text: str) -> str:
+    """Drop filler words and keep the specific ones, in order."""
+    words = WORD_PATTERN.findall(text.lower())
+    return " ".join(w for w in words if w not in STOPWORDS)
+
+
+def extract_keyphrases(text: str) -> List[str]:
+    """
+    Search phrases worth trying for a raw user message: the key terms, plus the
+    message itself when it says more than the key terms alone.
+    """
+    key_terms = extract_key_terms(text)
+    if not key_terms:
+        return []
+
+    phrases = [key_terms]
+    if re.sub(r"\s+", " ", text.lower()).strip() != key_terms:
+        phrases.append(text)
+    return phrases
@@ -0,0 +1,64 @@
+import time
+from dataclasses import dataclass, field
+from typing import Optional
+
+from config.settings import MAX_NEGOTIATION_ROUNDS, TURN_DEADLINE_SECONDS, TURN_TOKEN_BUDGET
+
+
+class BudgetExceeded(Exception):
+    """Raised when a turn runs out of time, iterations or tokens."""
+
+    def __init__(self, reason: str):
+        super().__init__(f"Turn budget exceeded: {reason}")
+        self.reason = reason
+
+
+def remaining_seconds(deadline: Optional[float]) -> Optional[float]:
+    """Seconds left until a time.monotonic() deadline (None = no deadline)."""
+    if deadline is None:
+        return None
+    return deadline - time.monotonic()
+
+
+def check_deadline(deadline: Optional[float]):
+    """Raise BudgetExceeded if the deadline has passed."""
+    if deadline is not None and time.monotonic() >= deadline:
+        raise BudgetExceeded("deadline")
+
+
+@dataclass
+class TurnBudget:
+    """Wall-clock, iteration and token limits for one orchestrator turn."""
+
+    deadline: float
+    max_iterations: int = MAX_NEGOTIATION_ROUNDS
+    max_tokens: int = TURN_TOKEN_BUDGET
+
+    # Spend so far
+    iterations: int = 0
+    tokens_used: int = 0
+    started_at: float = field(default_factory=time.monotonic)
+
+    @classmethod
+    def from_settings(cls) -> "TurnBudget":
+        return cls(deadline=time.monotonic() + TURN_DEADLINE_SECONDS)
+
+    def remaining_time(self) -> float:
+        return self.deadline - time.monotonic()
+
+    def exhausted_reason(self) -> Optional[str]:
+        """Why the budget is used up, or None if there's room for another LLM call."""
+        if self.remaining_time() <= 0:
+            return "deadline"
+        if self.iterations >= self.max_iterations:
+            return "iterations"
+        if self.tokens_used >= self.max_tokens:
+            return "tokens"
+        return None
+
+    def record_response(self, response):
+        """Count one LLM call and its token usage against the budget."""
+        self.iterations += 1
+        usage = getattr(response, "usage", None)
+        if usage is not None:
+            self.tokens_used += usage.input_tokens + usage.output_tokens